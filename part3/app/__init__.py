@@ -1,33 +1,54 @@
 from flask import Flask
 from flask_cors import CORS
 from flask_restx import Api
-from config import DevelopmentConfig
+from config import config_from_env
 
-from app.extensions import db, jwt, bcrypt
+from app.extensions import db, jwt, bcrypt, hashing_pool, entity_cache, read_replica
+from app.models import ids
+from app.persistence import pool, sqlite
+from app.services.revocation import revocation
+from app.services.search import place_search
+from app.services.autocomplete import place_autocomplete
+from app.hashing import HashingPoolBusy
 from app.api.v1.users import api as users_ns
 from app.api.v1.amenities import api as amenities_ns
 from app.api.v1.places import api as places_ns
 from app.api.v1.reviews import api as reviews_ns
 from app.api.v1.auth import api as auth_ns
 from app.api.v1.protected import api as protected_ns
+from app.api.v1.imports import api as imports_ns
+from app.api.v1.metrics import api as metrics_ns
+from app.commands import hbnb_cli
 
 
-def create_app(config_class="config.DevelopmentConfig"):
+def create_app(config_class=None):
     """
     Flask application factory that instantiates
     the app with a configuration class
+    (by default the one named by HBNB_ENV: development, testing, production)
     """
     # 1: Load application configuration before initializing extensions(BD...)
     app = Flask(__name__)
-    app.config.from_object(config_class)
+    app.config.from_object(config_class or config_from_env())
+    if not app.config.get('SQLALCHEMY_DATABASE_URI'):
+        raise RuntimeError("SQLALCHEMY_DATABASE_URI is not set (DATABASE_URL)")
 
     # Enabling CORS for all origins (in dev)
     CORS(app)
 
     # Step 2: Initialize Bcrypt with the Flask application
+    pool.instrument(app)  # before the engine is created
     db.init_app(app)
+    sqlite.init_app(app, db)
+    ids.init_app(app, db)
     bcrypt.init_app(app)
+    hashing_pool.init_app(app)
+    entity_cache.init_app(app)
+    read_replica.init_app(app)
     jwt.init_app(app)
+    revocation.init_app(app)
+    place_search.init_app(app)
+    place_autocomplete.init_app(app)
     
     # Step 3: Create the Flask-RESTx API
     api = Api(
@@ -37,6 +58,12 @@ def create_app(config_class="config.DevelopmentConfig"):
         description="HBnB Application API"
     )
 
+    @api.errorhandler(HashingPoolBusy)
+    def hashing_pool_busy(error):
+        """Backpressure: every bcrypt worker and queue slot is taken"""
+        return ({'error': str(error)}, 503,
+                {'Retry-After': str(error.retry_after)})
+
     # 4: Register namespaces to activate routesfor each feature(exusers/places)
 
     api.add_namespace(users_ns, path='/api/v1/users')
@@ -45,4 +72,9 @@ def create_app(config_class="config.DevelopmentConfig"):
     api.add_namespace(reviews_ns, path='/api/v1/reviews')
     api.add_namespace(protected_ns, path='/api/v1')
     api.add_namespace(auth_ns, path="/api/v1/auth")
+    api.add_namespace(imports_ns, path="/api/v1/import")
+    api.add_namespace(metrics_ns, path="/api/v1/metrics")
+
+    # 5: Maintenance commands (flask hbnb ...)
+    app.cli.add_command(hbnb_cli)
     return app
@@ -1,6 +1,13 @@
 from flask_restx import Namespace, Resource, fields
 from app.services import facade
-from flask_jwt_extended import jwt_required, get_jwt
+from app.api.v1.pagination import PAGE_PARAMS, page_args, page_response
+from app.api.v1.conditional import (PAGE_COLUMNS, collection_version, conditional,
+                                     entity_version, page_version)
+from app.api.v1.serializers import AMENITY, json_response
+from app.api.v1.streaming import (STREAM_PARAMS, stream_batch_size,
+                                   stream_requested, stream_response)
+from flask_jwt_extended import jwt_required
+from app.api.v1.principal import current_principal
 
 authorizations = {
         'Bearer Auth': {
@@ -28,7 +35,7 @@ class AmenityList(Resource):
     def post(self):
         """Register a new amenity"""
         amenity_data = api.payload
-        is_admin = get_jwt().get('is_admin', False)
+        is_admin = current_principal().is_admin
         if not is_admin:
             return {'error': 'Admin privileges required'}, 403
         
@@ -41,11 +48,28 @@ class AmenityList(Resource):
         except Exception as e:
             return {'error': str(e)}, 400
 
+    @api.doc(params={**PAGE_PARAMS, **STREAM_PARAMS})
     @api.response(200, 'List of amenities retrieved successfully')
+    @api.response(400, 'Invalid pagination parameters')
     def get(self):
-        """Retrieve a list of all amenities"""
-        amenities = facade.get_all_amenities()
-        return [amenity.to_dict() for amenity in amenities], 200
+        """Retrieve a list of all amenities (one page with ?limit=&cursor=, NDJSON with ?stream=1)"""
+        if stream_requested():
+            return stream_response(facade.stream_amenities(stream_batch_size(), AMENITY.columns),
+                                   AMENITY.from_row)
+        try:
+            page = page_args()
+
+            if page is not None:
+                amenities, next_cursor = facade.get_amenities_page(
+                    *page, columns=AMENITY.columns + PAGE_COLUMNS)
+                return conditional(page_version(AMENITY.model, amenities), lambda: json_response(
+                    page_response(amenities, next_cursor, AMENITY.from_row)))
+        except ValueError as error:
+            return {'error': str(error)}, 400
+
+        return conditional(
+            collection_version(facade.amenities_version()),
+            lambda: json_response(AMENITY.rows(facade.get_all_amenities(AMENITY.columns))))
 
 
 @api.route('/<amenity_id>')
@@ -56,13 +80,13 @@ class AmenityResource(Resource):
     @jwt_required()
     @api.doc(security='Bearer Auth')
     def get(self, amenity_id):
-        if not get_jwt().get('is_admin', False):
+        if not current_principal().is_admin:
             return {'error': 'Admin privileges required'}, 403
         """Get amenity details by ID"""
         amenity = facade.get_amenity(amenity_id)
         if not amenity:
             return {'error': 'Amenity not found'}, 404
-        return amenity.to_dict(), 200
+        return conditional(entity_version(amenity), lambda: AMENITY.one(amenity))
 
     @api.expect(amenity_model)
     @api.response(200, 'Amenity updated successfully')
@@ -72,7 +96,7 @@ class AmenityResource(Resource):
     @jwt_required()
     @api.doc(security='Bearer Auth')
     def put(self, amenity_id):
-        if not get_jwt().get('is_admin', False):
+        if not current_principal().is_admin:
             return {'error': 'Admin privileges required'}, 403
         amenity_data = api.payload
         amenity = facade.get_amenity(amenity_id)
@@ -1,7 +1,9 @@
+from flask import request
 from flask_restx import Namespace, Resource, fields
-from flask_jwt_extended import create_access_token
+from flask_jwt_extended import create_access_token, create_refresh_token, decode_token
+from jwt.exceptions import PyJWTError
 from app.services import facade
-from flask_jwt_extended import get_jwt
+from flask_jwt_extended import get_jwt, get_jwt_identity, jwt_required
 
 api = Namespace('auth', description='Authentication operations')
 
@@ -11,6 +13,11 @@ login_model = api.model('Login', {
     'password': fields.String(required=True, description='User password')
 })
 
+logout_model = api.model('Logout', {
+    'refresh_token': fields.String(
+        description='Refresh token of the session, revoked with the token presented')
+})
+
 
 @api.route('/login')
 class Login(Resource):
@@ -18,15 +25,66 @@ class Login(Resource):
     def post(self):
         """Authenticate user and return a JWT token"""
         credentials = api.payload  # Get the email and password from the request payload
-        # Step 1: Retrieve the user based on the provided email
-        user = facade.get_user_by_email(credentials['email'])
-
-        # Step 2: Check if the user exists and the password is correct
-        if not user or not user.verify_password(credentials['password']):
+        # Step 1 & 2: Retrieve the user and check the password
+        # (runs on the hashing pool, 503 when it is saturated)
+        user = facade.authenticate(credentials['email'], credentials['password'])
+        if not user:
             return {'error': 'Invalid credentials'}, 401
         
-        # Step 3: Create a JWT token with the user's id and is_admin flag
-        access_token = create_access_token(identity=str(user.id), additional_claims={'is_admin': user.is_admin})
+        # Step 3 & 4: Return a short-lived access token (user's id and
+        # is_admin flag) and a refresh token to get the next ones
+        return issue_tokens(user), 200
+
+
+def issue_tokens(user):
+    return {
+        'access_token': create_access_token(
+            identity=str(user.id), additional_claims={'is_admin': user.is_admin}),
+        'refresh_token': create_refresh_token(identity=str(user.id)),
+    }
 
-        # Step 4: Return the JWT token to the client
-        return {'access_token': access_token}, 200
+
+@api.route('/refresh')
+class Refresh(Resource):
+    @jwt_required(refresh=True)
+    @api.doc(security='Bearer Auth')
+    @api.response(200, 'New access and refresh tokens')
+    @api.response(401, 'Refresh token missing, expired or revoked')
+    def post(self):
+        """
+        Exchange a refresh token for a new access token. The refresh
+        token is rotated: the one presented is revoked.
+        """
+        # is_admin is read again: a change applies at the next refresh
+        user = facade.get_user(get_jwt_identity())
+        if not user:
+            return {'error': 'User not found'}, 401
+        facade.revoke_token(get_jwt())
+        return issue_tokens(user), 200
+
+
+@api.route('/logout')
+class Logout(Resource):
+    @jwt_required(verify_type=False)
+    @api.doc(security='Bearer Auth')
+    @api.expect(logout_model)
+    @api.response(200, 'Tokens revoked')
+    @api.response(400, 'Invalid refresh token')
+    def post(self):
+        """
+        Revoke the token presented (access or refresh token) and the
+        refresh token of the body, so the session cannot be renewed
+        """
+        claims = [get_jwt()]
+        refresh_token = (request.get_json(silent=True) or {}).get('refresh_token')
+        if refresh_token:
+            try:
+                refresh = decode_token(refresh_token, allow_expired=True)
+            except PyJWTError:
+                return {'error': 'Invalid refresh token'}, 400
+            if refresh.get('type') != 'refresh' or refresh['sub'] != get_jwt_identity():
+                return {'error': 'Invalid refresh token'}, 400
+            claims.append(refresh)
+        for jwt_payload in claims:
+            facade.revoke_token(jwt_payload)
+        return {'message': 'Tokens revoked'}, 200
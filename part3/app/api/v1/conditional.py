@@ -0,0 +1,93 @@
+"""
+HTTP conditional requests driven by BaseModel.updated_at.
+
+Single entities and keyset pages get a strong ETag over the (table, id,
+updated_at) of every row their representation is built from, full
+collections one over their version (max updated_at, row count) and the
+query string, read with one aggregate SELECT. A
+matching If-None-Match is answered 304 before any serialization.
+
+Last-Modified (and If-Modified-Since) only comes with representations
+of a single row. Deleting a row or unlinking an amenity that is not the
+newest leaves max(updated_at) unchanged, so listings, pages and entities
+with their relations are validated by their ETag alone.
+"""
+import hashlib
+from datetime import timezone
+from flask import Response, request
+from werkzeug.http import http_date, quote_etag
+
+
+def _etag(parts):
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+
+def _utc(moment):
+    """Naive UTC column value -> aware datetime at HTTP (second) precision"""
+    if moment is None:
+        return None
+    return moment.replace(tzinfo=timezone.utc, microsecond=0)
+
+
+def _version(rows):
+    """(etag, last_modified) of (table, id, updated_at) triples"""
+    parts = sorted(f"{table}:{row_id}:{updated_at.isoformat()}"
+                   for table, row_id, updated_at in rows)
+    return _etag(parts), max((row[2] for row in rows), default=None)
+
+
+def entity_version(*objects):
+    """
+    (etag, last_modified) of a representation built from instances
+    (one entity with its relations); last_modified is None with relations
+    """
+    etag, last_modified = _version(
+        [(obj.__tablename__, obj.id, obj.updated_at) for obj in objects])
+    return etag, last_modified if len(objects) == 1 else None
+
+
+def page_version(model, rows):
+    """(etag, None) of one page of named tuples (see PAGE_COLUMNS)"""
+    table = model.__tablename__
+    return _version([(table, row.id, row.updated_at) for row in rows])[0], None
+
+
+# what page_version reads, on top of the columns of the serializer
+PAGE_COLUMNS = ["id", "updated_at"]
+
+
+def collection_version(version):
+    """(etag, None) of a listing whose version is (max updated_at, count)"""
+    last_modified, count = version
+    stamp = last_modified.isoformat() if last_modified else ""
+    etag = _etag([stamp, str(count), request.query_string.decode()])
+    return etag, None
+
+
+def not_modified(etag, last_modified):
+    """True when the client copy is current (If-None-Match wins over If-Modified-Since)"""
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    since = request.if_modified_since
+    if since is not None and last_modified is not None:
+        return _utc(last_modified) <= since
+    return False
+
+
+def conditional(version, build):
+    """
+    (build(), 200, headers) with ETag and Last-Modified, or an empty
+    304 when the client already holds this version. build may return
+    a ready Response.
+    """
+    etag, last_modified = version
+    headers = {"ETag": quote_etag(etag), "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(_utc(last_modified))
+    if not_modified(etag, last_modified):
+        return Response(status=304, headers=headers)
+    body = build()
+    if isinstance(body, Response):  # already encoded, see serializers.json_response
+        body.headers.update(headers)
+        return body
+    return body, 200, headers
@@ -0,0 +1,29 @@
+from flask import request
+from flask_restx import Namespace, Resource
+from flask_jwt_extended import jwt_required
+from app.api.v1.principal import current_principal
+from app.services import facade
+
+api = Namespace('import', description='Bulk import operations')
+
+
+@api.route('/')
+class BulkImport(Resource):
+    @api.response(200, 'Import done, see the per-line errors of the report')
+    @api.response(400, 'Invalid batch size')
+    @api.response(403, 'Admin privileges required')
+    @jwt_required()
+    @api.doc(security='Bearer Auth')
+    def post(self):
+        """
+        Admin: import amenities, places and reviews from an NDJSON body
+        (one JSON object per line with a "type" key). The body is read
+        as a stream, so large inventories do not have to fit in memory.
+        """
+        if not current_principal().is_admin:
+            return {'error': 'Admin privileges required'}, 403
+
+        batch_size = request.args.get('batch_size', 5000, type=int)
+        if batch_size < 1:
+            return {'error': 'batch_size must be a positive integer'}, 400
+        return facade.import_ndjson(request.stream, batch_size=batch_size), 200
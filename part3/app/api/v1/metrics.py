@@ -0,0 +1,33 @@
+from flask_restx import Namespace, Resource
+from flask_jwt_extended import jwt_required
+from app.api.v1.principal import current_principal
+from app.extensions import db, entity_cache
+from app.persistence.pool import pool_metrics
+
+api = Namespace('metrics', description='Runtime metrics (admin)')
+
+
+@api.route('/cache')
+class CacheMetrics(Resource):
+    @api.response(200, 'Counters of the entity cache, per table')
+    @api.response(403, 'Admin privileges required')
+    @jwt_required()
+    @api.doc(security='Bearer Auth')
+    def get(self):
+        """Admin: hits, misses, evictions and size of the entity cache"""
+        if not current_principal().is_admin:
+            return {'error': 'Admin privileges required'}, 403
+        return entity_cache.stats(), 200
+
+
+@api.route('/pool')
+class PoolMetrics(Resource):
+    @api.response(200, 'Counters of the database connection pool')
+    @api.response(403, 'Admin privileges required')
+    @jwt_required()
+    @api.doc(security='Bearer Auth')
+    def get(self):
+        """Admin: checked-out connections, overflow and checkout wait time"""
+        if not current_principal().is_admin:
+            return {'error': 'Admin privileges required'}, 403
+        return pool_metrics(db.engine), 200
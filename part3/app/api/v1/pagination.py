@@ -0,0 +1,33 @@
+from flask import current_app, request
+
+# Query string parameters documented on every paginated list endpoint
+PAGE_PARAMS = {
+    'limit': 'Page size (keyset pagination)',
+    'cursor': 'next_cursor returned by the previous page'
+}
+
+
+def page_args():
+    """
+    Read ?limit=&cursor= from the query string.
+    Returns None when the client did not ask for a page (full list).
+    """
+    if 'limit' not in request.args and 'cursor' not in request.args:
+        return None
+    limit = request.args.get('limit', current_app.config['PAGE_SIZE_DEFAULT'])
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise ValueError("limit must be a positive integer")
+    if limit < 1:
+        raise ValueError("limit must be a positive integer")
+    limit = min(limit, current_app.config['PAGE_SIZE_MAX'])
+    return limit, request.args.get('cursor')
+
+
+def page_response(items, next_cursor, serialize):
+    """Envelope returned by every paginated list endpoint"""
+    return {
+        'items': [serialize(item) for item in items],
+        'next_cursor': next_cursor
+    }
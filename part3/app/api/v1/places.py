@@ -1,6 +1,14 @@
+from flask import current_app, request
 from flask_restx import Namespace, Resource, fields
 from app.services import facade
-from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from app.api.v1.pagination import PAGE_PARAMS, page_args, page_response
+from app.api.v1.conditional import (PAGE_COLUMNS, collection_version, conditional,
+                                     entity_version, page_version)
+from app.api.v1.serializers import PLACE_SUMMARY, REVIEW, json_response
+from app.api.v1.streaming import (STREAM_PARAMS, stream_batch_size,
+                                   stream_requested, stream_response)
+from flask_jwt_extended import jwt_required
+from app.api.v1.principal import current_principal
 
 api = Namespace("places", description="Place operations")
 
@@ -18,7 +26,6 @@ user_model = api.model(
         "id": fields.String(description="User ID"),
         "first_name": fields.String(description="First name of the owner"),
         "last_name": fields.String(description="Last name of the owner"),
-        "email": fields.String(description="Email of the owner"),
     },
 )
 
@@ -51,6 +58,55 @@ place_update_model = api.model(
 )
 
 
+# Numeric filters of GET /places/, passed as is to PlaceRepository.search()
+NUMBER_FILTERS = {
+    "min_price": "Minimum price per night",
+    "max_price": "Maximum price per night",
+    "lat_min": "Bounding box: minimum latitude",
+    "lat_max": "Bounding box: maximum latitude",
+    "lon_min": "Bounding box: minimum longitude",
+    "lon_max": "Bounding box: maximum longitude",
+}
+
+SORTS = ("created", "rating")
+
+SEARCH_PARAMS = dict(
+    NUMBER_FILTERS,
+    amenity="Amenity ID the place must have (repeatable)",
+    sort="created (oldest first, default) or rating (best average rating first)",
+    **PAGE_PARAMS,
+    **STREAM_PARAMS
+)
+
+
+def search_filters():
+    """
+    Read the place filters from the query string.
+    Raises ValueError when a numeric filter is not a number.
+    """
+    filters = {}
+    for name in NUMBER_FILTERS:
+        value = request.args.get(name)
+        if value in (None, ""):
+            continue
+        try:
+            filters[name] = float(value)
+        except ValueError:
+            raise ValueError(f"{name} must be a number")
+    amenity_ids = request.args.getlist("amenity")
+    if amenity_ids:
+        filters["amenity_ids"] = amenity_ids
+    return filters
+
+
+def sort_arg():
+    """?sort= of GET /places/; raises ValueError on an unknown order"""
+    sort = request.args.get("sort") or "created"
+    if sort not in SORTS:
+        raise ValueError(f"sort must be one of {', '.join(SORTS)}")
+    return sort
+
+
 @api.route("/")
 class PlaceList(Resource):
     @jwt_required()
@@ -63,11 +119,10 @@ class PlaceList(Resource):
         """
         Create a new place : authenticated user becomes owner of the place !
         """
-        current_user_id = get_jwt_identity()
         payload = api.payload
 
         try:
-            place = facade.create_place(current_user_id, payload)
+            place = facade.create_place(current_principal().id, payload)
             return place.to_dict(), 201
         except PermissionError as error:
             return {"error": str(error)}, 403
@@ -76,33 +131,182 @@ class PlaceList(Resource):
         except ValueError as error:
             return {"error": str(error)}, 400
 
+    @api.doc(params=SEARCH_PARAMS)
     @api.response(200, "List of places retrieved successfully")
+    @api.response(400, "Invalid filter or pagination parameters")
     def get(self):
         """
-        Public: list all places
+        Public: list places matching the filters, oldest first or best rated
+        first with ?sort=rating (one page with ?limit=&cursor=, every match
+        as NDJSON with ?stream=1, oldest first)
         """
-        places = facade.get_all_places()
-        return [{"id": p.id, "title": p.title, "price": p.price} for p in places], 200
+        try:
+            filters = search_filters()
+            sort = sort_arg()
+            if stream_requested():
+                return stream_response(
+                    facade.stream_places(filters, stream_batch_size(), PLACE_SUMMARY.columns),
+                    PLACE_SUMMARY.from_row)
+            page = page_args()
+
+            if page is not None:
+                places, next_cursor = facade.search_places(
+                    filters, *page, columns=PLACE_SUMMARY.columns + PAGE_COLUMNS, sort=sort)
+                return conditional(page_version(PLACE_SUMMARY.model, places), lambda: json_response(
+                    page_response(places, next_cursor, PLACE_SUMMARY.from_row)))
+        except ValueError as error:
+            return {"error": str(error)}, 400
+
+        return conditional(
+            collection_version(facade.places_version(filters)),
+            lambda: json_response(PLACE_SUMMARY.rows(
+                facade.search_places(filters, columns=PLACE_SUMMARY.columns, sort=sort))))
+
+
+def nearby_args():
+    """
+    Read ?lat=&lon=&radius_km=&limit= for GET /places/nearby.
+    Raises ValueError on a missing or out of range value.
+    """
+    config = current_app.config
+    values = {}
+    for name, default in (("lat", None), ("lon", None),
+                          ("radius_km", config["NEARBY_DEFAULT_RADIUS_KM"]),
+                          ("limit", config["PAGE_SIZE_DEFAULT"])):
+        value = request.args.get(name, default)
+        if value is None:
+            raise ValueError(f"{name} is required")
+        try:
+            values[name] = float(value)
+        except ValueError:
+            raise ValueError(f"{name} must be a number")
+    if not -90 <= values["lat"] <= 90:
+        raise ValueError("lat must be between -90 and 90.")
+    if not -180 <= values["lon"] <= 180:
+        raise ValueError("lon must be between -180 and 180.")
+    if not 0 < values["radius_km"] <= config["NEARBY_MAX_RADIUS_KM"]:
+        raise ValueError(
+            f"radius_km must be between 0 and {config['NEARBY_MAX_RADIUS_KM']}.")
+    if values["limit"] < 1:
+        raise ValueError("limit must be a positive integer")
+    limit = min(int(values["limit"]), config["PAGE_SIZE_MAX"])
+    return values["lat"], values["lon"], values["radius_km"], limit
+
+
+@api.route("/nearby")
+class PlaceNearby(Resource):
+    @api.doc(params={
+        "lat": "Latitude of the center",
+        "lon": "Longitude of the center",
+        "radius_km": "Search radius in kilometers",
+        "limit": "Maximum number of places",
+    })
+    @api.response(200, "Places within the radius, closest first")
+    @api.response(400, "Invalid coordinates or radius")
+    def get(self):
+        """
+        Public: places around a point, closest first
+        """
+        try:
+            places = facade.get_nearby_places(*nearby_args())
+        except ValueError as error:
+            return {"error": str(error)}, 400
+        return [
+            {"id": place.id, "title": place.title, "price": place.price,
+             "distance_km": round(distance, 3)}
+            for place, distance in places
+        ], 200
+
+
+def text_search_args():
+    """
+    Read ?q=&limit= for GET /places/search.
+    Raises ValueError on a missing query or a bad limit.
+    """
+    config = current_app.config
+    query = request.args.get("q", "")
+    if not query.strip():
+        raise ValueError("q is required")
+    try:
+        limit = int(request.args.get("limit", config["PAGE_SIZE_DEFAULT"]))
+    except ValueError:
+        raise ValueError("limit must be a positive integer")
+    if limit < 1:
+        raise ValueError("limit must be a positive integer")
+    return query, min(limit, config["PAGE_SIZE_MAX"])
+
+
+@api.route("/search")
+class PlaceSearch(Resource):
+    @api.doc(params={
+        "q": "Words of the title or description, all required; word* for a prefix",
+        "limit": "Maximum number of places",
+    })
+    @api.response(200, "Matching places, best match first (BM25)")
+    @api.response(400, "Missing or invalid query")
+    def get(self):
+        """
+        Public: full-text search in the titles and descriptions of the places
+        """
+        try:
+            hits = facade.text_search_places(*text_search_args(), PLACE_SUMMARY.columns)
+        except ValueError as error:
+            return {"error": str(error)}, 400
+        return json_response([dict(PLACE_SUMMARY.from_row(row), score=round(score, 4))
+                              for row, score in hits])
+
+
+def autocomplete_args():
+    """
+    Read ?prefix=&limit= for GET /places/autocomplete.
+    Raises ValueError on a missing prefix or a bad limit.
+    """
+    prefix = request.args.get("prefix", "")
+    if not prefix.strip():
+        raise ValueError("prefix is required")
+    try:
+        limit = int(request.args.get("limit", 10))
+    except ValueError:
+        raise ValueError("limit must be a positive integer")
+    if limit < 1:
+        raise ValueError("limit must be a positive integer")
+    return prefix, min(limit, current_app.config["AUTOCOMPLETE_LIMIT_MAX"])
+
+
+@api.route("/autocomplete")
+class PlaceAutocomplete(Resource):
+    @api.doc(params={
+        "prefix": "Start of the title, case and accents ignored",
+        "limit": "Maximum number of titles (10 by default)",
+    })
+    @api.response(200, "Places whose title starts with the prefix, most reviewed first")
+    @api.response(400, "Missing or invalid prefix")
+    def get(self):
+        """
+        Public: title suggestions for the search box
+        """
+        try:
+            hits = facade.autocomplete_places(*autocomplete_args())
+        except ValueError as error:
+            return {"error": str(error)}, 400
+        return json_response([{"id": place_id, "title": title, "review_count": count}
+                              for place_id, title, count in hits])
 
 
 @api.route("/<place_id>")
 class PlaceResource(Resource):
     @api.response(200, "Place details retrieved successfully")
+    @api.response(304, "Not modified (If-None-Match / If-Modified-Since)")
     @api.response(404, "Place not found")
     def get(self, place_id):
-        """Public: get a single place"""
-        place = facade.get_place(place_id)
+        """Public: get a single place with its owner, amenities and reviews"""
+        place = facade.get_place(place_id, profile="detail")
         if not place:
             return {"error": "Place not found"}, 404
-        return {
-            "id": place.id,
-            "title": place.title,
-            "description": place.description,
-            "price": place.price,
-            "latitude": place.latitude,
-            "longitude": place.longitude,
-            "owner": {"id": place.owner.id}
-            }, 200
+        # linking an amenity or editing a review leaves place.updated_at
+        # alone, so the version covers every row of the representation
+        version = entity_version(place, place.owner, *place.amenities, *place.review_list)
+        return conditional(version, place.to_dict_list)
 
     @jwt_required()
     @api.doc(security='Bearer Auth')
@@ -115,20 +319,21 @@ class PlaceResource(Resource):
         """
         Owner or admin: update a place
         """
-        current_user_id = get_jwt_identity()
-        is_admin = get_jwt().get("is_admin", False)
+        principal = current_principal()
         payload = api.payload
 
         place = facade.get_place(place_id)
         if not place:
             return {"error": "Place not found"}, 404
 
-        if not is_admin and str(place.owner.id) != str(current_user_id):
+        if not principal.can_edit(place.owner_id):
             return {"error": "Unauthorized action"}, 403
         try:
             updated = facade.update_place(
-                current_user_id, place_id, payload, is_admin=is_admin)
+                principal.id, place_id, payload, is_admin=principal.is_admin)
             return updated.to_dict(), 200
+        except KeyError as err:
+            return {"error": str(err)}, 404
         except ValueError as err:
             return {"error": str(err)}, 400
 
@@ -152,21 +357,16 @@ class PlaceAmenities(Resource):
     @api.response(403, "Unauthorized action")
     @api.response(404, "Place or amenity not found")
     def post(self, place_id):
-        current_user_id = get_jwt_identity()
-        is_admin = get_jwt().get("is_admin", False)
+        principal = current_principal()
         amenity_ids = api.payload.get("amenities", [])
         try:
             place = facade.get_place(place_id)
             if not place:
                 raise KeyError("Place not found")
-            if not is_admin and str(place.owner.id) != str(current_user_id):
+            if not principal.can_edit(place.owner_id):
                 return {"error": "Unauthorized action"}, 403
 
-            for aid in amenity_ids:
-                amenity = facade.get_amenity(aid)
-                if not amenity:
-                    raise KeyError(f"Amenity not found: {aid}")
-                place.add_amenity(amenity)
+            facade.add_place_amenities(place, amenity_ids)
             return {"message": "Amenities added successfully"}, 200
         except KeyError as error:
             return {"error": str(error)}, 404
@@ -179,7 +379,8 @@ class PlaceReviewList(Resource):
     @api.response(200, "Reviews retrieved successfully")
     @api.response(404, "Place not found")
     def get(self, place_id):
-        place = facade.get_place(place_id)
-        if not place:
-            return {"error": "Place not found"}, 404
-        return [r.to_dict() for r in place.reviews], 200
+        try:
+            reviews = facade.get_reviews_by_place(place_id, REVIEW.columns)
+        except KeyError as error:
+            return {"error": str(error)}, 404
+        return json_response(REVIEW.rows(reviews))
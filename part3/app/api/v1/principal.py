@@ -0,0 +1,36 @@
+"""
+The authenticated caller of a request, built once from the JWT.
+
+The access token carries the user id (identity) and is_admin (claim),
+so authorization needs no database lookup: ownership is a comparison
+with the owner_id / user_id column of the resource, not with a loaded
+owner or author object.
+"""
+from collections import namedtuple
+from flask import request
+from flask_jwt_extended import get_jwt, get_jwt_identity
+
+
+class Principal(namedtuple("Principal", ["id", "is_admin"])):
+    __slots__ = ()
+
+    def owns(self, owner_id):
+        """True when owner_id (a foreign key column value) is this user"""
+        return owner_id is not None and str(owner_id) == self.id
+
+    def can_edit(self, owner_id):
+        """Owner or admin"""
+        return self.is_admin or self.owns(owner_id)
+
+
+def current_principal():
+    """
+    Principal of the current request (after @jwt_required()), cached in
+    the WSGI environ so that it lives exactly as long as the request
+    """
+    principal = request.environ.get("hbnb.principal")
+    if principal is None:
+        principal = Principal(str(get_jwt_identity()),
+                              bool(get_jwt().get("is_admin", False)))
+        request.environ["hbnb.principal"] = principal
+    return principal
@@ -1,7 +1,14 @@
 from flask_restx import Namespace, Resource, fields
 from app.services import facade
+from app.api.v1.pagination import PAGE_PARAMS, page_args, page_response
+from app.api.v1.conditional import (PAGE_COLUMNS, collection_version, conditional,
+                                     entity_version, page_version)
+from app.api.v1.serializers import REVIEW, json_response
+from app.api.v1.streaming import (STREAM_PARAMS, stream_batch_size,
+                                   stream_requested, stream_response)
 from flask import request
-from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from flask_jwt_extended import jwt_required
+from app.api.v1.principal import current_principal
 
 api = Namespace('reviews', description='Review operations')
 
@@ -33,7 +40,7 @@ class ReviewList(Resource):
         """
         Register a new review
         """
-        current_user = get_jwt_identity()
+        current_user = current_principal().id
         data = api.payload
 
         # If place must exist
@@ -42,34 +49,56 @@ class ReviewList(Resource):
             return {'error': 'Place not found'}, 404
 
         # Impossible to value your own home
-        if str(place.owner.id) == str(current_user):
+        if current_principal().owns(place.owner_id):
             return {'error': 'You cannot review your own place.'}, 400  # 1st code required by the instructions
 
-        # Not possible to post a review a 2nd time the same property
-        if facade.user_already_reviewed(current_user, place.id):
-            return {'error': 'You have already reviewed this place'}, 400  # 2nd code required by the instructions
-
         # For create review
-        review = facade.create_review(current_user, data)
+        # Not possible to post a review a 2nd time the same property: checked by the facade
+        try:
+            review = facade.create_review(current_user, data)
+        except KeyError as error:
+            return {'error': str(error)}, 404
+        except ValueError as error:
+            return {'error': str(error)}, 400  # 2nd code required by the instructions
         return review.to_dict(), 201
 
+    @api.doc(params={**PAGE_PARAMS, **STREAM_PARAMS})
     @api.response(200, 'List of reviews retrieved successfully')
+    @api.response(400, 'Invalid pagination parameters')
     def get(self):
         """
-        Public: list all reviews
+        Public: list all reviews (one page with ?limit=&cursor=,
+        everything as NDJSON with ?stream=1)
         """
-        return [r.to_dict() for r in facade.get_all_reviews()], 200
+        if stream_requested():
+            return stream_response(facade.stream_reviews(stream_batch_size(), REVIEW.columns),
+                                   REVIEW.from_row)
+        try:
+            page = page_args()
+
+            if page is not None:
+                reviews, next_cursor = facade.get_reviews_page(
+                    *page, columns=REVIEW.columns + PAGE_COLUMNS)
+                return conditional(page_version(REVIEW.model, reviews), lambda: json_response(
+                    page_response(reviews, next_cursor, REVIEW.from_row)))
+        except ValueError as error:
+            return {'error': str(error)}, 400
+
+        return conditional(collection_version(facade.reviews_version()),
+                           lambda: json_response(
+                               REVIEW.rows(facade.get_all_reviews(REVIEW.columns))))
 
 
 @api.route('/<review_id>')
 class ReviewResource(Resource):
+    @api.response(304, 'Not modified (If-None-Match / If-Modified-Since)')
     @api.response(404, 'Review not found')
     def get(self, review_id):
         """Public: get one review by ID"""
         review = facade.get_review(review_id)
         if not review:
             return {'error': 'Review not found'}, 404
-        return review.to_dict()
+        return conditional(entity_version(review), lambda: REVIEW.one(review))
 
     @jwt_required()
     @api.doc(security='Bearer Auth')
@@ -81,20 +110,19 @@ class ReviewResource(Resource):
         """
         Update your own review
         """
-        current_user = get_jwt_identity()
-        is_admin = get_jwt().get("is_admin", False)
+        principal = current_principal()
         review = facade.get_review(review_id)
         if not review:
             return {'error': 'Review not found'}, 404
 
-        if not is_admin and str(review.user.id) != str(current_user):
+        if not principal.can_edit(review.user_id):
             return {'error': 'Unauthorized action'}, 403
 
         payload = request.get_json()
         # user_id & place_id must not be altered
         payload.pop('place_id', None)
         facade.update_review(
-            current_user, review_id, payload, is_admin=is_admin)
+            principal.id, review_id, payload, is_admin=principal.is_admin)
         return review.to_dict(), 200
 
     @jwt_required()
@@ -104,15 +132,14 @@ class ReviewResource(Resource):
     @api.response(404, 'Review not found')
     def delete(self, review_id):
         """Delete your own review"""
-        current_user = get_jwt_identity()
-        is_admin = get_jwt().get("is_admin", False)
+        principal = current_principal()
         review = facade.get_review(review_id)
         if not review:
             return {'error': 'Review not found'}, 404
 
-        if not is_admin and str(review.user.id) != str(current_user):
+        if not principal.can_edit(review.user_id):
             return {'error': 'Unauthorized action'}, 403
 
         facade.delete_review(
-            current_user, review_id, is_admin=is_admin)
+            principal.id, review_id, is_admin=principal.is_admin)
         return {'message': 'Review deleted successfully'}, 204
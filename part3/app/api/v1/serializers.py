@@ -0,0 +1,84 @@
+"""
+Compiled response serializers.
+
+A Serializer is the field plan of one view of a model: the columns to
+read and, for every output key, a column or a function of columns. The
+plan is compiled once into two functions building the output dict with
+literal keys, one reading row tuples (rows of Serializer.columns, no ORM
+instance needed) and one reading attributes of instances or named
+tuples. Bodies are encoded with orjson when it is installed.
+"""
+from flask import Response
+from app.models.amenity import Amenity
+from app.models.place import Place
+from app.models.review import Review
+from app.models.user import User
+
+try:
+    import orjson
+
+    def dumps(data):
+        return orjson.dumps(data)
+except ImportError:  # pragma: no cover - stdlib fallback
+    import json
+
+    def dumps(data):
+        return json.dumps(data, separators=(",", ":")).encode()
+
+
+def json_response(data):
+    """Response with the JSON body already encoded (Flask-RESTx passes it through)"""
+    return Response(dumps(data), mimetype="application/json")
+
+
+class Serializer:
+    def __init__(self, model, fields):
+        """
+        fields: output keys in order; a key is a column name, or a
+        (key, function, column names) tuple for a computed value
+        """
+        self.model = model
+        self.fields = [(field, None, (field,)) if isinstance(field, str) else field
+                       for field in fields]
+        names = []
+        for _, _, sources in self.fields:
+            names.extend(name for name in sources if name not in names)
+        self.names = tuple(names)
+        # what to SELECT for the row path, in row tuple order
+        self.columns = [getattr(model, name) for name in names]
+        index = {name: i for i, name in enumerate(names)}
+        self.from_row = self._compile(lambda name: f"row[{index[name]}]")
+        self.from_object = self._compile(lambda name: f"row.{name}")
+
+    def _compile(self, read):
+        namespace = {}
+        items = []
+        for key, function, sources in self.fields:
+            if function is None:
+                expression = read(sources[0])
+            else:
+                namespace[f"_{key}"] = function
+                expression = f"_{key}({', '.join(read(name) for name in sources)})"
+            items.append(f"{key!r}: {expression}")
+        return eval(f"lambda row: {{{', '.join(items)}}}", namespace)
+
+    def rows(self, rows):
+        """Dicts of row tuples of self.columns"""
+        return list(map(self.from_row, rows))
+
+    def many(self, objects):
+        """Dicts of instances (or named tuples with the column names)"""
+        return list(map(self.from_object, objects))
+
+    def one(self, obj):
+        return self.from_object(obj)
+
+
+USER = Serializer(User, ["id", "first_name", "last_name", "email"])
+AMENITY = Serializer(Amenity, ["id", "name"])
+REVIEW = Serializer(Review, ["id", "text", "rating", "place_id", "user_id"])
+# short representation of the places listing
+PLACE_SUMMARY = Serializer(Place, [
+    "id", "title", "price", "review_count",
+    ("average_rating", Place.rating_average, ("review_count", "rating_sum")),
+])
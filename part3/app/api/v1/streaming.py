@@ -0,0 +1,41 @@
+from flask import Response, current_app, request, stream_with_context
+from app.api.v1.serializers import dumps
+
+NDJSON = 'application/x-ndjson'
+
+# Query string parameter documented on every streamable list endpoint
+STREAM_PARAMS = {
+    'stream': f'1 to stream the full list as NDJSON (same as Accept: {NDJSON})'
+}
+
+
+def stream_requested():
+    """True when the client asked for the NDJSON export of a list"""
+    if request.args.get('stream') in ('1', 'true'):
+        return True
+    return request.accept_mimetypes.best == NDJSON
+
+
+def stream_batch_size():
+    return current_app.config['STREAM_BATCH_SIZE']
+
+
+def stream_response(rows, serialize):
+    """
+    One JSON document per line, written while the rows are fetched.
+    Lines are sent by chunks of STREAM_BATCH_SIZE rows, so neither the
+    rows nor the body are ever held in memory as a whole.
+    """
+    batch_size = stream_batch_size()
+
+    def generate():
+        lines = []
+        for row in rows:
+            lines.append(dumps(serialize(row)))
+            if len(lines) == batch_size:
+                yield b'\n'.join(lines) + b'\n'
+                lines = []
+        if lines:
+            yield b'\n'.join(lines) + b'\n'
+
+    return Response(stream_with_context(generate()), mimetype=NDJSON)
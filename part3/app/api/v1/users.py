@@ -1,6 +1,14 @@
 from flask_restx import Namespace, Resource, fields
 from app.services import facade
-from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from app.hashing import HashingPoolBusy
+from app.api.v1.pagination import PAGE_PARAMS, page_args, page_response
+from app.api.v1.conditional import (PAGE_COLUMNS, collection_version, conditional,
+                                     entity_version, page_version)
+from app.api.v1.serializers import USER, json_response
+from app.api.v1.streaming import (STREAM_PARAMS, stream_batch_size,
+                                   stream_requested, stream_response)
+from flask_jwt_extended import jwt_required, get_jwt
+from app.api.v1.principal import current_principal
 
 authorizations = {
         'Bearer Auth': {
@@ -56,28 +64,48 @@ class UserList(Resource):
             # Simple answer: no password
             return {'id': str(new_user.id), 'message': 'User created'}, 201
 
+        except HashingPoolBusy:
+            raise  # 503 + Retry-After from the API error handler
         except Exception as error:
             return {'error': str(error)}, 400
 
+    @api.doc(params={**PAGE_PARAMS, **STREAM_PARAMS})
     @api.response(200, 'List of users retrieved successfully')
+    @api.response(400, 'Invalid pagination parameters')
     def get(self):
         """
-        Get all users (without passwords).
+        Get all users (without passwords), one page with ?limit=&cursor=
+        or the whole list as NDJSON with ?stream=1
         """
-        users = facade.get_users()
-        return [user.to_dict() for user in users], 200
+        if stream_requested():
+            return stream_response(facade.stream_users(stream_batch_size(), USER.columns),
+                                   USER.from_row)
+        try:
+            page = page_args()
+
+            if page is not None:
+                users, next_cursor = facade.get_users_page(
+                    *page, columns=USER.columns + PAGE_COLUMNS)
+                return conditional(page_version(USER.model, users), lambda: json_response(
+                    page_response(users, next_cursor, USER.from_row)))
+        except ValueError as error:
+            return {'error': str(error)}, 400
+
+        return conditional(collection_version(facade.users_version()),
+                           lambda: json_response(USER.rows(facade.get_users(USER.columns))))
 
 
 @api.route('/<user_id>')
 class UserResource(Resource):
     @api.response(200, 'User details retrieved successfully')
+    @api.response(304, 'Not modified (If-None-Match / If-Modified-Since)')
     @api.response(404, 'User not found')
     def get(self, user_id):
         """Retrieve one user (no password returned)."""
         user = facade.get_user(user_id)
         if not user:
             return {'error': 'User not found'}, 404
-        return user.to_dict(), 200
+        return conditional(entity_version(user), lambda: USER.one(user))
 
     @jwt_required()
     @api.doc(security='Bearer Auth')
@@ -88,9 +116,9 @@ class UserResource(Resource):
     @api.response(403, 'Unauthorized action') # 2nd code required by the instructions
     def put(self, user_id):
         try:
-            current_user = get_jwt_identity()
-            is_admin = get_jwt().get('is_admin', False)
-            if str(current_user) != str(user_id) and is_admin is False:
+            principal = current_principal()
+            current_user, is_admin = principal.id, principal.is_admin
+            if not principal.can_edit(user_id):
                 return {'error': 'Unauthorized action'}, 403
 
             payload = api.payload or {}
@@ -105,5 +133,7 @@ class UserResource(Resource):
             updated = facade.update_user(current_user, user_id, payload, is_admin=is_admin)
             return updated.to_dict(), 200
         
+        except HashingPoolBusy:
+            raise
         except Exception as e:
             return {'error': str(e)}, 500
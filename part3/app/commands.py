@@ -0,0 +1,126 @@
+import click
+from flask.cli import AppGroup
+from sqlalchemy.exc import IntegrityError
+from app.extensions import db
+from app.services import facade, id_migration
+from app.services.search import place_search
+
+# flask hbnb <command>
+hbnb_cli = AppGroup('hbnb', help='HBnB maintenance commands')
+
+
+@hbnb_cli.command('import')
+@click.argument('source', type=click.File('rb'))
+@click.option('--batch-size', default=5000, show_default=True,
+              help='Rows inserted per executemany() and commit')
+def import_rows(source, batch_size):
+    """Import amenities, places and reviews from an NDJSON file ('-' for stdin)"""
+    report = facade.import_ndjson(source, batch_size=batch_size)
+    inserted = ', '.join(f"{count} {kind}" for kind, count in report['inserted'].items())
+    click.echo(f"{report['rows']} rows read: inserted {inserted}, "
+               f"{report['error_count']} errors")
+    for error in report['errors']:
+        click.echo(f"line {error['line']}: {error['error']}", err=True)
+
+
+@hbnb_cli.command('repair-ratings')
+def repair_ratings():
+    """Recompute review_count and rating_sum of every place"""
+    count = facade.recompute_ratings()
+    click.echo(f"Rating aggregates rebuilt ({count} places with reviews)")
+
+
+@hbnb_cli.command('rebuild-geohash')
+@click.option('--batch-size', default=5000, show_default=True,
+              help='Places updated per UPDATE and commit')
+def rebuild_geohash(batch_size):
+    """Compute the missing geohash of places (GET /places/nearby)"""
+    count = facade.backfill_geohash(batch_size)
+    click.echo(f"Geohash computed for {count} places")
+
+
+@hbnb_cli.command('rebuild-search')
+def rebuild_search():
+    """Rebuild the full-text index of the places (GET /places/search)"""
+    count = place_search.rebuild()
+    click.echo(f"Search index rebuilt ({count} places, {place_search.stats()['backend']})")
+
+
+def _index_names(inspector, table_name):
+    if db.engine.dialect.name == 'sqlite':
+        # the reflection skips the expression indexes (ix_places_rating)
+        with db.engine.connect() as connection:
+            return set(connection.execute(db.text(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :table"),
+                {"table": table_name}).scalars())
+    return {index['name'] for index in inspector.get_indexes(table_name)}
+
+
+def _missing_unique_indexes(inspector, table):
+    """
+    Unique indexes standing for the unique constraints of a model that
+    the table lacks (SQLite cannot add a constraint to a table)
+    """
+    constraints = [constraint for constraint in table.constraints
+                   if isinstance(constraint, db.UniqueConstraint)]
+    if not constraints:
+        return
+    indexes = inspector.get_indexes(table.name)
+    unique = {tuple(constraint['column_names'])
+              for constraint in inspector.get_unique_constraints(table.name)}
+    unique |= {tuple(index['column_names']) for index in indexes if index['unique']}
+    # built on a copy of the table: an index made on its columns would
+    # join the metadata, and create_all() would create it again
+    copy = table.to_metadata(db.MetaData())
+    for constraint in constraints:
+        names = tuple(column.name for column in constraint.columns)
+        if names in unique:
+            continue
+        name = constraint.name or f"uq_{table.name}_{'_'.join(names)}"
+        yield db.Index(name, *(copy.c[column] for column in names), unique=True)
+
+
+@hbnb_cli.command('create-indexes')
+def create_indexes():
+    """
+    Create the indexes of the models missing from an existing database,
+    and the unique constraints as unique indexes
+    """
+    inspector = db.inspect(db.engine)
+    created = []
+    failed = False
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = _index_names(inspector, table.name)
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(db.engine)
+                created.append(index.name)
+        for index in _missing_unique_indexes(inspector, table):
+            try:
+                index.create(db.engine)
+            except IntegrityError:
+                # rows written before the constraint break it
+                click.echo(f"{index.name}: duplicate rows in {table.name}, "
+                           f"remove them and run the command again", err=True)
+                failed = True
+            else:
+                created.append(index.name)
+    click.echo(f"{len(created)} indexes created {', '.join(sorted(created))}".rstrip())
+    if failed:
+        raise click.ClickException("some unique indexes could not be created")
+
+
+@hbnb_cli.command('migrate-ids')
+@click.argument('source_url')
+@click.option('--batch-size', default=10000, show_default=True,
+              help='Rows read and inserted per round trip')
+def migrate_ids(source_url, batch_size):
+    """Copy a database with text ids (SOURCE_URL) into the configured one, with binary ids"""
+    try:
+        copied = id_migration.migrate_ids(source_url, batch_size=batch_size)
+    except ValueError as error:
+        raise click.ClickException(str(error))
+    for table, count in copied.items():
+        click.echo(f"{table}: {count} rows")
@@ -4,10 +4,16 @@ from flask_bcrypt import Bcrypt
 from functools import wraps
 from flask_jwt_extended import verify_jwt_in_request, get_jwt
 from flask import jsonify
+from app.hashing import HashingPool
+from app.persistence.cache import EntityCache
+from app.persistence.routing import ReadReplica, RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 jwt = JWTManager()
 bcrypt = Bcrypt()
+hashing_pool = HashingPool(bcrypt)
+entity_cache = EntityCache(db)
+read_replica = ReadReplica(db)
 
 def admin_required(fn):
     """
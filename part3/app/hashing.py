@@ -0,0 +1,87 @@
+"""
+Bounded pool running bcrypt off the request thread.
+
+bcrypt releases the GIL, so a small pool of threads hashes in
+parallel while the number of in-flight hashes stays bounded: when the
+workers and the waiting queue are all taken, HashingPoolBusy is raised
+and the API answers 503 with a Retry-After header instead of piling
+up requests behind a burst of logins.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, has_app_context
+
+
+class HashingPoolBusy(Exception):
+    """Every worker and queue slot of the hashing pool is taken"""
+
+    def __init__(self, retry_after):
+        super().__init__("Server busy, retry later")
+        self.retry_after = retry_after
+
+
+class _PoolState:
+    def __init__(self, workers, queue_size, retry_after):
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="hbnb-hash")
+        self.slots = threading.BoundedSemaphore(workers + queue_size)
+        self.retry_after = retry_after
+
+
+class HashingPool:
+    def __init__(self, bcrypt, app=None):
+        self.bcrypt = bcrypt
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('HASH_POOL_WORKERS', 4)
+        app.config.setdefault('HASH_POOL_QUEUE_SIZE', 32)
+        app.config.setdefault('HASH_POOL_RETRY_AFTER', 1)
+        app.extensions['hashing_pool'] = _PoolState(
+            app.config['HASH_POOL_WORKERS'],
+            app.config['HASH_POOL_QUEUE_SIZE'],
+            app.config['HASH_POOL_RETRY_AFTER'])
+
+    def _state(self):
+        if not has_app_context():
+            return None
+        return current_app.extensions.get('hashing_pool')
+
+    def log_rounds(self):
+        """bcrypt cost configured for the current app"""
+        if has_app_context():
+            return current_app.config.get('BCRYPT_LOG_ROUNDS', 12)
+        return self.bcrypt._log_rounds
+
+    def run(self, fn, *args):
+        """
+        Run fn(*args) on the pool and wait for its result.
+        Runs inline when there is no app (e.g. models used in a shell).
+        """
+        state = self._state()
+        if state is None:
+            return fn(*args)
+        if not state.slots.acquire(blocking=False):
+            raise HashingPoolBusy(state.retry_after)
+        try:
+            future = state.executor.submit(fn, *args)
+        except BaseException:
+            state.slots.release()
+            raise
+        future.add_done_callback(lambda _: state.slots.release())
+        return future.result()
+
+    def hash(self, password):
+        rounds = self.log_rounds()
+        return self.run(self.bcrypt.generate_password_hash, password, rounds).decode('utf-8')
+
+    def verify(self, pw_hash, password):
+        return self.run(self.bcrypt.check_password_hash, pw_hash, password)
+
+    def needs_rehash(self, pw_hash):
+        """True when a stored hash was made with another cost than configured"""
+        try:
+            return int(pw_hash.split('$')[2]) != self.log_rounds()
+        except (IndexError, ValueError):
+            return True
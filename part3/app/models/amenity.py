@@ -4,6 +4,9 @@ from sqlalchemy.orm import validates
 
 class Amenity(BaseModel):
 	__tablename__ = "amenities"
+	__table_args__ = (
+		db.Index('ix_amenities_created_at_id', 'created_at', 'id'),
+	)
 
 	name = db.Column(db.String(50), nullable=False, unique=True)
 
@@ -1,15 +1,21 @@
 from app.extensions import db
-import uuid
+from app.models import ids
 from datetime import datetime
+from sqlalchemy.orm import validates
 
 class BaseModel(db.Model):
     __abstract__ = True  # This ensures SQLAlchemy does not create a table for BaseModel
 
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = db.Column(ids.UUID, primary_key=True, default=ids.uuid7)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
+    @validates('id')
+    def validate_id(self, key, value):
+        """Ids given by a client (bulk import) must be UUIDs"""
+        return ids.canonical(value)
+
     def save(self):
         """Update the updated_at timestamp whenever the object is modified"""
         self.updated_at = datetime.utcnow()
@@ -0,0 +1,138 @@
+"""
+Geohash helpers used to index Place coordinates.
+
+A geohash is a base32 string where every character refines the cell
+of the previous one, so places in the same cell share a prefix and a
+prefix lookup is a range scan on the indexed places.geohash column.
+"""
+import math
+import numpy as np
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+PRECISION = 9  # ~5 m x 5 m cells
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+MAX_CELLS = 32  # most prefixes used to cover a search circle
+
+
+def _spread(value):
+    """Insert a zero bit before every bit of a 32-bit integer"""
+    value = (value | (value << 16)) & 0x0000FFFF0000FFFF
+    value = (value | (value << 8)) & 0x00FF00FF00FF00FF
+    value = (value | (value << 4)) & 0x0F0F0F0F0F0F0F0F
+    value = (value | (value << 2)) & 0x3333333333333333
+    value = (value | (value << 1)) & 0x5555555555555555
+    return value
+
+
+def encode(latitude, longitude, precision=PRECISION):
+    """
+    Geohash of a point. Both coordinates are quantized to integers and
+    interleaved in one go (longitude first), which gives the same cells
+    as bisecting the ranges bit by bit, a few times faster.
+    """
+    bits = 5 * precision
+    lon_bits = (bits + 1) // 2
+    lat_bits = bits // 2
+    lon = min(int((longitude + 180.0) / 360.0 * (1 << lon_bits)), (1 << lon_bits) - 1)
+    lat = min(int((latitude + 90.0) / 180.0 * (1 << lat_bits)), (1 << lat_bits) - 1)
+    if bits % 2:
+        code = _spread(lon) | (_spread(lat) << 1)
+    else:
+        code = (_spread(lon) << 1) | _spread(lat)
+    return "".join([BASE32[(code >> shift) & 31] for shift in range(bits - 5, -1, -5)])
+
+
+def cell_size(precision):
+    """(height, width) in degrees of a cell of the given precision"""
+    lat_bits = 5 * precision // 2
+    lon_bits = 5 * precision - lat_bits
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def bounds(geohash):
+    """(south, north, west, east) in degrees of the cell of a geohash"""
+    south, north, west, east = -90.0, 90.0, -180.0, 180.0
+    even = True  # longitude first
+    for char in geohash:
+        code = BASE32.index(char)
+        for shift in range(4, -1, -1):
+            bit = code >> shift & 1
+            if even:
+                middle = (west + east) / 2
+                west, east = (middle, east) if bit else (west, middle)
+            else:
+                middle = (south + north) / 2
+                south, north = (middle, north) if bit else (south, middle)
+            even = not even
+    return south, north, west, east
+
+
+def cell_distance_km(latitude, longitude, geohash):
+    """
+    Great-circle distance from a point to the closest point of a cell,
+    0 inside it. Every place of the cell is at least this far.
+    """
+    south, north, west, east = bounds(geohash)
+    # longitude gap to the cell, across the antimeridian if shorter
+    gap_west = (west - longitude) % 360.0
+    gap_east = (longitude - east) % 360.0
+    if west <= longitude <= east or gap_west + gap_east >= 360.0:
+        if south <= latitude <= north:
+            return 0.0
+        gap = south - latitude if latitude < south else latitude - north
+        return math.radians(gap) * EARTH_RADIUS_KM
+    edge = west if gap_west < gap_east else east
+    d_lon = math.radians(min(gap_west, gap_east))
+    if d_lon >= math.pi / 2:
+        return 0.0  # no closed form below; never pruned
+    # closest point of the edge meridian, then clamped to the cell
+    closest = math.degrees(math.atan(math.tan(math.radians(latitude)) / math.cos(d_lon)))
+    closest = min(max(closest, south), north)
+    return float(haversine_km(latitude, longitude, np.array([closest]), np.array([edge]))[0])
+
+
+def cover_prefixes(latitude, longitude, radius_km):
+    """
+    Geohash prefixes whose cells cover the bounding box of the circle,
+    at the finest precision needing at most MAX_CELLS cells.
+    """
+    radius_deg = radius_km / KM_PER_DEGREE
+    lat_min = max(latitude - radius_deg, -90.0)
+    lat_max = min(latitude + radius_deg, 90.0)
+    max_lat = max(abs(lat_min), abs(lat_max))
+    if max_lat >= 90:
+        lon_half = 180.0  # the circle contains a pole
+    else:
+        lon_half = min(radius_deg / math.cos(math.radians(max_lat)), 180.0)
+
+    for precision in range(PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        total_rows = round(180 / height)
+        total_columns = round(360 / width)
+        first_row = math.floor((lat_min + 90) / height)
+        last_row = min(math.floor((lat_max + 90) / height), total_rows - 1)
+        first_column = math.floor((longitude - lon_half + 180) / width)
+        last_column = math.floor((longitude + lon_half + 180) / width)
+        columns = min(last_column - first_column + 1, total_columns)
+        if (last_row - first_row + 1) * columns <= MAX_CELLS:
+            break
+
+    prefixes = set()
+    for row in range(first_row, last_row + 1):
+        lat = (row + 0.5) * height - 90
+        for column in range(first_column, first_column + columns):
+            # columns past the antimeridian wrap around
+            lon = (column % total_columns + 0.5) * width - 180
+            prefixes.add(encode(lat, lon, precision))
+    return prefixes
+
+
+def haversine_km(latitude, longitude, latitudes, longitudes):
+    """Great-circle distances from one point to arrays of points"""
+    lat1 = math.radians(latitude)
+    lat2 = np.radians(latitudes)
+    d_lat = lat2 - lat1
+    d_lon = np.radians(longitudes) - math.radians(longitude)
+    a = np.sin(d_lat / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin(d_lon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
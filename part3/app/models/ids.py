@@ -0,0 +1,138 @@
+"""
+Primary keys: time-ordered UUIDv7 values, stored in 16 bytes.
+
+The application only ever sees ids as canonical UUID text
+("0192f0c4-7d1e-7a3b-9c4e-2f8a6b1d3e5f"): in the models, the JSON of
+the API, the cache and the cursors. The UUID column type converts
+at the database boundary, according to the ID_STORAGE setting of the
+engine:
+
+- 'binary' (default): 16 raw bytes (BLOB on SQLite, the native uuid
+  type on PostgreSQL) instead of 36 characters, in every primary key,
+  foreign key and index entry;
+- 'text': the 36-character strings of the databases created before,
+  until they are converted with `flask hbnb migrate-ids`.
+
+UUIDv7 starts with the creation time in milliseconds, so new rows are
+appended at the right edge of the primary key B-tree instead of being
+scattered over it like random uuid4 values, and the pages written by
+an insert stay hot in the cache.
+"""
+import os
+import threading
+import time
+from sqlalchemy import LargeBinary, String, Uuid
+from sqlalchemy.types import TypeDecorator
+
+STORAGES = ('binary', 'text')
+
+_lock = threading.Lock()
+_last_ms = 0
+_counter = 0
+
+
+def _format(hex_digits):
+    h = hex_digits
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
+def uuid7():
+    """
+    New UUIDv7 (RFC 9562) as text: 48-bit Unix time in ms, 12-bit
+    counter, 62 random bits. The counter starts at a random value in
+    each millisecond and is incremented within it, so the ids of a
+    process are strictly increasing.
+    """
+    global _last_ms, _counter
+    rand = int.from_bytes(os.urandom(10), 'big')
+    with _lock:
+        ms = time.time_ns() // 1000000
+        if ms > _last_ms:
+            _last_ms, _counter = ms, rand >> 69  # 0..0x7ff: room to count up
+        else:
+            _counter += 1
+            if _counter > 0xfff:  # counter exhausted: borrow the next millisecond
+                _last_ms, _counter = _last_ms + 1, 0
+        ms, counter = _last_ms, _counter
+    value = (ms << 80 | 0x7 << 76 | counter << 64
+             | 0b10 << 62 | rand & 0x3fffffffffffffff)
+    return _format(f"{value:032x}")
+
+
+def encode(text):
+    """16 bytes of a canonical UUID string; ValueError when malformed"""
+    if (not isinstance(text, str) or len(text) != 36
+            or text[8] != '-' or text[13] != '-' or text[18] != '-' or text[23] != '-'):
+        raise ValueError(f"Invalid id: {text!r}")
+    raw = bytes.fromhex(text.replace('-', ''))  # ValueError on non-hex digits
+    if len(raw) != 16:
+        raise ValueError(f"Invalid id: {text!r}")
+    return raw
+
+
+def decode(raw):
+    """Canonical (lowercase) UUID string of 16 bytes"""
+    return _format(raw.hex())
+
+
+def canonical(text):
+    """Lowercase form of a UUID string; ValueError when malformed"""
+    return decode(encode(text))
+
+
+def set_storage(engine, storage):
+    """Storage of the ids on the connections of engine ('binary' or 'text')"""
+    if storage not in STORAGES:
+        raise ValueError(f"Unknown ID_STORAGE: {storage} (expected one of {STORAGES})")
+    engine.dialect.hbnb_id_storage = storage
+
+
+def storage_of(dialect):
+    return getattr(dialect, 'hbnb_id_storage', 'binary')
+
+
+class UUID(TypeDecorator):
+    """
+    Column type of the ids and of the foreign keys to them. Values are
+    UUID strings on the Python side. A malformed string binds as NULL:
+    it matches no row (GET /places/not-an-id is a 404) and cannot be
+    inserted, primary and foreign keys being NOT NULL.
+    """
+    impl = String(36)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if storage_of(dialect) == 'text':
+            return dialect.type_descriptor(String(36))
+        if dialect.supports_native_uuid:
+            return dialect.type_descriptor(Uuid(as_uuid=False))
+        return dialect.type_descriptor(LargeBinary(16))
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        storage = storage_of(dialect)
+        if storage == 'text':
+            return value
+        try:
+            raw = encode(value)
+        except (ValueError, TypeError):
+            return None
+        return decode(raw) if dialect.supports_native_uuid else raw
+
+    def process_result_value(self, value, dialect):
+        if isinstance(value, bytes):
+            return decode(value)
+        return value
+
+
+def init_app(app, db):
+    """
+    Set ID_STORAGE on the engines of app. Must run after db.init_app,
+    before the first statement (the type processors are cached per
+    engine).
+    """
+    storage = app.config.setdefault('ID_STORAGE', 'binary')
+    with app.app_context():
+        for engine in db.engines.values():
+            set_storage(engine, storage)
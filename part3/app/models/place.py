@@ -1,36 +1,53 @@
 from .baseclass import BaseModel
 from .user import User
+from . import geo, ids
 from app.extensions import db
 from sqlalchemy.orm import validates
 
 # Association table between place and amenity
+# (the primary key serves place -> amenities, the index amenity -> places)
 place_amenity = db.Table('place_amenity',
-    db.Column('place_id', db.String(36), db.ForeignKey('places.id'), primary_key=True),
-    db.Column('amenity_id', db.String(36), db.ForeignKey('amenities.id'), primary_key=True)
+    db.Column('place_id', ids.UUID, db.ForeignKey('places.id'), primary_key=True),
+    db.Column('amenity_id', ids.UUID, db.ForeignKey('amenities.id'), primary_key=True),
+    db.Index('ix_place_amenity_amenity_id', 'amenity_id')
  )
 
 
 class Place(BaseModel):
     __tablename__ = "places"
+    __table_args__ = (
+        db.Index('ix_places_created_at_id', 'created_at', 'id'),
+    )
 
     title = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text)
-    price = db.Column(db.Float, nullable=False)
-    latitude = db.Column(db.Float, nullable=False)
-    longitude = db.Column(db.Float, nullable=False)
-    owner_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
+    # indexed for the price and bounding-box filters of GET /places/
+    price = db.Column(db.Float, nullable=False, index=True)
+    latitude = db.Column(db.Float, nullable=False, index=True)
+    longitude = db.Column(db.Float, nullable=False, index=True)
+    # kept in sync by the latitude/longitude validators, see models/geo.py
+    geohash = db.Column(db.String(12), index=True)
+    # rating aggregates, maintained by the facade with every review write
+    review_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_sum = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # indexed: SQLite does not index foreign keys (places of an owner)
+    owner_id = db.Column(ids.UUID, db.ForeignKey('users.id'), nullable=False, index=True)
     # owner = db.relationship('User')
 
-    reviews = db.relationship('Review', backref='place', lazy=True)
+    # write-only: adding or removing a review never loads the others;
+    # review_list is the read side, eager loaded by the "detail" profile
+    reviews = db.relationship('Review', backref='place', lazy='write_only',
+                              passive_deletes=True)
+    review_list = db.relationship('Review', viewonly=True)
     amenities = db.relationship('Amenity', secondary=place_amenity, backref=db.backref('places', lazy=True))
 
     
     @validates('title')
     def validate_title(self, key, value):
-        if not value.strip():
-            raise ValueError("Title cannot be empty")
         if not isinstance(value, str):
             raise TypeError("Title must be a string")
+        if not value.strip():
+            raise ValueError("Title cannot be empty")
         super().is_max_length('title', value, 100)
         return value
     
@@ -53,6 +70,7 @@ class Place(BaseModel):
         if not isinstance(value, float):
             raise TypeError("Latitude must be a float")
         super().is_between("latitude", value, -90, 90)
+        self.update_geohash(value, self.longitude)
         return value
     
     @validates('longitude')
@@ -60,20 +78,38 @@ class Place(BaseModel):
         if not isinstance(value, float):
             raise TypeError("Longitude must be a float")
         super().is_between("longitude", value, -180, 180)
+        self.update_geohash(self.latitude, value)
         return value
 
+    def update_geohash(self, latitude, longitude):
+        """Recompute the geohash once both coordinates are known"""
+        if latitude is not None and longitude is not None:
+            self.geohash = geo.encode(latitude, longitude)
+
+    @staticmethod
+    def rating_average(review_count, rating_sum):
+        """Mean rating from the aggregates, None without review"""
+        if not review_count:
+            return None
+        return round(rating_sum / review_count, 2)
+
+    @property
+    def average_rating(self):
+        """Mean rating of the reviews, None without review"""
+        return self.rating_average(self.review_count, self.rating_sum)
+
     def add_review(self, review):
-        """Add a review to the place."""
-        self.reviews.append(review)
+        """Add a review to the place (O(1), the reviews are not loaded)."""
+        self.reviews.add(review)
     
     def delete_review(self, review):
-        """Add an amenity to the place."""
+        """Remove a review from the place."""
         self.reviews.remove(review)
 
     def add_amenity(self, amenity):
-        """Add an amenity to the place."""
-        self.amenities.append(amenity)
-        db.session.commit()
+        """Add an amenity to the place (committed by the caller)."""
+        if amenity not in self.amenities:
+            self.amenities.append(amenity)
 
     def to_dict(self):
         return {
@@ -83,7 +119,7 @@ class Place(BaseModel):
             'price': self.price,
             'latitude': self.latitude,
             'longitude': self.longitude,
-            'owner_id': self.owner.id
+            'owner_id': self.owner_id
         }
     
     def to_dict_list(self):
@@ -95,12 +131,25 @@ class Place(BaseModel):
             'latitude': self.latitude,
             'longitude': self.longitude,
             'owner_id': self.owner_id,
+            'review_count': self.review_count,
+            'average_rating': self.average_rating,
+            # public view of the owner: no email
             'owner': {
                 'id': self.owner.id,
                 'first_name': self.owner.first_name,
-                'last_name': self.owner.last_name,
-                'email': self.owner.email
+                'last_name': self.owner.last_name
             },
             'amenities': [{'id': a.id, 'name': a.name} for a in self.amenities],
-            'reviews': [review.to_dict() for review in self.reviews]
-        }
\ No newline at end of file
+            'reviews': [review.to_dict() for review in self.review_list]
+        }
+
+
+# Average rating in SQL, 0.0 without review: the sort key of
+# GET /places/?sort=rating, read in the order of ix_places_rating. The
+# constants are literals so that SQLite matches the ORDER BY and WHERE of
+# the queries with the indexed expression.
+RATING_ORDER = db.case(
+    (Place.review_count > db.literal_column("0"),
+     db.cast(Place.rating_sum, db.Float) / Place.review_count),
+    else_=db.literal_column("0.0"))
+db.Index('ix_places_rating', RATING_ORDER.desc(), Place.id.desc())
@@ -1,16 +1,24 @@
 from .baseclass import BaseModel
 from .place import Place
 from .user import User
+from . import ids
 from app.extensions import db
 from sqlalchemy.orm import validates
 
 class Review(BaseModel):
 	__tablename__ = "reviews"
-	
+	# One review per user and place, same as UNIQUE (user_id, place_id) in script_sql.sql
+	__table_args__ = (
+		db.UniqueConstraint('user_id', 'place_id', name='uq_reviews_user_place'),
+		db.Index('ix_reviews_created_at_id', 'created_at', 'id'),
+	)
+
 	text = db.Column(db.Text, nullable=False)
 	rating = db.Column(db.Integer, nullable=False)
-	place_id = db.Column(db.String(36), db.ForeignKey('places.id'), nullable=False)
-	user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
+	# indexed: reviews of a place (SQLite does not index foreign keys);
+	# user_id lookups use the (user_id, place_id) unique index
+	place_id = db.Column(ids.UUID, db.ForeignKey('places.id'), nullable=False, index=True)
+	user_id = db.Column(ids.UUID, db.ForeignKey('users.id'), nullable=False)
 
 	
 	@validates('text')
@@ -33,6 +41,6 @@ class Review(BaseModel):
 			'id': self.id,
 			'text': self.text,
 			'rating': self.rating,
-			'place_id': self.place.id,
-			'user_id': self.user.id
+			'place_id': self.place_id,
+			'user_id': self.user_id
 		}
\ No newline at end of file
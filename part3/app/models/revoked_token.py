@@ -0,0 +1,17 @@
+from datetime import datetime
+from app.extensions import db
+
+
+class RevokedToken(db.Model):
+    """
+    JWT revoked before its expiry (logout, refresh token rotation).
+    Rows are useless once expires_at is past: the token is rejected
+    as expired anyway.
+    """
+    __tablename__ = "revoked_tokens"
+
+    jti = db.Column(db.String(36), primary_key=True)
+    token_type = db.Column(db.String(10), nullable=False)
+    user_id = db.Column(db.String(36), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    revoked_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
@@ -1,19 +1,26 @@
 from .baseclass import BaseModel
 import re
-from app.extensions import db, bcrypt
+from app.extensions import db, hashing_pool
 from sqlalchemy.orm import validates
 
 class User(BaseModel):
     __tablename__ = "users"
-    
+    __table_args__ = (
+        db.Index('ix_users_created_at_id', 'created_at', 'id'),
+    )
+
     first_name = db.Column(db.String(50), nullable=False)
     last_name = db.Column(db.String(50), nullable=False)
     email = db.Column(db.String(120), nullable=False, unique=True)
     password = db.Column(db.String(128), nullable=False)
     is_admin = db.Column(db.Boolean, default=False)
 
-    places = db.relationship('Place', backref='owner', lazy=True)
-    reviews = db.relationship('Review', backref='user', lazy=True)
+    # write-only: adding or removing never loads the collection, reads
+    # go through queries (user.places.select(), PlaceRepository...)
+    places = db.relationship('Place', backref='owner', lazy='write_only',
+                             passive_deletes=True)
+    reviews = db.relationship('Review', backref='user', lazy='write_only',
+                              passive_deletes=True)
 
     
     @validates('first_name')
@@ -59,15 +66,15 @@ class User(BaseModel):
 
     def add_place(self, place):
         """
-        Add a place
+        Add a place (O(1), the places of the user are not loaded)
         """
-        self.places.append(place)
+        self.places.add(place)
 
     def add_review(self, review):
         """
-        Add a new review
+        Add a new review (O(1), the reviews of the user are not loaded)
         """
-        self.reviews.append(review)
+        self.reviews.add(review)
 
     def delete_review(self, review):
         """
@@ -77,15 +84,21 @@ class User(BaseModel):
 
     def hash_password(self, password):
         """
-        Hashes the password before storing it.
+        Hashes the password before storing it (on the hashing pool).
         """
-        return bcrypt.generate_password_hash(password).decode('utf-8')
+        return hashing_pool.hash(password)
 
     def verify_password(self, password):
         """
         Verifies if the provided password matches the hashed password.
         """
-        return bcrypt.check_password_hash(self.password, password)
+        return hashing_pool.verify(self.password, password)
+
+    def password_needs_rehash(self):
+        """
+        True when the stored hash cost differs from BCRYPT_LOG_ROUNDS.
+        """
+        return hashing_pool.needs_rehash(self.password)
 
     def to_dict(self):
         return {
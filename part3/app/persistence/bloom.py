@@ -0,0 +1,44 @@
+"""
+Bloom filter of strings: a bit array answering "maybe present" or
+"certainly absent" in O(k), k bit probes, without storing the strings.
+Entries cannot be removed; the filter is rebuilt instead.
+"""
+import math
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(int(capacity), 1)
+        bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.capacity = capacity
+        self.size = max(bits, 8)
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _start(self, key):
+        # double hashing on the 64 bits of hash(), which str objects cache
+        value = hash(key) & 0xFFFFFFFFFFFFFFFF
+        return (value & 0xFFFFFFFF) % self.size, ((value >> 32) | 1) % self.size or 1
+
+    def add(self, key):
+        position, step = self._start(key)
+        bits, size = self.bits, self.size
+        for _ in range(self.hashes):
+            bits[position >> 3] |= 1 << (position & 7)
+            position = (position + step) % size
+        self.count += 1
+
+    def __contains__(self, key):
+        # inlined probe loop: no generator or list per lookup
+        position, step = self._start(key)
+        bits, size = self.bits, self.size
+        for _ in range(self.hashes):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+            position = (position + step) % size
+        return True
+
+    def full(self):
+        """More entries than sized for: the false positive rate degrades"""
+        return self.count > self.capacity
@@ -0,0 +1,325 @@
+"""
+Read-through cache of SQLAlchemyRepository.get.
+
+Entities are cached as the plain values of their columns, one cache per
+table, and rebuilt as persistent instances of the current session on a
+hit (no SELECT). Two backends share the CacheBackend interface:
+
+- LRUCache: in-process, bounded by a capacity and a TTL per entry;
+- SharedCache: any Redis-like client (get, set with ex=, delete,
+  scan_iter), so that several workers share one cache. LocalSharedClient
+  is an in-process stand-in with the same methods.
+
+Entries are invalidated when the session flushes a change to the
+entity, again once it is committed, and by the repositories for bulk
+UPDATE statements the unit of work does not see.
+"""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+
+class CacheBackend:
+    """Interface of a cache of one table: key -> column values"""
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def stats(self):
+        raise NotImplementedError
+
+
+class LRUCache(CacheBackend):
+    """In-process LRU with a time to live (seconds) per entry"""
+
+    def __init__(self, capacity, ttl, clock=time.monotonic):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()  # key -> (expires_at, value)
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= self.clock():
+                del self.entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (self.clock() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "size": len(self.entries),
+            "capacity": self.capacity,
+            "ttl": self.ttl,
+        }
+
+
+class LocalSharedClient:
+    """
+    In-process stand-in for a Redis client: bytes values, expiry in
+    seconds and no eviction of its own (a real server evicts with its
+    maxmemory policy).
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.data = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.data.get(key)
+            if entry is None:
+                return None
+            if entry[0] is not None and entry[0] <= self.clock():
+                del self.data[key]
+                return None
+            return entry[1]
+
+    def set(self, key, value, ex=None):
+        with self.lock:
+            expires_at = self.clock() + ex if ex else None
+            self.data[key] = (expires_at, value)
+        return True
+
+    def delete(self, *keys):
+        with self.lock:
+            return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def scan_iter(self, match):
+        prefix = match.rstrip("*")
+        with self.lock:
+            keys = [key for key in self.data if key.startswith(prefix)]
+        return iter(keys)
+
+
+class SharedCache(CacheBackend):
+    """
+    Cache of one table in a shared store, under "<prefix><table>:<id>".
+    Hit/miss counters are those of this process; the capacity is the
+    one of the store.
+    """
+
+    def __init__(self, client, namespace, ttl, prefix="hbnb:entity:"):
+        self.client = client
+        self.namespace = f"{prefix}{namespace}:"
+        self.ttl = ttl
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        raw = self.client.get(self.namespace + key)
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return pickle.loads(raw)
+
+    def set(self, key, value):
+        self.client.set(self.namespace + key, pickle.dumps(value), ex=self.ttl)
+
+    def delete(self, key):
+        self.client.delete(self.namespace + key)
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=self.namespace + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "ttl": self.ttl}
+
+
+class _CacheState:
+    def __init__(self, app):
+        config = app.config
+        self.backend = config['ENTITY_CACHE_BACKEND']
+        self.defaults = config['ENTITY_CACHE_DEFAULTS']
+        self.settings = config['ENTITY_CACHE']
+        self.client = None
+        if self.backend == 'shared':
+            self.client = config.get('ENTITY_CACHE_CLIENT') or LocalSharedClient()
+        elif self.backend not in ('memory', None):
+            raise ValueError(f"Unknown ENTITY_CACHE_BACKEND: {self.backend}")
+        self.caches = {}
+        self.lock = threading.Lock()
+
+    def cache(self, table):
+        """Cache of one table, created with its settings on first use"""
+        cache = self.caches.get(table)
+        if cache is None:
+            with self.lock:
+                cache = self.caches.get(table)
+                if cache is None:
+                    settings = dict(self.defaults, **self.settings.get(table, {}))
+                    if self.backend == 'shared':
+                        cache = SharedCache(self.client, table, settings['ttl'])
+                    else:
+                        cache = LRUCache(settings['capacity'], settings['ttl'])
+                    self.caches[table] = cache
+        return cache
+
+
+class EntityCache:
+    def __init__(self, db, app=None):
+        self.db = db
+        self._listening = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('ENTITY_CACHE_BACKEND', 'memory')
+        app.config.setdefault('ENTITY_CACHE_DEFAULTS', {'ttl': 60, 'capacity': 10000})
+        app.config.setdefault('ENTITY_CACHE', {})
+        app.extensions['entity_cache'] = _CacheState(app)
+        if not self._listening:
+            event.listen(self.db.session, 'after_flush', self._after_flush)
+            event.listen(self.db.session, 'after_commit', self._after_commit)
+            event.listen(self.db.session, 'after_soft_rollback', self._after_rollback)
+            self._listening = True
+
+    def _state(self):
+        if not has_app_context():
+            return None
+        state = current_app.extensions.get('entity_cache')
+        if state is None or state.backend is None:
+            return None
+        return state
+
+    def enabled(self):
+        return self._state() is not None
+
+    # read-through
+    def load(self, model, obj_id):
+        """
+        Instance of model cached for obj_id, attached to the session,
+        or None on a miss (the caller then reads the database). An
+        instance already in the session is returned as is.
+        Reads sent to a replica bypass the cache: mixing its entries
+        with rows of a lagging replica would mix two points in time.
+        """
+        state = self._state()
+        session = self.db.session
+        if state is None or not isinstance(obj_id, str):
+            return None
+        obj = session.identity_map.get(session.identity_key(model, obj_id))
+        if obj is not None:
+            return obj
+        if session.info.get('read_replica'):
+            return None
+        values = state.cache(model.__tablename__).get(obj_id)
+        if values is None:
+            return None
+        obj = model.__mapper__.class_manager.new_instance()
+        for key, value in values.items():
+            set_committed_value(obj, key, value)
+        make_transient_to_detached(obj)
+        session.add(obj)
+        return obj
+
+    def store(self, obj):
+        """
+        Cache the column values of a loaded instance. Skipped while the
+        session holds flushed but uncommitted changes, which a rollback
+        could still undo, and for rows read from a replica.
+        """
+        state = self._state()
+        session = self.db.session
+        if (state is None or session.info.get('entity_cache_stale')
+                or session.info.get('read_replica')):
+            return
+        values = {column.key: getattr(obj, column.key)
+                  for column in obj.__table__.columns}
+        state.cache(obj.__tablename__).set(obj.id, values)
+
+    # invalidation
+    def invalidate(self, model, *obj_ids):
+        """
+        Drop entries now and once the current transaction commits
+        (a concurrent read may cache the old row in between)
+        """
+        state = self._state()
+        if state is None:
+            return
+        cache = state.cache(model.__tablename__)
+        stale = self.db.session.info.setdefault('entity_cache_stale', set())
+        for obj_id in obj_ids:
+            cache.delete(obj_id)
+            stale.add((model.__tablename__, obj_id))
+
+    def clear(self, model=None):
+        """Drop every entry of one model, or of all of them"""
+        state = self._state()
+        if state is None:
+            return
+        tables = [model.__tablename__] if model is not None else list(state.caches)
+        for table in tables:
+            state.cache(table).clear()
+
+    def stats(self):
+        state = self._state()
+        if state is None:
+            return {}
+        return {table: cache.stats() for table, cache in state.caches.items()}
+
+    def _after_flush(self, session, flush_context):
+        if self._state() is None:
+            return
+        session.info.setdefault('entity_cache_stale', set())
+        for obj in list(session.dirty) + list(session.deleted):
+            if hasattr(obj, '__tablename__') and obj.id is not None:
+                self.invalidate(type(obj), obj.id)
+
+    def _after_commit(self, session):
+        stale = session.info.pop('entity_cache_stale', None)
+        state = self._state()
+        if not stale or state is None:
+            return
+        for table, obj_id in stale:
+            state.cache(table).delete(obj_id)
+
+    def _after_rollback(self, session, previous_transaction):
+        if previous_transaction.parent is None:
+            session.info.pop('entity_cache_stale', None)
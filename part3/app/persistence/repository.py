@@ -1,5 +1,25 @@
 from abc import ABC, abstractmethod
+import base64
+import json
+from contextlib import contextmanager
+from datetime import datetime
 from app import db
+from app.extensions import entity_cache
+
+
+def encode_cursor(obj):
+    """Opaque keyset cursor pointing just after obj"""
+    raw = json.dumps([obj.created_at.isoformat(), obj.id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Return the (created_at, id) pair stored in a cursor"""
+    try:
+        created_at, obj_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), obj_id
+    except (ValueError, TypeError, AttributeError):
+        raise ValueError("Invalid cursor")
 
 class Repository(ABC):
     @abstractmethod
@@ -14,6 +34,10 @@ class Repository(ABC):
     def get_all(self):
         pass
 
+    @abstractmethod
+    def page(self, limit, cursor=None):
+        pass
+
     @abstractmethod
     def update(self, obj_id, data):
         pass
@@ -28,31 +52,166 @@ class Repository(ABC):
 
 
 class SQLAlchemyRepository(Repository):
+    # Named loading profiles: profile name -> {relationship: loader}
+    # (loader is db.joinedload, db.selectinload...). Subclasses fill it
+    # so that one query loads everything a serializer will read.
+    PROFILES = {}
+
     def __init__(self, model):
         self.model = model
 
+    def query(self, profile=None):
+        """Base query of the model with the loader options of a profile"""
+        if profile is None:
+            return self.model.query
+        if profile not in self.PROFILES:
+            raise ValueError(f"Unknown loading profile: {profile}")
+        options = [loader(getattr(self.model, name))
+                   for name, loader in self.PROFILES[profile].items()]
+        return self.model.query.options(*options)
+
+    @staticmethod
+    @contextmanager
+    def unit_of_work():
+        """
+        Run several repository writes as one transaction: inside the block
+        add/update/delete do not commit, the whole block is committed once
+        at the end (or rolled back on error). Blocks can be nested.
+        """
+        session = db.session
+        depth = session.info.get('unit_of_work', 0)
+        session.info['unit_of_work'] = depth + 1
+        try:
+            yield session
+            if depth == 0:
+                session.commit()
+        except BaseException:
+            if depth == 0:
+                session.rollback()
+            raise
+        finally:
+            session.info['unit_of_work'] = depth
+
+    def commit(self):
+        """Commit now, unless a unit of work will commit later"""
+        if not db.session.info.get('unit_of_work'):
+            db.session.commit()
+
     def add(self, obj):
         db.session.add(obj)
-        db.session.commit()
+        self.commit()
 
-    def get(self, obj_id):
-        return self.model.query.get(obj_id)
+    def get(self, obj_id, profile=None):
+        """
+        Read-through: the entity cache answers first, the database on a
+        miss. On a hit the relationships of a profile load lazily.
+        """
+        obj = entity_cache.load(self.model, obj_id)
+        if obj is None:
+            obj = self.query(profile).get(obj_id)
+            if obj is not None:
+                entity_cache.store(obj)
+        return obj
 
-    def get_all(self):
-        return self.model.query.all()
+    def invalidate(self, *obj_ids):
+        """Drop cached entities changed behind the session's back (bulk UPDATE)"""
+        entity_cache.invalidate(self.model, *obj_ids)
+
+    def get_many(self, obj_ids):
+        """
+        Objects of several ids with one IN (...) query, in the order of
+        obj_ids. Raises KeyError naming the first unknown id.
+        """
+        if not obj_ids:
+            return []
+        found = {obj.id: obj for obj in
+                 self.model.query.filter(self.model.id.in_(set(obj_ids)))}
+        for obj_id in obj_ids:
+            if obj_id not in found:
+                raise KeyError(f"{self.model.__name__} not found: {obj_id}")
+        return [found[obj_id] for obj_id in obj_ids]
+
+    def project(self, columns, query=None, *required):
+        """
+        Query of the given columns only (names or column attributes),
+        plus the required ones missing from them. Its rows are
+        lightweight named tuples, no ORM instance is built and the
+        columns left out (e.g. TEXT blobs) are never read.
+        """
+        columns = [getattr(self.model, column) if isinstance(column, str) else column
+                   for column in columns]
+        columns += [column for column in required
+                    if not any(column is selected for selected in columns)]
+        if query is None:
+            return db.session.query(*columns)
+        return query.with_entities(*columns)
+
+    def get_all(self, profile=None, columns=None):
+        """Every instance, or named tuples of the given columns"""
+        if columns is not None:
+            return self.project(columns).all()
+        return self.query(profile).all()
+
+    def page(self, limit, cursor=None, query=None, profile=None, columns=None):
+        """
+        Keyset pagination on (created_at, id).
+        Returns (items, next_cursor), next_cursor is None on the last page.
+        With columns, items are named tuples of these columns (plus
+        created_at and id, read by the cursor).
+        """
+        model = self.model
+        if query is None:
+            query = self.query(profile)
+        if columns is not None:
+            query = self.project(columns, query, model.created_at, model.id)
+        if cursor:
+            created_at, obj_id = decode_cursor(cursor)
+            query = query.filter(
+                db.tuple_(model.created_at, model.id) > (created_at, obj_id))
+        items = (query.order_by(model.created_at, model.id)
+                 .limit(limit + 1).all())
+        if len(items) > limit:
+            items = items[:limit]
+            return items, encode_cursor(items[-1])
+        return items, None
+
+    def version(self, query=None):
+        """
+        (max updated_at, count) of the rows of query, one aggregate
+        SELECT. Any insert, update or delete changes it.
+        """
+        model = self.model
+        if query is None:
+            query = self.model.query
+        return tuple(query.with_entities(
+            db.func.max(model.updated_at), db.func.count(model.id)).one())
+
+    def stream(self, batch_size, query=None, profile=None, columns=None):
+        """
+        Iterate over every row in (created_at, id) order, fetching
+        batch_size rows at a time (yield_per) so that memory stays flat
+        whatever the size of the table. With columns, rows are named
+        tuples of these columns.
+        """
+        model = self.model
+        if query is None:
+            query = self.query(profile)
+        if columns is not None:
+            query = self.project(columns, query)
+        return query.order_by(model.created_at, model.id).yield_per(batch_size)
 
     def update(self, obj_id, data):
         obj = self.get(obj_id)
         if obj:
             for key, value in data.items():
                 setattr(obj, key, value)
-            db.session.commit()
+            self.commit()
 
     def delete(self, obj_id):
         obj = self.get(obj_id)
         if obj:
             db.session.delete(obj)
-            db.session.commit()
+            self.commit()
 
     def get_by_attribute(self, attr_name, attr_value):
         return self.model.query.filter_by(**{attr_name: attr_value}).first()
\ No newline at end of file
@@ -0,0 +1,135 @@
+"""
+Read replica routing.
+
+With a "replica" entry in SQLALCHEMY_BINDS, the SELECT statements of
+GET and HEAD requests go to the replica engine; flushes, INSERT,
+UPDATE and DELETE statements, and every statement of the other
+requests, go to the primary (SQLALCHEMY_DATABASE_URI).
+
+Read-your-writes: after a successful write request, the reads of the
+same client stay on the primary for REPLICA_STICKY_SECONDS, long enough
+for the replica to catch up. The window travels with the client in the
+STICKY_COOKIE cookie (the time it ends), so it holds whichever worker
+process serves the next request. Clients that do not keep cookies only
+get it from the process that served their write, which remembers their
+JWT identity.
+"""
+import math
+import time
+from contextlib import contextmanager
+import sqlalchemy as sa
+from flask import current_app, has_app_context, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from flask_sqlalchemy.session import Session
+from app.persistence.cache import LRUCache
+
+REPLICA_BIND_KEY = 'replica'
+SAFE_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS'))
+STICKY_COOKIE = 'hbnb_primary_until'
+
+
+class RoutingSession(Session):
+    """db.session sending reads to the replica while info['read_replica'] is set"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and self.info.get('read_replica') and not self._flushing
+                and not isinstance(clause, sa.UpdateBase)):
+            replica = self._db.engines.get(REPLICA_BIND_KEY)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _identity():
+    """JWT identity of the current request, None when anonymous or invalid"""
+    try:
+        verify_jwt_in_request(optional=True)
+        return get_jwt_identity()
+    except Exception:  # a bad token is answered by the view itself
+        return None
+
+
+class _Stickiness:
+    """Read-your-writes windows: in the client cookie, and per process by identity"""
+
+    def __init__(self, config):
+        self.seconds = config['REPLICA_STICKY_SECONDS']
+        # user id -> True, while the user reads from the primary
+        self.recent = LRUCache(config['REPLICA_STICKY_CAPACITY'], self.seconds, time.time)
+
+    @property
+    def clock(self):
+        return self.recent.clock
+
+    @clock.setter
+    def clock(self, clock):
+        self.recent.clock = clock
+
+    def active(self, cookie, identity):
+        """True while the client reads from the primary"""
+        try:
+            until = float(cookie) if cookie else 0.0
+        except ValueError:
+            until = 0.0
+        now = self.clock()
+        # a window longer than the configured one is not ours
+        if now < until <= now + self.seconds:
+            return True
+        return identity is not None and bool(self.recent.get(identity))
+
+    def start(self, response, identity):
+        until = self.clock() + self.seconds
+        response.set_cookie(STICKY_COOKIE, f"{until:.3f}", max_age=math.ceil(self.seconds),
+                            httponly=True, samesite='Lax', secure=request.is_secure)
+        if identity is not None:
+            self.recent.set(identity, True)
+
+
+class ReadReplica:
+    def __init__(self, db, app=None):
+        self.db = db
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('REPLICA_STICKY_SECONDS', 5)
+        app.config.setdefault('REPLICA_STICKY_CAPACITY', 100000)
+        app.extensions['read_replica'] = _Stickiness(app.config)
+        if REPLICA_BIND_KEY not in (app.config.get('SQLALCHEMY_BINDS') or {}):
+            return
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    def _sticky(self):
+        return current_app.extensions['read_replica']
+
+    def active(self):
+        """True while the reads of the session go to the replica"""
+        return has_app_context() and bool(self.db.session.info.get('read_replica'))
+
+    @contextmanager
+    def reads(self):
+        """Send the reads of the block to the replica (outside requests)"""
+        info = self.db.session.info
+        previous = info.get('read_replica')
+        info['read_replica'] = True
+        try:
+            yield
+        finally:
+            info['read_replica'] = previous
+
+    def _before_request(self):
+        if request.method not in SAFE_METHODS:
+            return
+        if self._sticky().active(request.cookies.get(STICKY_COOKIE), _identity()):
+            return
+        self.db.session.info['read_replica'] = True
+
+    def _after_request(self, response):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            self._sticky().start(response, _identity())
+        return response
+
+    def _teardown_request(self, exc):
+        self.db.session.info.pop('read_replica', None)
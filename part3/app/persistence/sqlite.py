@@ -0,0 +1,54 @@
+"""
+SQLite tuning: the PRAGMA statements of SQLITE_PRAGMAS, run on every
+new connection of the SQLite engines of the app.
+
+journal_mode=WAL lets readers run while a writer commits (a rollback
+journal locks the whole file for them); synchronous=NORMAL is safe in
+WAL mode and syncs at checkpoints rather than on every commit.
+mmap_size and cache_size (negative: KiB) keep hot pages in memory and
+busy_timeout (ms) makes a second writer wait instead of failing with
+"database is locked".
+"""
+from sqlalchemy import event
+
+# journal_mode goes first: the other pragmas do not depend on it, but
+# a database switched to WAL keeps it, so it is set before any write
+PRAGMA_ORDER = ('journal_mode', 'synchronous', 'mmap_size', 'cache_size',
+                'busy_timeout')
+
+
+def pragma_statements(pragmas):
+    """PRAGMA statements for a {name: value} mapping, known names first"""
+    names = sorted(pragmas, key=lambda name: (
+        PRAGMA_ORDER.index(name) if name in PRAGMA_ORDER else len(PRAGMA_ORDER)))
+    return [f"PRAGMA {name}={pragmas[name]}" for name in names
+            if pragmas[name] is not None]
+
+
+def set_pragmas(engine, pragmas):
+    """Run the pragmas on every connection engine opens"""
+    statements = pragma_statements(pragmas)
+
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+
+def init_app(app, db):
+    """
+    Install SQLITE_PRAGMAS on the SQLite engines of app (none when the
+    setting is empty). Must run after db.init_app, before the first
+    connection.
+    """
+    pragmas = app.config.get('SQLITE_PRAGMAS')
+    if not pragmas:
+        return
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == 'sqlite':
+                set_pragmas(engine, pragmas)
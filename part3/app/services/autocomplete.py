@@ -0,0 +1,352 @@
+"""
+Title autocomplete of the places (GET /places/autocomplete?prefix=).
+
+TitleIndex keeps the normalized titles (the words of search.tokenize,
+joined by spaces and cut to KEY_LENGTH characters) in one sorted list:
+the titles starting with a prefix are a slice of it, found by
+bisection. They are ranked by review count. The best places of a
+prefix matching more than SCAN_LIMIT titles are cached (prefixes of
+WARM_DEPTH characters at most by a rebuild, longer ones by their first
+query) and kept up to date by every write, so a short prefix does not
+walk its slice on each keystroke.
+
+Memory is bounded: the index holds the AUTOCOMPLETE_CAPACITY most
+reviewed places at most, and the cache AUTOCOMPLETE_CACHE_PREFIXES
+prefixes.
+
+Like the in-memory search index, each process builds its own from the
+places table (at startup in run.py, otherwise on the first query) and
+applies the writes of its sessions when they commit: the mapper events
+of Place, plus notify_reviews() and index_rows() for the review counts
+and places written with Core statements. Writes of other processes
+show after a rebuild.
+"""
+import heapq
+import threading
+from bisect import bisect_left, insort
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
+from app.extensions import db
+from app.models.place import Place
+from app.services.search import tokenize
+
+KEY_LENGTH = 64
+# longer slices are ranked once, then served from the prefix cache
+SCAN_LIMIT = 256
+# prefixes ranked by a rebuild, the others on their first query
+WARM_DEPTH = 3
+LAST = "\U0010ffff"
+
+
+def normalize(value):
+    """Words of a title, lowercase without accents, separated by one space"""
+    return " ".join(tokenize(value))[:KEY_LENGTH]
+
+
+def normalize_prefix(prefix):
+    """Prefix as typed; a trailing space ends the last word"""
+    key = normalize(prefix)
+    if key and prefix[-1:].isspace():
+        key += " "
+    return key[:KEY_LENGTH]
+
+
+class _Top:
+    """
+    Best ranks of a prefix, sorted. Every place of the prefix ranking
+    up to bound is in ranks (all of them when bound is None).
+    """
+    __slots__ = ("ranks", "bound")
+
+    def __init__(self, ranks, bound):
+        self.ranks = ranks
+        self.bound = bound
+
+    def discard(self, rank):
+        index = bisect_left(self.ranks, rank)
+        if index < len(self.ranks) and self.ranks[index] == rank:
+            del self.ranks[index]
+
+    def offer(self, rank, size):
+        if self.bound is None or rank <= self.bound:
+            insort(self.ranks, rank)
+            if len(self.ranks) > size:
+                self.ranks.pop()
+                self.bound = self.ranks[-1]
+
+
+class TitleIndex:
+    """
+    Sorted "normalized title\\0place id" keys. A rank is (-review count,
+    key): the smallest ranks first.
+    """
+
+    def __init__(self, capacity, cache_prefixes, top_size):
+        self.lock = threading.RLock()
+        self.capacity = capacity
+        self.cache_prefixes = cache_prefixes
+        self.top_size = top_size
+        self.built = False
+        self._reset()
+
+    def _reset(self):
+        self.keys = []
+        self.places = {}  # place id -> (key, title, review count)
+        self.least = []  # min-heap of (review count, key), stale entries skipped
+        self.tops = {}  # prefix -> _Top, oldest first
+
+    @staticmethod
+    def _place_id(key):
+        return key[key.index("\0") + 1:]
+
+    def _prefixes(self, key):
+        """Cached prefixes a key starts with"""
+        end = key.index("\0")
+        return [top for top in (self.tops.get(key[:i]) for i in range(1, end + 1))
+                if top is not None]
+
+    def _drop(self, place_id):
+        entry = self.places.pop(place_id, None)
+        if entry is None:
+            return None
+        key, _, count = entry
+        del self.keys[bisect_left(self.keys, key)]
+        for top in self._prefixes(key):
+            top.discard((-count, key))
+        return entry
+
+    def _worst(self):
+        """(review count, key) of the least reviewed place"""
+        while self.least:
+            count, key = self.least[0]
+            entry = self.places.get(self._place_id(key))
+            if entry is not None and entry[0] == key and entry[2] == count:
+                return count, key
+            heapq.heappop(self.least)
+        return None
+
+    def _put(self, place_id, title, count):
+        self._drop(place_id)
+        name = normalize(title)
+        if not name:
+            return
+        if len(self.places) >= self.capacity:
+            worst = self._worst()
+            if worst is None or count <= worst[0]:
+                return  # less reviewed than every indexed place
+            self._drop(self._place_id(worst[1]))
+        key = f"{name}\0{place_id}"
+        self.places[place_id] = (key, title, count)
+        insort(self.keys, key)
+        heapq.heappush(self.least, (count, key))
+        if len(self.least) > 2 * len(self.places) + 64:
+            self.least = [(count, key) for key, _, count in self.places.values()]
+            heapq.heapify(self.least)
+        for top in self._prefixes(key):
+            top.offer((-count, key), self.top_size)
+
+    def put(self, rows):
+        """Index (place id, title, review count) rows"""
+        with self.lock:
+            for place_id, title, count in rows:
+                self._put(place_id, title, count or 0)
+
+    def remove(self, place_ids):
+        with self.lock:
+            for place_id in place_ids:
+                self._drop(place_id)
+
+    def adjust(self, deltas):
+        """Add {place id: review count delta} to the indexed places"""
+        with self.lock:
+            for place_id, delta in deltas.items():
+                entry = self.places.get(place_id)
+                if entry is not None:
+                    self._put(place_id, entry[1], entry[2] + delta)
+
+    def full(self):
+        return len(self.places) >= self.capacity
+
+    def rebuild(self, connection, batch_size=5000):
+        """Load the capacity most reviewed places; returns the count"""
+        result = connection.execution_options(yield_per=batch_size).execute(
+            db.select(Place.id, Place.title, Place.review_count)
+            .order_by(Place.review_count.desc()).limit(self.capacity))
+        with self.lock:
+            self._reset()
+            for place_id, title, count in result:
+                name = normalize(title)
+                if name:
+                    key = f"{name}\0{place_id}"
+                    self.places[place_id] = (key, title, count)
+                    self.keys.append(key)
+            self.keys.sort()
+            self.least = [(count, key) for key, _, count in self.places.values()]
+            heapq.heapify(self.least)
+            self._warm()
+            self.built = True
+            return len(self.places)
+
+    def _warm(self):
+        """Cache the short prefixes, in one pass over the places best first"""
+        best = {}
+        for count, key in sorted((-count, key) for key, _, count in self.places.values()):
+            for i in range(1, min(WARM_DEPTH, key.index("\0")) + 1):
+                ranks = best.setdefault(key[:i], [])
+                if len(ranks) < self.top_size:
+                    ranks.append((count, key))
+        for prefix in sorted(best, key=len):
+            start = bisect_left(self.keys, prefix)
+            size = bisect_left(self.keys, prefix + LAST, start) - start
+            if size > SCAN_LIMIT and len(self.tops) < self.cache_prefixes:
+                ranks = best[prefix]
+                self.tops[prefix] = _Top(ranks, ranks[-1] if size > len(ranks) else None)
+
+    def _ranked(self, start, end, limit):
+        places = self.places
+        return heapq.nsmallest(limit, (
+            (-places[self._place_id(key)][2], key) for key in self.keys[start:end]))
+
+    def complete(self, prefix, limit):
+        """[(place id, title, review count)] of the best titles starting with prefix"""
+        with self.lock:
+            start = bisect_left(self.keys, prefix)
+            end = bisect_left(self.keys, prefix + LAST, start)
+            if end - start <= SCAN_LIMIT:
+                ranks = self._ranked(start, end, limit)
+            else:
+                top = self.tops.get(prefix)
+                if top is None or (len(top.ranks) < limit and top.bound is not None):
+                    ranks = self._ranked(start, end, self.top_size)
+                    top = _Top(ranks, ranks[-1] if end - start > len(ranks) else None)
+                    self.tops.pop(prefix, None)
+                    self.tops[prefix] = top
+                    if len(self.tops) > self.cache_prefixes:
+                        del self.tops[next(iter(self.tops))]
+                ranks = top.ranks[:limit]
+            hits = []
+            for _, key in ranks:
+                place_id = self._place_id(key)
+                _, title, count = self.places[place_id]
+                hits.append((place_id, title, count))
+            return hits
+
+    def stats(self):
+        return {"places": len(self.places), "capacity": self.capacity,
+                "cached_prefixes": len(self.tops), "built": self.built}
+
+
+class PlaceAutocomplete:
+    def __init__(self, app=None):
+        self._listening = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('AUTOCOMPLETE_CAPACITY', 200000)
+        app.config.setdefault('AUTOCOMPLETE_CACHE_PREFIXES', 10000)
+        app.config.setdefault('AUTOCOMPLETE_LIMIT_MAX', 20)
+        app.extensions['place_autocomplete'] = TitleIndex(
+            app.config['AUTOCOMPLETE_CAPACITY'],
+            app.config['AUTOCOMPLETE_CACHE_PREFIXES'],
+            # room for the removals before a prefix must be ranked again
+            2 * app.config['AUTOCOMPLETE_LIMIT_MAX'])
+        if not self._listening:
+            event.listen(Place, 'after_insert', self._after_insert)
+            event.listen(Place, 'after_update', self._after_update)
+            event.listen(Place, 'after_delete', self._after_delete)
+            event.listen(db.session, 'after_commit', self._after_commit)
+            event.listen(db.session, 'after_soft_rollback', self._after_rollback)
+            self._listening = True
+
+    def _index(self):
+        if not has_app_context():
+            return None
+        return current_app.extensions.get('place_autocomplete')
+
+    def complete(self, prefix, limit):
+        """
+        [(place id, title, review count)], most reviewed first.
+        Raises ValueError when the prefix has no letter or digit.
+        """
+        key = normalize_prefix(prefix or "")
+        if not key:
+            raise ValueError("prefix must contain a letter or a digit")
+        index = self._index()
+        if not index.built:
+            index.rebuild(db.session.connection())
+        return index.complete(key, limit)
+
+    def rebuild(self):
+        """Load the index from the places table; returns the count"""
+        return self._index().rebuild(db.session.connection())
+
+    def warm(self):
+        """Startup: build the index when the places table exists"""
+        if db.inspect(db.engine).has_table(Place.__tablename__):
+            return self.rebuild()
+        return 0
+
+    def invalidate(self):
+        """Build the index again on the next query (after a repair job)"""
+        index = self._index()
+        if index is not None:
+            index.built = False
+
+    def index_rows(self, rows):
+        """Index (id, title, review count) rows inserted without the ORM"""
+        self._stage(db.session, 'put', rows)
+
+    def notify_reviews(self, deltas):
+        """
+        {place id: review count delta} applied with Core UPDATEs. A place
+        missing from a full index is read back: it may now rank in it.
+        """
+        index = self._index()
+        if index is None or not index.built:
+            return
+        self._stage(db.session, 'adjust', deltas)
+        missing = [place_id for place_id in deltas if place_id not in index.places]
+        if missing and index.full():
+            self._stage(db.session, 'put', db.session.execute(
+                db.select(Place.id, Place.title, Place.review_count)
+                .where(Place.id.in_(missing))).all())
+
+    def stats(self):
+        return self._index().stats()
+
+    def _stage(self, session, operation, payload):
+        """Apply once the session commits, if the index is built"""
+        index = self._index()
+        if index is not None and index.built:
+            session.info.setdefault('place_autocomplete_pending', []).append(
+                (operation, payload))
+
+    def _after_insert(self, mapper, connection, target):
+        self._stage(object_session(target), 'put',
+                    [(target.id, target.title, target.review_count)])
+
+    def _after_update(self, mapper, connection, target):
+        attrs = db.inspect(target).attrs
+        if attrs.title.history.has_changes() or attrs.review_count.history.has_changes():
+            self._stage(object_session(target), 'put',
+                        [(target.id, target.title, target.review_count)])
+
+    def _after_delete(self, mapper, connection, target):
+        self._stage(object_session(target), 'remove', [target.id])
+
+    def _after_commit(self, session):
+        pending = session.info.pop('place_autocomplete_pending', None)
+        index = self._index()
+        if not pending or index is None:
+            return
+        for operation, payload in pending:
+            getattr(index, operation)(payload)
+
+    def _after_rollback(self, session, previous_transaction):
+        if previous_transaction.parent is None:
+            session.info.pop('place_autocomplete_pending', None)
+
+
+place_autocomplete = PlaceAutocomplete()
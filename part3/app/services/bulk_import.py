@@ -0,0 +1,272 @@
+"""
+Bulk import of amenities, places and reviews from NDJSON.
+
+Each line is one JSON object with a "type" key ("amenity", "place" or
+"review") and the fields of that model, e.g.
+
+    {"type": "place", "title": "Loft", "price": 80, "latitude": 48.8,
+     "longitude": 2.3, "owner_id": "...", "amenities": ["..."]}
+
+Rows are validated by the @validates hooks of the models, so the
+rules of the API apply unchanged. Valid rows are
+inserted in batches with executemany(); a bad row is reported with
+its line number and never aborts the import.
+"""
+import json
+from collections import defaultdict
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import configure_mappers
+from app.extensions import db, entity_cache
+from app.models import ids
+from app.models.amenity import Amenity
+from app.models.place import Place, place_amenity
+from app.models.review import Review
+from app.models.user import User
+from app.services.autocomplete import place_autocomplete
+from app.services.search import place_search
+
+# Fields a row may set, per type (computed columns are not importable)
+IMPORT_FIELDS = {
+    "amenity": (Amenity, {"id", "name"}),
+    "place": (Place, {"id", "title", "description", "price", "latitude",
+                      "longitude", "owner_id", "amenities"}),
+    "review": (Review, {"id", "text", "rating", "place_id", "user_id"}),
+}
+# references to other rows, compared with the ids read back in canonical form
+REFERENCE_FIELDS = ("owner_id", "place_id", "user_id")
+
+
+def validate(model, data):
+    """
+    Run the @validates hooks of model on data and return a transient
+    instance holding the values. The hooks are called directly instead
+    of going through the attribute events of Model(**data), which is
+    several times faster and runs the very same rules.
+    """
+    obj = model._sa_class_manager.new_instance()
+    validators = model.__mapper__.validators
+    for key, value in data.items():
+        if key in validators:
+            value = validators[key][0](obj, key, value)
+        obj.__dict__[key] = value
+    return obj
+
+
+def canonical_id(field, value):
+    """Lowercase form of an id given in a row; ValueError when it is not a UUID"""
+    try:
+        return ids.canonical(value)
+    except ValueError:
+        raise ValueError(f"Invalid id in {field}: {value!r}")
+
+
+def column_values(obj):
+    """
+    Column values of a transient instance, with the column defaults
+    (id, timestamps, counters) applied as they would be on flush.
+    Raises ValueError when a required column is missing.
+    """
+    values = {}
+    state = obj.__dict__
+    for column in obj.__table__.columns:
+        value = state.get(column.key)
+        if value is None and column.default is not None:
+            default = column.default
+            value = default.arg(None) if default.is_callable else default.arg
+        if value is None and not column.nullable:
+            raise ValueError(f"{column.key} is required")
+        values[column.key] = value
+    return values
+
+
+class BulkImporter:
+    def __init__(self, batch_size=5000, max_reported_errors=1000):
+        # validate() reads instrumented attributes before any query ran
+        configure_mappers()
+        self.batch_size = batch_size
+        self.max_reported_errors = max_reported_errors
+        self.rows = 0
+        self.inserted = {kind: 0 for kind in IMPORT_FIELDS}
+        self.error_count = 0
+        self.errors = []
+
+    def run(self, lines):
+        """Import an iterable of NDJSON lines (str or bytes), return the report"""
+        batch = []
+        for number, line in enumerate(lines, start=1):
+            if isinstance(line, bytes):
+                line = line.decode("utf-8")
+            if not line.strip():
+                continue
+            self.rows += 1
+            try:
+                batch.append((number,) + self.parse(line))
+            except (ValueError, TypeError) as error:
+                self.error(number, error)
+            if len(batch) >= self.batch_size:
+                self.flush(batch)
+                batch = []
+        self.flush(batch)
+        return self.report()
+
+    def report(self):
+        return {
+            "rows": self.rows,
+            "inserted": self.inserted,
+            "error_count": self.error_count,
+            "errors": self.errors,
+        }
+
+    def error(self, number, error):
+        self.error_count += 1
+        if len(self.errors) < self.max_reported_errors:
+            self.errors.append({"line": number, "error": str(error)})
+
+    def parse(self, line):
+        """Validate one line, return (type, column values, amenity ids)"""
+        data = json.loads(line)
+        if not isinstance(data, dict):
+            raise ValueError("Row must be a JSON object")
+        kind = data.pop("type", None)
+        if kind not in IMPORT_FIELDS:
+            raise ValueError(f"Unknown type: {kind}")
+        model, fields = IMPORT_FIELDS[kind]
+        unknown = set(data) - fields
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+
+        amenity_ids = data.pop("amenities", None) or []
+        if not isinstance(amenity_ids, list):
+            raise TypeError("Amenities must be a list of IDs")
+        for field in REFERENCE_FIELDS:
+            if data.get(field) is not None:
+                data[field] = canonical_id(field, data[field])
+        amenity_ids = [canonical_id("amenities", aid) for aid in amenity_ids]
+        values = column_values(validate(model, data))
+        return kind, values, amenity_ids
+
+    def flush(self, batch):
+        """Insert one batch (amenities, then places, then reviews) and commit"""
+        if not batch:
+            return
+        rows = defaultdict(list)
+        for number, kind, values, amenity_ids in batch:
+            rows[kind].append((number, values, amenity_ids))
+
+        self.insert_amenities(rows["amenity"])
+        self.insert_places(rows["place"])
+        self.insert_reviews(rows["review"])
+        db.session.commit()
+
+    def existing(self, column, values):
+        """Subset of values present in column (one IN query)"""
+        values = set(values)
+        if not values:
+            return set()
+        return {row[0] for row in
+                db.session.query(column).filter(column.in_(values))}
+
+    def insert(self, kind, rows):
+        """
+        executemany() insert of (number, values, ...) rows. When a
+        constraint fails, the batch is retried row by row to report
+        the culprits. Returns the inserted rows.
+        """
+        if not rows:
+            return rows
+        table = IMPORT_FIELDS[kind][0].__table__
+        try:
+            with db.session.begin_nested():
+                db.session.execute(table.insert(), [row[1] for row in rows])
+        except IntegrityError:
+            inserted = []
+            for row in rows:
+                try:
+                    with db.session.begin_nested():
+                        db.session.execute(table.insert(), row[1])
+                    inserted.append(row)
+                except IntegrityError as error:
+                    self.error(row[0], f"Constraint violation: {error.orig}")
+            rows = inserted
+        self.inserted[kind] += len(rows)
+        return rows
+
+    def insert_amenities(self, rows):
+        taken = self.existing(Amenity.name, (values["name"] for _, values, _ in rows))
+        valid = []
+        for row in rows:
+            name = row[1]["name"]
+            if name in taken:
+                self.error(row[0], f"Amenity already exists: {name}")
+                continue
+            taken.add(name)
+            valid.append(row)
+        self.insert("amenity", valid)
+
+    def insert_places(self, rows):
+        owners = self.existing(User.id, (values["owner_id"] for _, values, _ in rows))
+        amenities = self.existing(
+            Amenity.id, (aid for _, _, amenity_ids in rows for aid in amenity_ids))
+        valid = []
+        for number, values, amenity_ids in rows:
+            if values["owner_id"] not in owners:
+                self.error(number, f"User not found: {values['owner_id']}")
+                continue
+            missing = [aid for aid in amenity_ids if aid not in amenities]
+            if missing:
+                self.error(number, f"Amenity not found: {missing[0]}")
+                continue
+            valid.append((number, values, amenity_ids))
+
+        inserted = self.insert("place", valid)
+        place_search.index_rows([(values["id"], values["title"], values["description"])
+                                 for _, values, _ in inserted])
+        place_autocomplete.index_rows([(values["id"], values["title"], 0)
+                                       for _, values, _ in inserted])
+        links = [{"place_id": values["id"], "amenity_id": aid}
+                 for _, values, amenity_ids in inserted
+                 for aid in dict.fromkeys(amenity_ids)]
+        if links:
+            db.session.execute(place_amenity.insert(), links)
+
+    def insert_reviews(self, rows):
+        owners = dict(db.session.query(Place.id, Place.owner_id).filter(
+            Place.id.in_({values["place_id"] for _, values, _ in rows})))
+        users = self.existing(User.id, (values["user_id"] for _, values, _ in rows))
+        # exact (user_id, place_id) lookups on the unique index
+        pairs = {(values["user_id"], values["place_id"]) for _, values, _ in rows}
+        reviewed = set(db.session.query(Review.user_id, Review.place_id).filter(
+            db.tuple_(Review.user_id, Review.place_id).in_(pairs))) if pairs else set()
+        valid = []
+        for number, values, amenity_ids in rows:
+            place_id, user_id = values["place_id"], values["user_id"]
+            if place_id not in owners:
+                self.error(number, f"Place not found: {place_id}")
+            elif user_id not in users:
+                self.error(number, f"User not found: {user_id}")
+            elif owners[place_id] == user_id:
+                self.error(number, "You cannot review your own place")
+            elif (user_id, place_id) in reviewed:
+                self.error(number, "You have already reviewed this place")
+            else:
+                reviewed.add((user_id, place_id))
+                valid.append((number, values, amenity_ids))
+
+        # rating aggregates of the places, one UPDATE per place (executemany)
+        totals = defaultdict(lambda: [0, 0])
+        for _, values, _ in self.insert("review", valid):
+            totals[values["place_id"]][0] += 1
+            totals[values["place_id"]][1] += values["rating"]
+        if totals:
+            places = Place.__table__
+            db.session.execute(
+                places.update()
+                .where(places.c.id == db.bindparam("place"))
+                .values(review_count=places.c.review_count + db.bindparam("count"),
+                        rating_sum=places.c.rating_sum + db.bindparam("total")),
+                [{"place": place_id, "count": count, "total": total}
+                 for place_id, (count, total) in totals.items()]
+            )
+            entity_cache.invalidate(Place, *totals)
+            place_autocomplete.notify_reviews(
+                {place_id: count for place_id, (count, _) in totals.items()})
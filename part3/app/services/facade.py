@@ -1,3 +1,4 @@
+from sqlalchemy.exc import IntegrityError
 from app.models.user import User
 from app.models.amenity import Amenity
 from app.models.place import Place
@@ -7,6 +8,8 @@ from app.services.repositories.user_repository import UserRepository
 from app.services.repositories.place_repository import PlaceRepository
 from app.services.repositories.review_repository import ReviewRepository
 from app.services.repositories.amenity_repository import AmenityRepository
+from app.services.bulk_import import BulkImporter
+from app.services.revocation import revocation
 from app.extensions import db
 
 class HBnBFacade:
@@ -23,19 +26,42 @@ class HBnBFacade:
         else:
             user_data['is_admin'] = user_data.get('is_admin', False)
 
+        # the password is hashed once, by User.validate_password
         user = User(**user_data)
-        user.hash_password(user_data['password'])
         self.user_repo.add(user)
         return user
     
-    def get_users(self):
-        return self.user_repo.get_all()
+    def get_users(self, columns=None):
+        return self.user_repo.get_all(columns=columns)
+
+    def get_users_page(self, limit, cursor=None, columns=None):
+        return self.user_repo.page(limit, cursor, columns=columns)
+
+    def users_version(self):
+        return self.user_repo.version()
+
+    def stream_users(self, batch_size, columns=None):
+        return self.user_repo.stream(batch_size, columns=columns)
 
     def get_user(self, user_id):
         return self.user_repo.get(user_id)
 
     def get_user_by_email(self, email):
         return self.user_repo.get_user_by_email(email)
+
+    def authenticate(self, email, password):
+        """
+        Return the user when the credentials are valid, None otherwise.
+        A hash made with another cost than BCRYPT_LOG_ROUNDS is
+        transparently replaced by a hash at the configured cost.
+        """
+        user = self.get_user_by_email(email)
+        if not user or not user.verify_password(password):
+            return None
+        if user.password_needs_rehash():
+            user.password = password  # hashed by User.validate_password
+            db.session.commit()
+        return user
     
     def update_user(self, current_user_id, user_id, user_data, is_admin=False):
         """
@@ -53,6 +79,10 @@ class HBnBFacade:
         self.user_repo.update(user_id, user_data)
         return self.get_user(user_id)
 
+    def revoke_token(self, jwt_payload):
+        """Revoke a decoded JWT until it expires (logout, refresh rotation)"""
+        revocation.revoke(jwt_payload)
+
     # AMENITY
     def create_amenity(self, amenity_data):
         amenity = Amenity(**amenity_data)
@@ -62,8 +92,17 @@ class HBnBFacade:
     def get_amenity(self, amenity_id):
         return self.amenity_repo.get(amenity_id)
 
-    def get_all_amenities(self):
-        return self.amenity_repo.get_all()
+    def get_all_amenities(self, columns=None):
+        return self.amenity_repo.get_all(columns=columns)
+
+    def get_amenities_page(self, limit, cursor=None, columns=None):
+        return self.amenity_repo.page(limit, cursor, columns=columns)
+
+    def amenities_version(self):
+        return self.amenity_repo.version()
+
+    def stream_amenities(self, batch_size, columns=None):
+        return self.amenity_repo.stream(batch_size, columns=columns)
 
     def update_amenity(self, amenity_id, amenity_data):
         self.amenity_repo.update(amenity_id, amenity_data)
@@ -79,59 +118,104 @@ class HBnBFacade:
         # owner_id from the client is completely ignored
         place_data.pop("owner_id", None)
 
-        amenities_payload = place_data.pop("amenities", None)
+        amenities_payload = place_data.pop("amenities", None) or []
+        # amenity IDs (API) or {"id": ...} objects
+        amenity_ids = [item["id"] if isinstance(item, dict) else item
+                       for item in amenities_payload]
 
-        place = Place(owner=user, **place_data)
-        self.place_repo.add(place)
-        user.add_place(place)
+        # one transaction, one commit: place + owner + amenities
+        with self.place_repo.unit_of_work():
+            place = Place(owner=user, **place_data)
+            self.place_repo.add(place)
+            user.add_place(place)
 
-        # connects existing amenities
-        if amenities_payload:
-            for item in amenities_payload:
-                amenity = self.get_amenity(item["id"])
-                if not amenity:
-                    raise KeyError("Invalid amenity id")
+            # connects existing amenities, resolved with one IN (...) query
+            for amenity in self.amenity_repo.get_many(amenity_ids):
                 place.add_amenity(amenity)
-        
-        db.session.commit()
-        
+
         return place
 
-    def get_place(self, place_id):
-        return self.place_repo.get(place_id)
+    def add_place_amenities(self, place, amenity_ids):
+        """Link existing amenities to a place in one transaction"""
+        with self.place_repo.unit_of_work():
+            for amenity in self.amenity_repo.get_many(amenity_ids):
+                place.add_amenity(amenity)
+        return place
+
+    def get_place(self, place_id, profile=None):
+        return self.place_repo.get(place_id, profile)
 
-    def get_all_places(self):
-        return self.place_repo.get_all()
+    def get_all_places(self, profile="summary"):
+        return self.place_repo.get_all(profile)
+
+    def get_places_page(self, limit, cursor=None):
+        return self.place_repo.page(limit, cursor, profile="summary")
+
+    def search_places(self, filters, limit=None, cursor=None, columns=None, sort=None):
+        """
+        Places matching the filters of PlaceRepository.search, oldest
+        first or best rated first with sort="rating".
+        With a limit, returns one page (places, next_cursor).
+        With columns, places are named tuples of these columns only.
+        """
+        query = self.place_repo.search(**filters)
+        if limit is not None:
+            page = self.place_repo.page_by_rating if sort == "rating" else self.place_repo.page
+            return page(limit, cursor, query=query, columns=columns)
+        if columns is not None:
+            query = self.place_repo.project(columns, query)
+        if sort == "rating":
+            query = self.place_repo.by_rating(query)
+        return query.all()
+
+    def places_version(self, filters):
+        """(max updated_at, count) of the places matching the filters"""
+        return self.place_repo.version(self.place_repo.search(**filters))
+
+    def stream_places(self, filters, batch_size, columns=None):
+        """Places matching the filters, fetched batch_size rows at a time"""
+        return self.place_repo.stream(batch_size, query=self.place_repo.search(**filters),
+                                      columns=columns)
+
+    def get_nearby_places(self, latitude, longitude, radius_km, limit):
+        return self.place_repo.nearby(latitude, longitude, radius_km, limit)
+
+    def text_search_places(self, query, limit, columns):
+        return self.place_repo.text_search(query, limit, columns)
+
+    def autocomplete_places(self, prefix, limit):
+        return self.place_repo.autocomplete(prefix, limit)
+
+    def recompute_ratings(self):
+        return self.place_repo.recompute_ratings()
+
+    def backfill_geohash(self, batch_size=5000):
+        return self.place_repo.backfill_geohash(batch_size)
 
     def update_place(self, current_user_id, place_id, place_data, is_admin=False):
         """
         Only owner can modifiate + if is_admin=True.
+        Ownership is checked on owner_id, the owner is not loaded.
         """
         place = self.place_repo.get(place_id)
         if not place:
             raise KeyError("Place not found")
 
         # Property control (skip if admin)
-        if not is_admin and str(place.owner.id) != str(current_user_id):
+        if not is_admin and str(place.owner_id) != str(current_user_id):
             raise PermissionError("Unauthorized action")
 
         # Protected fields
         for k in ("owner", "owner_id", "id"):
             place_data.pop(k, None)
 
-        # Convert amenity IDs to Amenity objects
-        if "amenities" in place_data:
-            amenity_ids = place_data.pop("amenities")
-            new_amenities = []
-            for aid in amenity_ids:
-                amenity = self.get_amenity(aid)
-                if not amenity:
-                    raise KeyError(f"Amenity not found: {aid}")
-                new_amenities.append(amenity)
-                
-            place.amenities = new_amenities
-
-        self.place_repo.update(place_id, place_data)
+        with self.place_repo.unit_of_work():
+            # Convert amenity IDs to Amenity objects (one IN query)
+            if "amenities" in place_data:
+                amenity_ids = place_data.pop("amenities")
+                place.amenities = self.amenity_repo.get_many(amenity_ids)
+
+            self.place_repo.update(place_id, place_data)
         return place
 
     # REVIEWS
@@ -144,7 +228,7 @@ class HBnBFacade:
         if not place:
             raise KeyError("Place not found")
 
-        if place.owner.id == current_user_id:
+        if place.owner_id == current_user_id:
             raise ValueError("You cannot review your own place")
         
         if self.user_already_reviewed(current_user_id, place.id):
@@ -157,22 +241,39 @@ class HBnBFacade:
             user_id=user.id
         )
         
-        self.review_repo.add(review)
-        user.add_review(review)
-        place.add_review(review)
+        # review and rating aggregates are committed together
+        try:
+            with self.review_repo.unit_of_work():
+                self.review_repo.add(review)
+                self.place_repo.adjust_ratings(place.id, 1, review.rating)
+                user.add_review(review)
+                place.add_review(review)
+        except IntegrityError:
+            # a concurrent request inserted the same (user, place) first
+            if self.user_already_reviewed(current_user_id, place.id):
+                raise ValueError("You have already reviewed this place")
+            raise
         return review
 
-    def get_review(self, review_id):
-        return self.review_repo.get(review_id)
+    def get_review(self, review_id, profile=None):
+        return self.review_repo.get(review_id, profile)
 
-    def get_all_reviews(self):
-        return self.review_repo.get_all()
+    def get_all_reviews(self, columns=None):
+        return self.review_repo.get_all("summary", columns=columns)
 
-    def get_reviews_by_place(self, place_id):
-        place = self.place_repo.get(place_id)
-        if not place:
+    def get_reviews_page(self, limit, cursor=None, columns=None):
+        return self.review_repo.page(limit, cursor, profile="summary", columns=columns)
+
+    def reviews_version(self):
+        return self.review_repo.version()
+
+    def stream_reviews(self, batch_size, columns=None):
+        return self.review_repo.stream(batch_size, profile="summary", columns=columns)
+
+    def get_reviews_by_place(self, place_id, columns=None):
+        if not self.place_repo.get(place_id):
             raise KeyError("Place not found")
-        return place.reviews
+        return self.review_repo.get_by_place(place_id, "summary", columns=columns)
 
     def update_review(self, current_user_id, review_id, review_data, is_admin=False):
         """
@@ -182,14 +283,19 @@ class HBnBFacade:
         if not review:
             raise KeyError("Review not found")
 
-        if not is_admin and str(review.user.id) != str(current_user_id):
+        if not is_admin and str(review.user_id) != str(current_user_id):
             raise PermissionError("Unauthorized action")
 
         # For not change user and place
         review_data.pop("user_id", None)
         review_data.pop("place_id", None)
 
-        self.review_repo.update(review_id, review_data)
+        old_rating = review.rating
+        with self.review_repo.unit_of_work():
+            self.review_repo.update(review_id, review_data)
+            if review.rating != old_rating:
+                self.place_repo.adjust_ratings(
+                    review.place_id, 0, review.rating - old_rating)
         return review
 
     def delete_review(self, current_user_id, review_id, is_admin=False):
@@ -200,27 +306,25 @@ class HBnBFacade:
         if not review:
             raise KeyError("Review not found")
 
-        if not is_admin and str(review.user.id) != str(current_user_id):
+        if not is_admin and str(review.user_id) != str(current_user_id):
             raise PermissionError("Unauthorized action")
 
-        with db.session.no_autoflush:
-            user = review.user
-            place = review.place
-
-            if review in user.reviews:
-                user.reviews.remove(review)
-            if review in place.reviews:
-                place.reviews.remove(review)
-            
+        # the author and place are not loaded: their review collections
+        # are expired by the commit of the unit of work
+        with self.review_repo.unit_of_work():
+            self.place_repo.adjust_ratings(review.place_id, -1, -review.rating)
             db.session.delete(review)
-        db.session.commit()
 
     def user_already_reviewed(self, user_id: str, place_id: str) -> bool:
         """
         Return True if user user has already left a review on this place
         """
-        return any(
-            r.user.id == user_id and r.place.id == place_id
-            for r in self.review_repo.get_all()
-            )
+        return self.review_repo.exists_for_user_and_place(user_id, place_id)
 
+    # BULK IMPORT
+    def import_ndjson(self, lines, batch_size=5000):
+        """
+        Import amenities, places and reviews from NDJSON lines.
+        Returns a report with the inserted counts and per-line errors.
+        """
+        return BulkImporter(batch_size=batch_size).run(lines)
@@ -0,0 +1,104 @@
+"""
+Conversion of a database with text ids (36-character uuid4 strings,
+the layout before ID_STORAGE) to binary ids.
+
+Rows are copied table by table, parents first, from the old database
+into the one the app is configured with (ID_STORAGE='binary'), which
+must be empty: SQLite cannot change the type of a primary key in
+place, and a copy leaves the old database untouched until the switch.
+The ids keep their value, only their storage changes, so URLs, JWT
+subjects and client references stay valid; rows created afterwards get
+UUIDv7 ids.
+
+The source may predate columns of the models (a database of the
+original layout has no places.geohash, review_count nor rating_sum):
+only the columns it has are read, the others take their defaults, the
+geohash is computed from the coordinates and the rating aggregates are
+rebuilt from the reviews once they are copied, and so is the search
+index of the places.
+
+The copy is one transaction on the target: a malformed id aborts it
+and leaves the target empty.
+"""
+from sqlalchemy import create_engine
+from app.extensions import db
+from app.models import geo, ids
+from app.models.place import Place
+from app.models.review import Review
+from app.services.autocomplete import place_autocomplete
+from app.services.search import place_search
+
+
+def id_columns(table):
+    return [column.name for column in table.columns if isinstance(column.type, ids.UUID)]
+
+
+def check_ids(table, columns, rows):
+    for row in rows:
+        for name in columns:
+            value = row[name]
+            if value is not None:
+                try:
+                    ids.encode(value)
+                except ValueError:
+                    raise ValueError(f"{table.name}.{name}: {value!r} is not a UUID")
+
+
+def fill_geohash(rows):
+    for row in rows:
+        if row.get('geohash') is None:
+            row['geohash'] = geo.encode(row['latitude'], row['longitude'])
+
+
+def rebuild_ratings(connection):
+    """review_count and rating_sum of every place, from the copied reviews"""
+    places, reviews = Place.__table__, Review.__table__
+    of_place = reviews.c.place_id == places.c.id
+    connection.execute(places.update().values(
+        review_count=db.select(db.func.count()).where(of_place).scalar_subquery(),
+        rating_sum=db.select(db.func.coalesce(db.func.sum(reviews.c.rating), 0))
+        .where(of_place).scalar_subquery()))
+
+
+def migrate_ids(source_url, batch_size=10000):
+    """
+    Copy every table of the database at source_url (text ids) into the
+    app database. Returns {table name: rows copied}.
+    """
+    if ids.storage_of(db.engine.dialect) != 'binary':
+        raise ValueError("ID_STORAGE of the target database must be 'binary'")
+    source = create_engine(source_url)
+    ids.set_storage(source, 'text')
+    copied = {}
+    try:
+        db.metadata.create_all(db.engine)
+        inspector = db.inspect(source)
+        source_tables = set(inspector.get_table_names())
+        with source.connect() as reader, db.engine.begin() as writer:
+            for table in db.metadata.sorted_tables:
+                if writer.execute(db.select(db.func.count()).select_from(table)).scalar():
+                    raise ValueError(f"Target table {table.name} is not empty")
+            for table in db.metadata.sorted_tables:
+                if table.name not in source_tables:
+                    continue
+                present = {column['name'] for column in inspector.get_columns(table.name)}
+                columns = id_columns(table)
+                copied[table.name] = 0
+                # the columns missing from the source get their default on insert
+                result = reader.execution_options(yield_per=batch_size).execute(
+                    db.select(*[column for column in table.columns if column.name in present]))
+                for partition in result.mappings().partitions():
+                    rows = [dict(row) for row in partition]
+                    check_ids(table, columns, rows)
+                    if table is Place.__table__:
+                        fill_geohash(rows)
+                    writer.execute(table.insert(), rows)
+                    copied[table.name] += len(rows)
+            rebuild_ratings(writer)
+        # the rows were inserted without the ORM: the indexes of the
+        # places are built again from the table
+        place_search.rebuild()
+        place_autocomplete.invalidate()
+    finally:
+        source.dispose()
+    return copied
@@ -1,7 +1,261 @@
-from app.models.place import Place
+import base64
+import heapq
+import json
+import numpy as np
+from app.models import geo
+from app.models.place import RATING_ORDER, Place, place_amenity
+from app.models.review import Review
 from app import db
+from app.extensions import entity_cache
 from app.persistence.repository import SQLAlchemyRepository
+from app.services.autocomplete import place_autocomplete
+from app.services.search import place_search
+
+# best rated first, ties by id: the order of ix_places_rating
+RATING_SORT = (RATING_ORDER.desc(), Place.id.desc())
+# a geohash cell holding more places is split in its 32 children
+# rather than read whole by nearby()
+NEARBY_SPLIT_ROWS = 128
+
+
+def rating_key(review_count, rating_sum):
+    """Value of RATING_ORDER for a row, computed the same way in Python"""
+    return rating_sum / review_count if review_count > 0 else 0.0
+
+
+def encode_rating_cursor(row):
+    """Opaque cursor of a rating page pointing just after row"""
+    raw = json.dumps([rating_key(row.review_count, row.rating_sum), row.id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_rating_cursor(cursor):
+    """Return the (average rating, id) pair stored in a rating cursor"""
+    try:
+        rating, place_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(rating), str(place_id)
+    except (ValueError, TypeError, AttributeError):
+        raise ValueError("Invalid cursor")
+
 
 class PlaceRepository(SQLAlchemyRepository):
+    PROFILES = {
+        # listing: columns only, serializers read owner_id
+        "summary": {},
+        # Place.to_dict_list: owner joined, amenities and reviews in one SELECT each
+        "detail": {
+            "owner": db.joinedload,
+            "amenities": db.selectinload,
+            "review_list": db.selectinload,
+        },
+    }
+
     def __init__(self):
-        super().__init__(Place)
\ No newline at end of file
+        super().__init__(Place)
+
+    def search(self, min_price=None, max_price=None, amenity_ids=None,
+               lat_min=None, lat_max=None, lon_min=None, lon_max=None,
+               profile="summary"):
+        """
+        Query of the places matching every given filter.
+        A place must have all the amenities of amenity_ids.
+        """
+        query = self.query(profile)
+        if min_price is not None:
+            query = query.filter(Place.price >= min_price)
+        if max_price is not None:
+            query = query.filter(Place.price <= max_price)
+        if lat_min is not None:
+            query = query.filter(Place.latitude >= lat_min)
+        if lat_max is not None:
+            query = query.filter(Place.latitude <= lat_max)
+        if lon_min is not None:
+            query = query.filter(Place.longitude >= lon_min)
+        if lon_max is not None:
+            query = query.filter(Place.longitude <= lon_max)
+        if amenity_ids:
+            amenity_ids = set(amenity_ids)
+            with_amenities = (
+                db.select(place_amenity.c.place_id)
+                .where(place_amenity.c.amenity_id.in_(amenity_ids))
+                .group_by(place_amenity.c.place_id)
+                .having(db.func.count() == len(amenity_ids))
+            )
+            query = query.filter(Place.id.in_(with_amenities))
+        return query
+
+    def by_rating(self, query):
+        """query ordered by average rating, best first"""
+        return query.order_by(*RATING_SORT)
+
+    def page_by_rating(self, limit, cursor=None, query=None, columns=None):
+        """
+        Keyset pagination on (average rating, id), best rated first.
+        Returns (items, next_cursor) like page(). With columns, items
+        also carry review_count and rating_sum, read by the cursor.
+        """
+        if query is None:
+            query = self.query("summary")
+        if columns is not None:
+            query = self.project(columns, query, Place.id, Place.review_count, Place.rating_sum)
+        if cursor:
+            rating, place_id = decode_rating_cursor(cursor)
+            # the first bound is the range the index seeks to, the row
+            # value comparison orders the ties
+            query = query.filter(RATING_ORDER <= rating,
+                                 db.tuple_(RATING_ORDER, Place.id) < (rating, place_id))
+        items = self.by_rating(query).limit(limit + 1).all()
+        if len(items) > limit:
+            items = items[:limit]
+            return items, encode_rating_cursor(items[-1])
+        return items, None
+
+    def adjust_ratings(self, place_id, count_delta, sum_delta):
+        """
+        Apply a review write to the rating aggregates of a place with one
+        UPDATE computed in SQL. Not committed: the caller commits it with
+        the review itself.
+        """
+        db.session.execute(
+            db.update(Place)
+            .where(Place.id == place_id)
+            .values(review_count=Place.review_count + count_delta,
+                    rating_sum=Place.rating_sum + sum_delta)
+            .execution_options(synchronize_session=False)
+        )
+        self.invalidate(place_id)
+        if count_delta:
+            place_autocomplete.notify_reviews({place_id: count_delta})
+
+    def recompute_ratings(self):
+        """
+        Repair job: rebuild review_count and rating_sum of every place
+        from one GROUP BY over reviews. Returns the number of places
+        having reviews.
+        """
+        totals = db.session.query(
+            Review.place_id, db.func.count(), db.func.sum(Review.rating)
+        ).group_by(Review.place_id).all()
+
+        db.session.execute(
+            db.update(Place).values(review_count=0, rating_sum=0)
+            .execution_options(synchronize_session=False)
+        )
+        if totals:
+            places = Place.__table__
+            db.session.execute(
+                places.update()
+                .where(places.c.id == db.bindparam('place_id'))
+                .values(review_count=db.bindparam('count'),
+                        rating_sum=db.bindparam('total')),
+                [{'place_id': place_id, 'count': count, 'total': total}
+                 for place_id, count, total in totals]
+            )
+        db.session.commit()
+        entity_cache.clear(Place)
+        place_autocomplete.invalidate()
+        return len(totals)
+
+    def backfill_geohash(self, batch_size=5000):
+        """
+        Repair job: compute the geohash of the places that have none
+        (rows written before the column or with plain SQL), batch_size
+        rows per UPDATE and commit. Returns the number of places updated.
+        """
+        places = Place.__table__
+        count = 0
+        while True:
+            rows = db.session.execute(
+                db.select(places.c.id, places.c.latitude, places.c.longitude)
+                .where(places.c.geohash.is_(None)).limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            db.session.execute(
+                places.update()
+                .where(places.c.id == db.bindparam('place_id'))
+                .values(geohash=db.bindparam('hash')),
+                [{'place_id': place_id, 'hash': geo.encode(latitude, longitude)}
+                 for place_id, latitude, longitude in rows]
+            )
+            db.session.commit()
+            count += len(rows)
+        entity_cache.clear(Place)
+        return count
+
+    def text_search(self, query, limit, columns):
+        """
+        Places matching a full-text query (see services/search.py), best
+        first. Returns a list of (row, score), row has the given columns.
+        """
+        hits = place_search.search(query, limit)
+        if not hits:
+            return []
+        rows = {row.id: row for row in self.project(columns, None, Place.id).filter(
+            Place.id.in_([place_id for place_id, _ in hits]))}
+        return [(rows[place_id], score) for place_id, score in hits if place_id in rows]
+
+    def autocomplete(self, prefix, limit):
+        """
+        (id, title, review_count) of the places whose title starts with
+        prefix, most reviewed first (in-memory index, services/autocomplete.py)
+        """
+        return place_autocomplete.complete(prefix, limit)
+
+    def nearby(self, latitude, longitude, radius_km, limit):
+        """
+        Places within radius_km of a point, closest first.
+        The geohash cells covering the circle are visited closest first
+        (a cell of more than NEARBY_SPLIT_ROWS places is split), each
+        read with one range scan on the index, and exact haversine
+        distances are computed with NumPy. The walk stops once limit
+        places are found nearer than the next cell, so a large radius
+        in a dense area reads a few small cells only.
+        Returns a list of (row, distance_km), row has id, title and price.
+        """
+        query = db.session.query(
+            Place.id, Place.title, Place.price, Place.latitude, Place.longitude)
+        prefixes = geo.cover_prefixes(latitude, longitude, radius_km)
+        if not prefixes:
+            return self._closest(query.all(), latitude, longitude, radius_km, limit)
+
+        def in_cell(prefix):
+            # prefix match as a range scan: "~" sorts after every base32 char
+            return (Place.geohash >= prefix, Place.geohash < prefix + "~")
+
+        cells = [(geo.cell_distance_km(latitude, longitude, prefix), prefix)
+                 for prefix in prefixes]
+        heapq.heapify(cells)
+        found = []
+        while cells:
+            reach, prefix = heapq.heappop(cells)
+            if reach > radius_km:
+                break
+            if len(found) >= limit and reach > found[-1][1]:
+                break  # the places of the other cells are all farther
+            rows = query.filter(*in_cell(prefix))
+            if len(prefix) < geo.PRECISION:
+                rows = rows.limit(NEARBY_SPLIT_ROWS + 1)
+            rows = rows.all()
+            if len(rows) > NEARBY_SPLIT_ROWS and len(prefix) < geo.PRECISION:
+                for char in geo.BASE32:
+                    child = prefix + char
+                    heapq.heappush(cells, (geo.cell_distance_km(latitude, longitude, child),
+                                           child))
+                continue
+            found += self._closest(rows, latitude, longitude, radius_km, limit)
+            found.sort(key=lambda hit: hit[1])
+            del found[limit:]
+        return found
+
+    @staticmethod
+    def _closest(rows, latitude, longitude, radius_km, limit):
+        """(row, distance_km) of the limit rows closest to the point, inside the radius"""
+        if not rows:
+            return []
+        coordinates = np.array([(row.latitude, row.longitude) for row in rows])
+        distances = geo.haversine_km(
+            latitude, longitude, coordinates[:, 0], coordinates[:, 1])
+        inside = np.flatnonzero(distances <= radius_km)
+        closest = inside[np.argsort(distances[inside], kind="stable")][:limit]
+        return [(rows[i], float(distances[i])) for i in closest]
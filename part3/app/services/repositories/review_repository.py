@@ -3,5 +3,28 @@ from app import db
 from app.persistence.repository import SQLAlchemyRepository
 
 class ReviewRepository(SQLAlchemyRepository):
+    PROFILES = {
+        # Review.to_dict: columns only, reads place_id and user_id
+        "summary": {},
+        # author and place joined in the same SELECT
+        "detail": {
+            "user": db.joinedload,
+            "place": db.joinedload,
+        },
+    }
+
     def __init__(self):
-        super().__init__(Review)
\ No newline at end of file
+        super().__init__(Review)
+
+    def get_by_place(self, place_id, profile=None, columns=None):
+        query = self.query(profile).filter(Review.place_id == place_id)
+        if columns is not None:
+            query = self.project(columns, query)
+        return query.all()
+
+    def exists_for_user_and_place(self, user_id, place_id):
+        """
+        EXISTS query answered by the (user_id, place_id) unique index
+        """
+        query = self.model.query.filter_by(user_id=user_id, place_id=place_id)
+        return db.session.query(query.exists()).scalar()
@@ -0,0 +1,159 @@
+"""
+Revocation of JWTs (logout, rotation of refresh tokens).
+
+The revoked_tokens table is the reference. In front of it, each
+process keeps:
+
+- a Bloom filter of every unexpired revoked jti. Almost every token
+  checked was never revoked, and the filter clears it with a few bit
+  probes, without storing or comparing the jti;
+- an exact map jti -> expiry of the latest revocations, bounded by
+  REVOCATION_CACHE_CAPACITY. A filter hit that is not in the map (a
+  false positive or an evicted entry) is settled by a primary key
+  lookup in the table.
+
+Revocations made by this process apply at once. Those made by other
+processes reach the filter at the next sync, at most
+REVOCATION_SYNC_SECONDS later. Expired rows are dropped from the map on
+sync; the filter is rebuilt when it holds more entries than it was sized for.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from app.extensions import db, jwt
+from app.models.revoked_token import RevokedToken
+from app.persistence.bloom import BloomFilter
+
+# rows committed by another process just before a sync may carry an
+# older revoked_at than the watermark: overlap the sync windows
+SYNC_OVERLAP = timedelta(seconds=5)
+
+
+def token_expiry(jwt_payload):
+    """exp claim of a token as a naive UTC datetime (like the other columns)"""
+    return datetime.fromtimestamp(jwt_payload["exp"], timezone.utc).replace(tzinfo=None)
+
+
+class _RevocationState:
+    def __init__(self, config):
+        self.capacity = config['REVOCATION_BLOOM_CAPACITY']
+        self.error_rate = config['REVOCATION_BLOOM_ERROR_RATE']
+        self.cache_capacity = config['REVOCATION_CACHE_CAPACITY']
+        self.sync_seconds = config['REVOCATION_SYNC_SECONDS']
+        self.bloom = None  # loaded from the table by the first sync
+        self.recent = OrderedDict()  # jti -> expires_at, oldest first
+        self.watermark = None  # latest revoked_at seen
+        self.next_sync = 0.0
+        self.lock = threading.Lock()
+
+    def remember(self, jti, expires_at):
+        self.recent[jti] = expires_at
+        self.recent.move_to_end(jti)
+        while len(self.recent) > self.cache_capacity:
+            self.recent.popitem(last=False)
+
+
+class RevocationStore:
+    def __init__(self, app=None):
+        self._registered = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('REVOCATION_BLOOM_CAPACITY', 100000)
+        app.config.setdefault('REVOCATION_BLOOM_ERROR_RATE', 0.01)
+        app.config.setdefault('REVOCATION_CACHE_CAPACITY', 10000)
+        app.config.setdefault('REVOCATION_SYNC_SECONDS', 5)
+        app.extensions['revocation'] = _RevocationState(app.config)
+        if not self._registered:
+            jwt.token_in_blocklist_loader(self._blocklist_loader)
+            self._registered = True
+
+    def _state(self):
+        return current_app.extensions['revocation']
+
+    def _blocklist_loader(self, jwt_header, jwt_payload):
+        return self.is_revoked(jwt_payload["jti"])
+
+    def is_revoked(self, jti):
+        """Called for every request with a token: O(1), no query in the common case"""
+        state = self._state()
+        if time.monotonic() >= state.next_sync:
+            self.sync(state)
+        if jti not in state.bloom:
+            return False
+        if jti in state.recent:
+            return True
+        row = db.session.get(RevokedToken, jti)
+        if row is None:
+            return False  # false positive of the filter
+        with state.lock:
+            state.remember(jti, row.expires_at)
+        return True
+
+    def revoke(self, jwt_payload):
+        """Revoke a decoded token (idempotent)"""
+        jti = jwt_payload["jti"]
+        expires_at = token_expiry(jwt_payload)
+        db.session.merge(RevokedToken(
+            jti=jti,
+            token_type=jwt_payload.get("type", "access"),
+            user_id=str(jwt_payload["sub"]),
+            expires_at=expires_at,
+        ))
+        db.session.commit()
+        state = self._state()
+        with state.lock:
+            if state.bloom is not None:
+                state.bloom.add(jti)
+            state.remember(jti, expires_at)
+
+    def sync(self, state=None):
+        """
+        Load the revocations committed since the last sync (all the
+        unexpired ones on the first sync or when the filter is full)
+        """
+        state = state or self._state()
+        with state.lock:
+            if state.bloom is not None and time.monotonic() < state.next_sync:
+                return  # synced by another thread meanwhile
+            now = datetime.utcnow()
+            query = db.session.query(
+                RevokedToken.jti, RevokedToken.expires_at, RevokedToken.revoked_at
+            ).filter(RevokedToken.expires_at > now)
+            rebuild = state.bloom is None or state.bloom.full()
+            if not rebuild:
+                query = query.filter(RevokedToken.revoked_at >= state.watermark - SYNC_OVERLAP)
+            rows = query.order_by(RevokedToken.revoked_at).all()
+
+            if rebuild:
+                state.bloom = BloomFilter(max(state.capacity, 2 * len(rows)),
+                                          state.error_rate)
+                state.recent.clear()
+            for jti, expires_at, revoked_at in rows:
+                if rebuild or jti not in state.bloom:
+                    state.bloom.add(jti)
+                state.remember(jti, expires_at)
+            if rows:
+                state.watermark = max(state.watermark or rows[-1][2], rows[-1][2])
+            elif state.watermark is None:
+                state.watermark = now
+
+            for jti in [jti for jti, expires_at in state.recent.items() if expires_at <= now]:
+                del state.recent[jti]
+            state.next_sync = time.monotonic() + state.sync_seconds
+
+    def stats(self):
+        state = self._state()
+        bloom = state.bloom
+        return {
+            "bloom_entries": bloom.count if bloom else 0,
+            "bloom_capacity": bloom.capacity if bloom else state.capacity,
+            "bloom_bytes": len(bloom.bits) if bloom else 0,
+            "recent": len(state.recent),
+        }
+
+
+revocation = RevocationStore()
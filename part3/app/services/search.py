@@ -0,0 +1,440 @@
+"""
+Full-text search over the title and description of the places
+(GET /places/search?q=).
+
+Two backends answer the same queries:
+
+- FTS5Index (SQLite): the FTS5 virtual table places_fts shadows
+  places.title and places.description. It is written by the mapper
+  events of Place on the connection of the flush, so it commits and
+  rolls back with the places. A database created before it gets it,
+  filled from the places, when the app is created;
+- InvertedIndex (other engines, or SEARCH_BACKEND='memory'): an
+  inverted index in the memory of the process, built from the places
+  table on the first search and updated when a transaction commits.
+  It only sees the writes of its own process between two builds.
+
+A query is a list of words, all required; `word*` matches every word
+starting with `word`. Case and accents are ignored. Both backends rank
+with BM25 as FTS5 computes it, a title hit weighing TITLE_WEIGHT
+description hits, so they return the same places in the same order.
+BM25 scores every match, so a query matching more than
+SEARCH_MAX_MATCHES places is refused (TooManyMatches, a ValueError)
+after counting them up to that cap: the endpoint is public.
+Rows inserted with Core statements (bulk import) are indexed by
+calling PlaceSearch.index_rows.
+"""
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+from flask import current_app, has_app_context
+from sqlalchemy import event, text
+from sqlalchemy.orm import object_session
+from app.extensions import db
+from app.models import ids
+from app.models.place import Place
+
+TITLE_WEIGHT = 10.0
+BM25_K1 = 1.2
+BM25_B = 0.75
+MAX_TERMS = 8
+# shorter prefixes match most places, all of which BM25 must score
+MIN_PREFIX = 3
+
+WORD = re.compile(r"[^\W_]+")
+
+
+def tokenize(value):
+    """Lowercase words of a text, accents removed (FTS5 unicode61 rules)"""
+    if not value:
+        return []
+    if not value.isascii():
+        value = "".join(char for char in unicodedata.normalize("NFKD", value)
+                        if not unicodedata.combining(char))
+    return WORD.findall(value.casefold())
+
+
+def parse_query(query):
+    """
+    [(term, is_prefix)] of a search query. Raises ValueError when it
+    has no word, too many, or a prefix shorter than MIN_PREFIX.
+    """
+    terms = []
+    for chunk in (query or "").split():
+        words = tokenize(chunk)
+        if not words:
+            continue
+        terms.extend((word, False) for word in words[:-1])
+        terms.append((words[-1], chunk.endswith("*")))
+    if not terms:
+        raise ValueError("q must contain at least one word")
+    if len(terms) > MAX_TERMS:
+        raise ValueError(f"q must contain at most {MAX_TERMS} words")
+    for term, prefix in terms:
+        if prefix and len(term) < MIN_PREFIX:
+            raise ValueError(f"A prefix needs at least {MIN_PREFIX} characters")
+    return terms
+
+
+class TooManyMatches(ValueError):
+    """A query matching more places than BM25 may score (SEARCH_MAX_MATCHES)"""
+
+    def __init__(self, max_matches):
+        super().__init__(f"q matches more than {max_matches} places: "
+                         "add a word or make the prefix longer")
+
+
+class FTS5Index:
+    """Shadow FTS5 table of the places, in the database itself"""
+    transactional = True
+    TABLE = "places_fts"
+
+    # place_key: hex of the id, one token, for the deletes (weight 0)
+    CREATE = (
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+        "place_key, title, description, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '3 4')"
+    )
+    RANK = (f"INSERT INTO {TABLE}({TABLE}, rank) "
+            f"VALUES ('rank', 'bm25(0.0, {TITLE_WEIGHT}, 1.0)')")
+    INSERT = text(f"INSERT INTO {TABLE} (place_key, title, description) "
+                  "VALUES (:key, :title, :description)")
+    DELETE = text(f"DELETE FROM {TABLE} WHERE rowid IN "
+                  f"(SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH :match)")
+    COUNT = text(f"SELECT count(*) FROM (SELECT 1 FROM {TABLE} WHERE {TABLE} MATCH :match "
+                 "LIMIT :cap)")
+    SEARCH = text(f"SELECT place_key, rank FROM {TABLE} WHERE {TABLE} MATCH :match "
+                  "ORDER BY rank LIMIT :limit")
+
+    @staticmethod
+    def key(place_id):
+        return ids.encode(place_id).hex()
+
+    def ensure(self, connection):
+        """
+        Create and fill places_fts when the places table exists without
+        it (a database older than the search). True when it was built.
+        """
+        dialect = connection.dialect
+        if (not dialect.has_table(connection, Place.__tablename__)
+                or dialect.has_table(connection, self.TABLE)):
+            return False
+        self.rebuild(connection)
+        return True
+
+    def create(self, connection):
+        connection.exec_driver_sql(self.CREATE)
+        connection.exec_driver_sql(self.RANK)
+
+    def drop(self, connection):
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {self.TABLE}")
+
+    def add(self, connection, rows):
+        """Index (place id, title, description) rows"""
+        rows = [{"key": self.key(place_id), "title": title, "description": description or ""}
+                for place_id, title, description in rows]
+        if rows:
+            connection.execute(self.INSERT, rows)
+
+    def remove(self, connection, place_ids):
+        for place_id in place_ids:
+            connection.execute(self.DELETE, {"match": f'place_key : "{self.key(place_id)}"'})
+
+    def search(self, connection, terms, limit, max_matches):
+        phrases = " AND ".join(f'"{term}"' + ("*" if prefix else "") for term, prefix in terms)
+        match = f"{{title description}} : ({phrases})"
+        # counted without ranking, and only up to the cap
+        if connection.execute(self.COUNT, {"match": match, "cap": max_matches + 1}
+                              ).scalar() > max_matches:
+            raise TooManyMatches(max_matches)
+        rows = connection.execute(self.SEARCH, {"match": match, "limit": limit})
+        return [(ids.decode(bytes.fromhex(key)), -rank) for key, rank in rows]
+
+    def rebuild(self, connection, batch_size=5000):
+        """Empty the table and index every place again; returns the count"""
+        self.drop(connection)
+        self.create(connection)
+        count = 0
+        batch = []
+        result = connection.execution_options(yield_per=batch_size).execute(
+            db.select(Place.id, Place.title, Place.description))
+        for row in result:
+            batch.append(tuple(row))
+            if len(batch) == batch_size:
+                self.add(connection, batch)
+                count += len(batch)
+                batch = []
+        self.add(connection, batch)
+        return count + len(batch)
+
+
+class InvertedIndex:
+    """
+    term -> {place id: (hits in the title, hits in the description)},
+    with the token count of every place for BM25 and the sorted list of
+    the terms for the prefix lookups.
+    """
+    transactional = False
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.built = False
+        self._reset()
+
+    def _reset(self):
+        self.postings = {}
+        self.terms = []  # sorted keys of postings
+        self.lengths = {}  # place id -> tokens (+1: the key column of FTS5)
+        self.place_terms = {}  # place id -> its distinct terms, for removals
+        self.total_length = 0
+
+    def _add(self, place_id, title, description):
+        counts = {}
+        title_words = tokenize(title)
+        description_words = tokenize(description)
+        for word in title_words:
+            counts[word] = (counts.get(word, (0, 0))[0] + 1, 0)
+        for word in description_words:
+            title_hits, description_hits = counts.get(word, (0, 0))
+            counts[word] = (title_hits, description_hits + 1)
+        new_terms = []
+        for word, hits in counts.items():
+            posting = self.postings.get(word)
+            if posting is None:
+                posting = self.postings[word] = {}
+                new_terms.append(word)
+            posting[place_id] = hits
+        self.place_terms[place_id] = tuple(counts)
+        length = len(title_words) + len(description_words) + 1
+        self.lengths[place_id] = length
+        self.total_length += length
+        return new_terms
+
+    def _remove(self, place_id):
+        terms = self.place_terms.pop(place_id, None)
+        if terms is None:
+            return
+        self.total_length -= self.lengths.pop(place_id)
+        for word in terms:
+            posting = self.postings[word]
+            del posting[place_id]
+            if not posting:
+                del self.postings[word]
+                del self.terms[bisect_left(self.terms, word)]
+
+    def add(self, connection, rows):
+        with self.lock:
+            for place_id, title, description in rows:
+                self._remove(place_id)
+                for word in self._add(place_id, title, description):
+                    self.terms.insert(bisect_left(self.terms, word), word)
+
+    def remove(self, connection, place_ids):
+        with self.lock:
+            for place_id in place_ids:
+                self._remove(place_id)
+
+    def rebuild(self, connection, batch_size=5000):
+        result = connection.execution_options(yield_per=batch_size).execute(
+            db.select(Place.id, Place.title, Place.description))
+        with self.lock:
+            self._reset()
+            for place_id, title, description in result:
+                self._add(place_id, title, description)
+            self.terms = sorted(self.postings)
+            self.built = True
+            return len(self.lengths)
+
+    def _expand(self, term, prefix):
+        if not prefix:
+            return [term] if term in self.postings else []
+        start = bisect_left(self.terms, term)
+        end = bisect_left(self.terms, term + "\U0010ffff", start)
+        return self.terms[start:end]
+
+    def _check_matches(self, expansions, max_matches):
+        """
+        Raise TooManyMatches when more than max_matches places hold every
+        phrase, counting from the rarest one and stopping past the cap
+        """
+        postings = self.postings
+        rarest = min(expansions, key=lambda words: sum(len(postings[word]) for word in words))
+        others = [words for words in expansions if words is not rarest]
+        matches = set()
+        for word in rarest:
+            for place_id in postings[word]:
+                if place_id in matches or not all(
+                        any(place_id in postings[other] for other in words) for words in others):
+                    continue
+                matches.add(place_id)
+                if len(matches) > max_matches:
+                    raise TooManyMatches(max_matches)
+
+    def search(self, connection, terms, limit, max_matches):
+        with self.lock:
+            count = len(self.lengths)
+            if not count:
+                return []
+            expansions = [self._expand(term, prefix) for term, prefix in terms]
+            if not all(expansions):
+                return []
+            self._check_matches(expansions, max_matches)
+            average = self.total_length / count
+            phrases = []  # per phrase: {place id: weighted hits}
+            for words in expansions:
+                frequencies = {}
+                for word in words:
+                    for place_id, (title_hits, description_hits) in self.postings[word].items():
+                        frequencies[place_id] = (frequencies.get(place_id, 0.0)
+                                                 + TITLE_WEIGHT * title_hits + description_hits)
+                phrases.append(frequencies)
+            candidates = set(min(phrases, key=len))
+            for frequencies in phrases:
+                candidates.intersection_update(frequencies)
+            scores = []
+            for frequencies in phrases:
+                matches = len(frequencies)
+                idf = math.log((count - matches + 0.5) / (matches + 0.5))
+                scores.append((max(idf, 1e-6), frequencies))
+            ranked = []
+            for place_id in candidates:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[place_id] / average)
+                score = 0.0
+                for idf, frequencies in scores:
+                    frequency = frequencies[place_id]
+                    score += idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+                ranked.append((score, place_id))
+        best = heapq.nsmallest(limit, ranked, key=lambda hit: (-hit[0], hit[1]))
+        return [(place_id, score) for score, place_id in best]
+
+    def stats(self):
+        return {"places": len(self.lengths), "terms": len(self.postings)}
+
+
+class _SearchState:
+    def __init__(self, app, engine):
+        backend = app.config['SEARCH_BACKEND']
+        if backend == 'auto':
+            backend = 'fts5' if engine.dialect.name == 'sqlite' else 'memory'
+        if backend == 'fts5':
+            self.index = FTS5Index()
+        elif backend == 'memory':
+            self.index = InvertedIndex()
+        else:
+            raise ValueError(f"Unknown SEARCH_BACKEND: {backend}")
+        self.backend = backend
+
+
+class PlaceSearch:
+    def __init__(self, app=None):
+        self._listening = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SEARCH_BACKEND', 'auto')
+        # BM25 scores every match: the cost of a query grows with them
+        app.config.setdefault('SEARCH_MAX_MATCHES', 20000)
+        with app.app_context():
+            state = app.extensions['place_search'] = _SearchState(app, db.engine)
+            if state.index.transactional:
+                # at startup, never in the transaction of a request
+                with db.engine.begin() as connection:
+                    state.index.ensure(connection)
+        if not self._listening:
+            event.listen(Place, 'after_insert', self._after_insert)
+            event.listen(Place, 'after_update', self._after_update)
+            event.listen(Place, 'after_delete', self._after_delete)
+            event.listen(db.session, 'after_commit', self._after_commit)
+            event.listen(db.session, 'after_soft_rollback', self._after_rollback)
+            # the shadow table follows places in create_all / drop_all
+            event.listen(Place.__table__, 'after_create', self._after_create)
+            event.listen(Place.__table__, 'before_drop', self._before_drop)
+            self._listening = True
+
+    def _state(self):
+        if not has_app_context():
+            return None
+        return current_app.extensions.get('place_search')
+
+    def search(self, query, limit):
+        """
+        [(place id, score)] best first. ValueError on an invalid query,
+        TooManyMatches when it matches more than SEARCH_MAX_MATCHES places.
+        """
+        terms = parse_query(query)
+        state = self._state()
+        connection = db.session.connection()
+        if not state.index.transactional and not state.index.built:
+            state.index.rebuild(connection)
+        return state.index.search(connection, terms, limit,
+                                  current_app.config['SEARCH_MAX_MATCHES'])
+
+    def rebuild(self):
+        """Index every place again (FTS5: committed); returns the count"""
+        state = self._state()
+        count = state.index.rebuild(db.session.connection())
+        db.session.commit()
+        return count
+
+    def index_rows(self, rows):
+        """Index (id, title, description) rows inserted without the ORM"""
+        self._write(db.session, db.session.connection(), 'add', rows)
+
+    def stats(self):
+        state = self._state()
+        stats = {"backend": state.backend}
+        if hasattr(state.index, "stats"):
+            stats.update(state.index.stats())
+        return stats
+
+    def _write(self, session, connection, operation, payload):
+        """Apply now (FTS5, same transaction) or once the session commits"""
+        state = self._state()
+        if state is None:
+            return
+        if state.index.transactional:
+            getattr(state.index, operation)(connection, payload)
+        elif state.index.built:
+            session.info.setdefault('place_search_pending', []).append((operation, payload))
+
+    def _after_insert(self, mapper, connection, target):
+        self._write(object_session(target), connection, 'add',
+                    [(target.id, target.title, target.description)])
+
+    def _after_update(self, mapper, connection, target):
+        attrs = db.inspect(target).attrs
+        if attrs.title.history.has_changes() or attrs.description.history.has_changes():
+            session = object_session(target)
+            self._write(session, connection, 'remove', [target.id])
+            self._write(session, connection, 'add',
+                        [(target.id, target.title, target.description)])
+
+    def _after_delete(self, mapper, connection, target):
+        self._write(object_session(target), connection, 'remove', [target.id])
+
+    def _after_commit(self, session):
+        pending = session.info.pop('place_search_pending', None)
+        state = self._state()
+        if not pending or state is None:
+            return
+        for operation, payload in pending:
+            getattr(state.index, operation)(None, payload)
+
+    def _after_rollback(self, session, previous_transaction):
+        if previous_transaction.parent is None:
+            session.info.pop('place_search_pending', None)
+
+    def _after_create(self, table, connection, **kw):
+        if connection.dialect.name == 'sqlite':
+            FTS5Index().create(connection)
+
+    def _before_drop(self, table, connection, **kw):
+        if connection.dialect.name == 'sqlite':
+            FTS5Index().drop(connection)
+
+
+place_search = PlaceSearch()
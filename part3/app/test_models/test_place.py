@@ -1,6 +1,7 @@
 from app.models.place import Place
 from app.models.user import User
 from app.models.review import Review
+from sqlalchemy import inspect
 
 def test_place_creation():
     owner = User(first_name="Alice", last_name="Smith", email="alice.smith@example.com")
@@ -12,8 +13,9 @@ def test_place_creation():
 
     assert place.title == "Cozy Apartment"
     assert place.price == 100
-    assert len(place.reviews) == 1
-    assert place.reviews[0].text == "Great stay!"
+    # write-only collection: the review is pending, nothing was loaded
+    assert review.place is place
+    assert inspect(place).attrs.reviews.history.added == [review]
     print("Place creation and relationship test passed!")
 
 test_place_creation()
@@ -0,0 +1,86 @@
+# Add the “part3/” folder to the import path so that “app”
+# is recognized as a module when tests are run from this folder
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+import unittest
+import uuid
+from contextlib import contextmanager
+from sqlalchemy import event
+from app import create_app
+from app.extensions import db
+
+
+class BaseTestCase(unittest.TestCase):
+    """
+    Fresh in-memory database and test client for every test
+    """
+
+    def setUp(self):
+        self.app = create_app("config.TestingConfig")
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    @contextmanager
+    def assert_max_selects(self, budget):
+        """
+        Fail the test when the block runs more than budget SELECT statements.
+        The session is emptied first so the identity map cannot hide queries.
+        """
+        db.session.remove()
+        selects = []
+
+        def count(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT"):
+                selects.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", count)
+        try:
+            yield selects
+        finally:
+            event.remove(db.engine, "before_cursor_execute", count)
+        if len(selects) > budget:
+            self.fail(f"{len(selects)} SELECT statements, budget is {budget}:\n"
+                      + "\n".join(selects))
+
+    def create_user(self, password="secret"):
+        """Register a user through the API and return (id, headers)"""
+        email = f"user{uuid.uuid4().hex}@example.com"
+        resp = self.client.post('/api/v1/users/', json={
+            "first_name": "John",
+            "last_name": "Doe",
+            "email": email,
+            "password": password
+        })
+        self.assertEqual(resp.status_code, 201)
+        user_id = resp.get_json()["id"]
+        login = self.client.post('/api/v1/auth/login', json={
+            "email": email,
+            "password": password
+        })
+        self.assertEqual(login.status_code, 200)
+        token = login.get_json()["access_token"]
+        return user_id, {"Authorization": f"Bearer {token}"}
+
+    def create_place(self, headers, **fields):
+        """Create a place through the API and return its id"""
+        payload = {
+            "title": "Test Studio",
+            "description": "Nice and clean",
+            "price": 100.0,
+            "latitude": 45.0,
+            "longitude": 2.0,
+            "amenities": []
+        }
+        payload.update(fields)
+        resp = self.client.post('/api/v1/places/', json=payload, headers=headers)
+        self.assertEqual(resp.status_code, 201)
+        return resp.get_json()["id"]
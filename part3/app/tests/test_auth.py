@@ -0,0 +1,76 @@
+import unittest
+from unittest import mock
+from app.tests.base import BaseTestCase
+from app.extensions import bcrypt
+from app.models.user import User
+
+
+class TestLogin(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user_id, _ = self.create_user(password="secret")
+        self.email = User.query.get(self.user_id).email
+
+    def login(self, password="secret"):
+        return self.client.post('/api/v1/auth/login', json={
+            "email": self.email,
+            "password": password
+        })
+
+    def test_invalid_password(self):
+        self.assertEqual(self.login("wrong").status_code, 401)
+
+    def test_rehash_on_cost_change(self):
+        self.app.config['BCRYPT_LOG_ROUNDS'] = 5
+        self.assertEqual(self.login().status_code, 200)
+        stored = User.query.get(self.user_id).password
+        self.assertTrue(stored.startswith("$2b$05$"))
+        self.assertEqual(self.login().status_code, 200)
+
+    def test_busy_pool_answers_503(self):
+        slots = self.app.extensions['hashing_pool'].slots
+        taken = 0
+        while slots.acquire(blocking=False):
+            taken += 1
+        try:
+            r = self.login()
+        finally:
+            for _ in range(taken):
+                slots.release()
+        self.assertEqual(r.status_code, 503)
+        self.assertEqual(r.headers["Retry-After"], "1")
+        self.assertEqual(self.login().status_code, 200)
+
+
+class TestHashCount(BaseTestCase):
+    """Every registration or password change costs exactly one bcrypt hash"""
+
+    def count_hashes(self):
+        return mock.patch.object(bcrypt, 'generate_password_hash',
+                                 wraps=bcrypt.generate_password_hash)
+
+    def test_registration(self):
+        with self.count_hashes() as generate:
+            r = self.client.post('/api/v1/users/', json={
+                "first_name": "Jane",
+                "last_name": "Doe",
+                "email": "jane@example.com",
+                "password": "secret"
+            })
+        self.assertEqual(r.status_code, 201)
+        self.assertEqual(generate.call_count, 1)
+
+    def test_password_change(self):
+        admin_id, admin_headers = self.create_user()
+        with self.count_hashes() as generate:
+            r = self.client.put(f'/api/v1/users/{admin_id}', json={
+                "password": "new-secret"
+            }, headers=admin_headers)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(generate.call_count, 1)
+        self.assertTrue(User.query.get(admin_id).verify_password("new-secret"))
+
+
+if __name__ == "__main__":
+    unittest.main()
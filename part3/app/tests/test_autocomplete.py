@@ -0,0 +1,154 @@
+import json
+import random
+import unittest
+from app.extensions import db
+from app.models.place import Place
+from app.services.autocomplete import (SCAN_LIMIT, TitleIndex, normalize,
+                                       normalize_prefix, place_autocomplete)
+from app.tests.base import BaseTestCase
+
+
+class TestTitleIndex(unittest.TestCase):
+
+    def test_normalize(self):
+        self.assertEqual(normalize("  Café près-de la MER!"), "cafe pres de la mer")
+        self.assertEqual(normalize_prefix("Sea "), "sea ")
+        self.assertEqual(normalize_prefix("!!"), "")
+
+    def test_matches_a_full_scan_through_writes(self):
+        """The cached best places of a prefix stay exact through every write"""
+        rng = random.Random(3)
+        index = TitleIndex(capacity=10000, cache_prefixes=100, top_size=8)
+        titles = {}
+        counts = {}
+
+        def expected(prefix, limit):
+            matches = [(-counts[pid], normalize(titles[pid]), pid) for pid in titles
+                       if normalize(titles[pid]).startswith(prefix)]
+            return [pid for _, _, pid in sorted(matches)[:limit]]
+
+        for step in range(3000):
+            place_id = f"p{rng.randrange(2 * SCAN_LIMIT):04d}"
+            action = rng.random()
+            if action < 0.5:
+                titles[place_id] = rng.choice(["Sea", "Sun", "Snow"]) + f" {rng.randrange(50)}"
+                counts[place_id] = rng.randrange(5)
+                index.put([(place_id, titles[place_id], counts[place_id])])
+            elif action < 0.8 and place_id in titles:
+                delta = rng.choice([-1, 1, 2])
+                counts[place_id] += delta
+                index.adjust({place_id: delta})
+            elif place_id in titles:
+                del titles[place_id], counts[place_id]
+                index.remove([place_id])
+            if step % 50 == 0:
+                for prefix in ("s", "se", "sea 1"):
+                    self.assertEqual([hit[0] for hit in index.complete(prefix, 5)],
+                                     expected(prefix, 5), (step, prefix))
+        self.assertTrue(index.tops)
+        index.tops.clear()
+        index._warm()  # as ranked by a rebuild
+        self.assertIn("s", index.tops)
+        for prefix in ("s", "se", "sea 1"):
+            self.assertEqual([hit[0] for hit in index.complete(prefix, 5)], expected(prefix, 5))
+
+    def test_capacity_keeps_the_most_reviewed(self):
+        index = TitleIndex(capacity=3, cache_prefixes=10, top_size=4)
+        index.put([("a", "Alpha", 5), ("b", "Beta", 1), ("c", "Gamma", 2)])
+        index.put([("d", "Delta", 0)])  # less reviewed than every place
+        self.assertEqual(sorted(index.places), ["a", "b", "c"])
+        index.put([("e", "Epsilon", 3)])
+        self.assertEqual(sorted(index.places), ["a", "c", "e"])
+        self.assertEqual(index.complete("b", 10), [])
+        self.assertEqual(len(index.keys), 3)
+
+
+class TestAutocompleteEndpoint(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.owner_id, self.headers = self.create_user()
+        self.ids = {title: self.create_place(self.headers, title=title)
+                    for title in ("Sea view loft", "Seaside cabin", "Séjour à Paris",
+                                  "Mountain chalet")}
+        self.guests = [self.create_user()[1] for _ in range(2)]
+
+    def complete(self, prefix, status=200, **args):
+        resp = self.client.get('/api/v1/places/autocomplete',
+                               query_string=dict(args, prefix=prefix))
+        self.assertEqual(resp.status_code, status, resp.get_json())
+        return resp.get_json()
+
+    def titles(self, prefix, **args):
+        return [place["title"] for place in self.complete(prefix, **args)]
+
+    def review(self, title, headers):
+        resp = self.client.post('/api/v1/reviews/', json={
+            "text": "Nice", "rating": 4, "place_id": self.ids[title]}, headers=headers)
+        self.assertEqual(resp.status_code, 201)
+        return resp.get_json()["id"]
+
+    def test_ranked_by_review_count(self):
+        self.assertEqual(self.titles("se"), ["Sea view loft", "Seaside cabin", "Séjour à Paris"])
+        for headers in self.guests:
+            self.review("Seaside cabin", headers)
+        review_id = self.review("Séjour à Paris", self.guests[0])
+        self.assertEqual(self.titles("SE"), ["Seaside cabin", "Séjour à Paris", "Sea view loft"])
+        self.assertEqual(self.complete("sea", limit=1),
+                         [{"id": self.ids["Seaside cabin"], "title": "Seaside cabin",
+                           "review_count": 2}])
+        self.assertEqual(self.titles("sea "), ["Sea view loft"])
+        self.client.delete(f'/api/v1/reviews/{review_id}', headers=self.guests[0])
+        self.assertEqual(self.titles("sej"), ["Séjour à Paris"])
+        self.assertEqual(self.complete("sej")[0]["review_count"], 0)
+
+    def test_index_follows_place_writes(self):
+        self.titles("m")  # built by the first query
+        resp = self.client.put(f'/api/v1/places/{self.ids["Mountain chalet"]}',
+                               json={"title": "Snow chalet"}, headers=self.headers)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(self.titles("m"), [])
+        self.assertEqual(self.titles("sn"), ["Snow chalet"])
+        db.session.delete(db.session.get(Place, self.ids["Sea view loft"]))
+        db.session.commit()
+        self.assertEqual(self.titles("sea"), ["Seaside cabin"])
+
+        db.session.add(Place(title="Ghost house", description="", price=1.0,
+                             latitude=1.0, longitude=1.0, owner_id=self.owner_id))
+        db.session.flush()
+        db.session.rollback()
+        self.assertEqual(self.titles("gh"), [])
+
+    def test_bulk_import_and_repair(self):
+        self.titles("s")
+        guest_id = self.create_user()[0]
+        lines = [{"type": "place", "title": "Imported barn", "price": 10,
+                  "latitude": 1.0, "longitude": 1.0, "owner_id": self.owner_id},
+                 {"type": "review", "text": "Ok", "rating": 3, "user_id": guest_id,
+                  "place_id": self.ids["Mountain chalet"]}]
+        resp = self.client.post('/api/v1/import/',
+                                data="".join(json.dumps(line) + "\n" for line in lines),
+                                content_type='application/x-ndjson', headers=self.headers)
+        self.assertEqual(resp.get_json()["inserted"], {"amenity": 0, "place": 1, "review": 1})
+        self.assertEqual(self.titles("imp"), ["Imported barn"])
+        self.assertEqual(self.complete("mou")[0]["review_count"], 1)
+
+        db.session.execute(db.update(Place).values(title="Renamed"))
+        db.session.commit()
+        self.app.test_cli_runner().invoke(args=["hbnb", "repair-ratings"])
+        self.assertEqual(len(self.titles("renamed")), 5)
+
+    def test_invalid_arguments(self):
+        self.complete("", status=400)
+        self.complete("?!", status=400)
+        self.complete("se", status=400, limit=0)
+        self.assertEqual(len(self.titles("s", limit=500)), 3)
+
+    def test_warm_at_startup(self):
+        self.assertFalse(place_autocomplete.stats()["built"])
+        self.assertEqual(place_autocomplete.warm(), 4)
+        self.assertEqual(place_autocomplete.stats()["places"], 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import json
+from app.tests.base import BaseTestCase
+from app.extensions import db
+from app.models.amenity import Amenity
+from app.models.place import Place
+from app.models.review import Review
+from app.services import facade
+
+
+def ndjson(*rows):
+    return "".join(json.dumps(row) + "\n" for row in rows)
+
+
+class TestBulkImport(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        # the first registered user is admin
+        self.admin_id, self.admin_headers = self.create_user()
+        self.owner_id, self.owner_headers = self.create_user()
+        self.guest_id, _ = self.create_user()
+
+    def post_import(self, body, headers=None):
+        return self.client.post('/api/v1/import/', data=body,
+                                content_type='application/x-ndjson',
+                                headers=headers or self.admin_headers)
+
+    def test_import_rows_of_every_type(self):
+        amenity_id = "a" * 8 + "-0000-0000-0000-" + "0" * 12
+        place_id = "b" * 8 + "-0000-0000-0000-" + "0" * 12
+        resp = self.post_import(ndjson(
+            {"type": "amenity", "id": amenity_id, "name": "Wifi"},
+            {"type": "place", "id": place_id, "title": "Loft", "price": 80,
+             "latitude": 48.8, "longitude": 2.3, "owner_id": self.owner_id.upper(),
+             "amenities": [amenity_id.upper()]},
+            # references in upper case: the same rows
+            {"type": "review", "text": "Great", "rating": 5,
+             "place_id": place_id.upper(), "user_id": self.guest_id.upper()},
+        ))
+        self.assertEqual(resp.status_code, 200)
+        report = resp.get_json()
+        self.assertEqual(report["inserted"], {"amenity": 1, "place": 1, "review": 1})
+        self.assertEqual(report["error_count"], 0)
+
+        place = db.session.get(Place, place_id)
+        self.assertEqual([a.name for a in place.amenities], ["Wifi"])
+        self.assertIsNotNone(place.geohash)
+        self.assertEqual((place.review_count, place.rating_sum), (1, 5))
+
+    def test_bad_rows_are_reported_and_skipped(self):
+        resp = self.post_import(ndjson(
+            {"type": "amenity", "name": "Pool"},
+            {"type": "place", "title": "Bad", "price": -1, "latitude": 0,
+             "longitude": 0, "owner_id": self.owner_id},
+            {"type": "place", "title": "Orphan", "price": 10, "latitude": 0,
+             "longitude": 0, "owner_id": "missing"},
+            {"type": "castle", "name": "Nope"},
+            {"type": "amenity", "name": "Pool"},
+            {"type": "place", "title": 5, "price": 10, "latitude": 0.0,
+             "longitude": 0.0, "owner_id": self.owner_id},
+            {"type": "place", "title": "Listed", "price": 10, "latitude": 0.0,
+             "longitude": 0.0, "owner_id": [1]},
+            {"type": "place", "title": "Nested", "price": 10, "latitude": 0.0,
+             "longitude": 0.0, "owner_id": self.owner_id, "amenities": [{"id": "x"}]},
+        ) + "{not json\n")
+        report = resp.get_json()
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(report["rows"], 9)
+        self.assertEqual(report["inserted"]["amenity"], 1)
+        self.assertEqual(report["inserted"]["place"], 0)
+        self.assertEqual([e["line"] for e in report["errors"]], [2, 3, 4, 6, 7, 8, 9, 5])
+        self.assertEqual([e["error"] for e in report["errors"][3:6]], [
+            "Title must be a string", "Invalid id in owner_id: [1]",
+            "Invalid id in amenities: {'id': 'x'}"])
+        self.assertEqual(Amenity.query.count(), 1)
+        self.assertEqual(Place.query.count(), 0)
+
+    def test_review_rules_apply(self):
+        place_id = self.create_place(self.owner_headers)
+        report = facade.import_ndjson(ndjson(
+            {"type": "review", "text": "Mine", "rating": 5,
+             "place_id": place_id, "user_id": self.owner_id},
+            {"type": "review", "text": "Nice", "rating": 4,
+             "place_id": place_id, "user_id": self.guest_id},
+            {"type": "review", "text": "Again", "rating": 1,
+             "place_id": place_id, "user_id": self.guest_id},
+        ).splitlines())
+        self.assertEqual(report["inserted"]["review"], 1)
+        self.assertEqual([e["error"] for e in report["errors"]], [
+            "You cannot review your own place",
+            "You have already reviewed this place",
+        ])
+        self.assertEqual(Review.query.count(), 1)
+
+    def test_rows_are_committed_per_batch(self):
+        lines = ndjson(*({"type": "amenity", "name": f"Amenity {i}"}
+                         for i in range(25))).splitlines()
+        report = facade.import_ndjson(lines, batch_size=10)
+        self.assertEqual(report["inserted"]["amenity"], 25)
+        self.assertEqual(Amenity.query.count(), 25)
+
+    def test_import_requires_admin(self):
+        resp = self.post_import(ndjson({"type": "amenity", "name": "Spa"}),
+                                headers=self.owner_headers)
+        self.assertEqual(resp.status_code, 403)
+
+    def test_cli_import(self):
+        runner = self.app.test_cli_runner()
+        result = runner.invoke(args=["hbnb", "import", "-"], input=ndjson(
+            {"type": "amenity", "name": "Sauna"},
+            {"type": "amenity", "name": ""},
+        ))
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn("2 rows read: inserted 1 amenity, 0 place, 0 review, 1 errors",
+                      result.output)
+        self.assertEqual(Amenity.query.filter_by(name="Sauna").count(), 1)
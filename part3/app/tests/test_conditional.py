@@ -0,0 +1,105 @@
+from app.tests.base import BaseTestCase
+
+
+class TestConditionalRequests(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.owner_id, self.headers = self.create_user()
+        self.place_id = self.create_place(self.headers)
+
+    def revalidate(self, url, response):
+        return self.client.get(url, headers={"If-None-Match": response.headers["ETag"]})
+
+    def test_entity_etag_and_304(self):
+        url = f'/api/v1/places/{self.place_id}'
+        r = self.client.get(url)
+        self.assertEqual(r.status_code, 200)
+        self.assertTrue(r.headers["ETag"].startswith('"'))
+
+        again = self.revalidate(url, r)
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.get_data(), b"")
+        self.assertEqual(again.headers["ETag"], r.headers["ETag"])
+
+    def test_last_modified_of_a_single_row(self):
+        url = f'/api/v1/users/{self.owner_id}'
+        r = self.client.get(url)
+        since = self.client.get(url, headers={"If-Modified-Since": r.headers["Last-Modified"]})
+        self.assertEqual(since.status_code, 304)
+
+    def test_deletions_are_not_hidden_by_if_modified_since(self):
+        """Removing an older row leaves max(updated_at) unchanged"""
+        guests = [self.create_user()[1] for _ in range(2)]
+        review_ids = [self.client.post('/api/v1/reviews/', json={
+            "text": "Nice", "rating": 4, "place_id": self.place_id
+        }, headers=headers).get_json()["id"] for headers in guests]
+        for url in ('/api/v1/reviews/', '/api/v1/reviews/?limit=10',
+                    f'/api/v1/places/{self.place_id}'):
+            self.assertNotIn("Last-Modified", self.client.get(url).headers, url)
+        stamp = "Wed, 01 Jan 2100 00:00:00 GMT"
+        self.client.delete(f'/api/v1/reviews/{review_ids[0]}', headers=guests[0])
+        r = self.client.get('/api/v1/reviews/', headers={"If-Modified-Since": stamp})
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(len(r.get_json()), 1)
+
+    def test_entity_changes_break_the_etag(self):
+        url = f'/api/v1/places/{self.place_id}'
+        r = self.client.get(url)
+        self.client.put(url, json={"title": "Renamed"}, headers=self.headers)
+        self.assertEqual(self.revalidate(url, r).status_code, 200)
+
+    def test_place_detail_follows_its_relations(self):
+        url = f'/api/v1/places/{self.place_id}'
+        r = self.client.get(url)
+        _, headers = self.create_user()
+        resp = self.client.post('/api/v1/reviews/', json={
+            "text": "Nice", "rating": 4, "place_id": self.place_id
+        }, headers=headers)
+        review_id = resp.get_json()["id"]
+        r = self.revalidate(url, r)
+        self.assertEqual(r.status_code, 200)
+
+        # a text-only edit leaves place.updated_at untouched
+        self.client.put(f'/api/v1/reviews/{review_id}', json={"text": "Very nice"},
+                        headers=headers)
+        r = self.revalidate(url, r)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.get_json()["reviews"][0]["text"], "Very nice")
+
+        amenity = self.client.post('/api/v1/amenities/', json={"name": "Sauna"},
+                                   headers=self.headers).get_json()
+        self.client.post(f'/api/v1/places/{self.place_id}/amenities',
+                         json={"amenities": [amenity["id"]]}, headers=self.headers)
+        self.assertEqual(self.revalidate(url, r).status_code, 200)
+
+    def test_collection_version(self):
+        url = '/api/v1/places/'
+        r = self.client.get(url)
+        self.assertEqual(self.revalidate(url, r).status_code, 304)
+
+        # filters are part of the ETag
+        filtered = self.client.get(url + '?max_price=10',
+                                   headers={"If-None-Match": r.headers["ETag"]})
+        self.assertEqual(filtered.status_code, 200)
+
+        self.create_place(self.headers, title="Another")
+        self.assertEqual(self.revalidate(url, r).status_code, 200)
+
+    def test_review_changes_update_listing_version(self):
+        url = '/api/v1/places/'
+        r = self.client.get(url)
+        _, headers = self.create_user()
+        self.client.post('/api/v1/reviews/', json={
+            "text": "Nice", "rating": 4, "place_id": self.place_id
+        }, headers=headers)
+        r = self.revalidate(url, r)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.get_json()[0]["review_count"], 1)
+
+    def test_page_etag(self):
+        url = '/api/v1/users/?limit=10'
+        r = self.client.get(url)
+        self.assertEqual(self.revalidate(url, r).status_code, 304)
+        self.create_user()
+        self.assertEqual(self.revalidate(url, r).status_code, 200)
@@ -0,0 +1,121 @@
+import unittest
+from app.tests.base import BaseTestCase
+from app.extensions import entity_cache
+from app.persistence.cache import LRUCache, LocalSharedClient, SharedCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_least_recently_used_is_evicted(self):
+        cache = LRUCache(capacity=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.set("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("c"), 3)
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["evictions"]), (3, 1, 1))
+
+    def test_entries_expire(self):
+        clock = FakeClock()
+        cache = LRUCache(capacity=10, ttl=5, clock=clock)
+        cache.set("a", 1)
+        clock.now = 4.9
+        self.assertEqual(cache.get("a"), 1)
+        clock.now = 5.0
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["expirations"], 1)
+        self.assertEqual(cache.stats()["size"], 0)
+
+    def test_shared_cache_on_local_client(self):
+        clock = FakeClock()
+        client = LocalSharedClient(clock=clock)
+        places = SharedCache(client, "places", ttl=5)
+        users = SharedCache(client, "users", ttl=5)
+        places.set("1", {"title": "Loft"})
+        users.set("1", {"email": "a@b.c"})
+        self.assertEqual(places.get("1"), {"title": "Loft"})
+        places.clear()
+        self.assertIsNone(places.get("1"))
+        self.assertEqual(users.get("1"), {"email": "a@b.c"})
+        clock.now = 5.0
+        self.assertIsNone(users.get("1"))
+
+
+class TestEntityCache(BaseTestCase):
+    BACKEND = 'memory'
+
+    def setUp(self):
+        super().setUp()
+        self.app.config['ENTITY_CACHE_BACKEND'] = self.BACKEND
+        entity_cache.init_app(self.app)
+        self.admin_id, self.admin_headers = self.create_user()
+        self.place_id = self.create_place(self.admin_headers, title="Loft")
+
+    def test_second_read_hits_the_cache(self):
+        self.client.get(f'/api/v1/users/{self.admin_id}')
+        with self.assert_max_selects(0):
+            r = self.client.get(f'/api/v1/users/{self.admin_id}')
+        self.assertEqual(r.get_json()["id"], self.admin_id)
+        self.assertGreaterEqual(entity_cache.stats()["users"]["hits"], 1)
+
+    def test_place_detail_from_cache(self):
+        first = self.client.get(f'/api/v1/places/{self.place_id}').get_json()
+        with self.assert_max_selects(3):
+            second = self.client.get(f'/api/v1/places/{self.place_id}').get_json()
+        self.assertEqual(first, second)
+
+    def test_update_invalidates(self):
+        self.client.get(f'/api/v1/places/{self.place_id}')
+        r = self.client.put(f'/api/v1/places/{self.place_id}',
+                            json={"title": "Renamed"}, headers=self.admin_headers)
+        self.assertEqual(r.status_code, 200)
+        r = self.client.get(f'/api/v1/places/{self.place_id}')
+        self.assertEqual(r.get_json()["title"], "Renamed")
+
+    def test_review_writes_invalidate_rating_aggregates(self):
+        self.client.get(f'/api/v1/places/{self.place_id}')
+        _, headers = self.create_user()
+        r = self.client.post('/api/v1/reviews/', json={
+            "text": "Great", "rating": 4, "place_id": self.place_id
+        }, headers=headers)
+        review_id = r.get_json()["id"]
+        place = self.client.get(f'/api/v1/places/{self.place_id}').get_json()
+        self.assertEqual(place["review_count"], 1)
+
+        self.client.get(f'/api/v1/reviews/{review_id}')
+        self.client.delete(f'/api/v1/reviews/{review_id}', headers=headers)
+        self.assertEqual(self.client.get(f'/api/v1/reviews/{review_id}').status_code, 404)
+        place = self.client.get(f'/api/v1/places/{self.place_id}').get_json()
+        self.assertEqual(place["review_count"], 0)
+
+    def test_metrics_endpoint(self):
+        self.client.get(f'/api/v1/places/{self.place_id}')
+        self.client.get(f'/api/v1/places/{self.place_id}')
+        r = self.client.get('/api/v1/metrics/cache', headers=self.admin_headers)
+        self.assertEqual(r.status_code, 200)
+        places = r.get_json()["places"]
+        self.assertEqual(places["ttl"], 60)
+        self.assertGreaterEqual(places["hits"], 1)
+        _, headers = self.create_user()
+        r = self.client.get('/api/v1/metrics/cache', headers=headers)
+        self.assertEqual(r.status_code, 403)
+
+
+class TestSharedEntityCache(TestEntityCache):
+    """Same behaviour with the shared backend on its local stand-in"""
+    BACKEND = 'shared'
+
+
+if __name__ == "__main__":
+    unittest.main()
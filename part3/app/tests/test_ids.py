@@ -0,0 +1,186 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+import uuid
+from sqlalchemy import text
+import config
+from app import create_app
+from app.extensions import db
+from app.models import geo, ids
+from app.models.amenity import Amenity
+from app.models.place import Place
+from app.models.user import User
+from app.tests.base import BaseTestCase
+
+# Tables of the original layout (ids as text, no geohash nor rating
+# aggregates), as the first db.create_all() wrote them
+BASELINE_SCHEMA = """
+CREATE TABLE users (
+    first_name VARCHAR(50) NOT NULL, last_name VARCHAR(50) NOT NULL,
+    email VARCHAR(120) NOT NULL, password VARCHAR(128) NOT NULL, is_admin BOOLEAN,
+    id VARCHAR(36) NOT NULL, created_at DATETIME, updated_at DATETIME,
+    PRIMARY KEY (id), UNIQUE (email));
+CREATE TABLE amenities (
+    name VARCHAR(50) NOT NULL,
+    id VARCHAR(36) NOT NULL, created_at DATETIME, updated_at DATETIME,
+    PRIMARY KEY (id), UNIQUE (name));
+CREATE TABLE places (
+    title VARCHAR(100) NOT NULL, description TEXT, price FLOAT NOT NULL,
+    latitude FLOAT NOT NULL, longitude FLOAT NOT NULL, owner_id VARCHAR(36) NOT NULL,
+    id VARCHAR(36) NOT NULL, created_at DATETIME, updated_at DATETIME,
+    PRIMARY KEY (id), FOREIGN KEY(owner_id) REFERENCES users (id));
+CREATE TABLE place_amenity (
+    place_id VARCHAR(36) NOT NULL, amenity_id VARCHAR(36) NOT NULL,
+    PRIMARY KEY (place_id, amenity_id),
+    FOREIGN KEY(place_id) REFERENCES places (id),
+    FOREIGN KEY(amenity_id) REFERENCES amenities (id));
+CREATE TABLE reviews (
+    text TEXT NOT NULL, rating INTEGER NOT NULL,
+    place_id VARCHAR(36) NOT NULL, user_id VARCHAR(36) NOT NULL,
+    id VARCHAR(36) NOT NULL, created_at DATETIME, updated_at DATETIME,
+    PRIMARY KEY (id),
+    FOREIGN KEY(place_id) REFERENCES places (id),
+    FOREIGN KEY(user_id) REFERENCES users (id));
+"""
+
+
+class TestUUID7(unittest.TestCase):
+
+    def test_time_ordered_version_7(self):
+        values = [ids.uuid7() for _ in range(10000)]
+        self.assertEqual(values, sorted(values))
+        self.assertEqual(len(set(values)), len(values))
+        parsed = uuid.UUID(values[0])
+        self.assertEqual(parsed.version, 7)
+        self.assertEqual(parsed.variant, uuid.RFC_4122)
+
+    def test_codec(self):
+        value = str(uuid.uuid4())
+        self.assertEqual(ids.encode(value), uuid.UUID(value).bytes)
+        self.assertEqual(ids.decode(ids.encode(value)), value)
+        self.assertEqual(ids.canonical(value.upper()), value)
+        for bad in ("missing", value[:-1] + "g", value.replace("-", ""), None, 42):
+            with self.assertRaises(ValueError):
+                ids.encode(bad)
+
+
+class TestBinaryIds(BaseTestCase):
+
+    def test_ids_stored_in_16_bytes(self):
+        _, headers = self.create_user()
+        place_id = self.create_place(headers)
+        self.assertEqual(uuid.UUID(place_id).version, 7)
+        sizes = db.session.execute(text(
+            "SELECT length(id), length(owner_id), typeof(id) FROM places")).one()
+        self.assertEqual(tuple(sizes), (16, 16, "blob"))
+        resp = self.client.get(f'/api/v1/places/{place_id.upper()}')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.get_json()["id"], place_id)
+
+    def test_malformed_id_matches_nothing(self):
+        self.assertEqual(self.client.get('/api/v1/places/not-an-id').status_code, 404)
+        with self.assertRaises(ValueError):
+            Amenity(id="not-an-id", name="Wifi")
+
+
+class TestIdMigration(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.apps = []
+
+    def tearDown(self):
+        for app in self.apps:
+            with app.app_context():
+                db.engine.dispose()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def make_app(self, name, storage):
+        class FileConfig(config.TestingConfig):
+            SQLALCHEMY_DATABASE_URI = self.url(name)
+            ID_STORAGE = storage
+
+        app = create_app(FileConfig)
+        self.apps.append(app)
+        return app
+
+    def url(self, name):
+        return f"sqlite:///{os.path.join(self.tmpdir, name)}"
+
+    def seed_legacy(self):
+        """A database of the original layout: uuid4 ids as 36-char text"""
+        ids_ = {name: str(uuid.uuid4())
+                for name in ("ann", "bob", "eve", "wifi", "place", "review", "other")}
+        now = "2024-01-01 00:00:00.000000"
+        connection = sqlite3.connect(os.path.join(self.tmpdir, "legacy.db"))
+        try:
+            connection.executescript(BASELINE_SCHEMA)
+            connection.executemany(
+                "INSERT INTO users VALUES (?, ?, ?, 'secret', 0, ?, ?, ?)",
+                [("Ann", "Lee", "ann@example.com", ids_["ann"], now, now),
+                 ("Bob", "Ray", "bob@example.com", ids_["bob"], now, now),
+                 ("Eve", "Kim", "eve@example.com", ids_["eve"], now, now)])
+            connection.execute("INSERT INTO amenities VALUES ('Wifi', ?, ?, ?)",
+                               (ids_["wifi"], now, now))
+            connection.execute(
+                "INSERT INTO places VALUES ('Loft', NULL, 80.0, 48.8, 2.3, ?, ?, ?, ?)",
+                (ids_["ann"], ids_["place"], now, now))
+            connection.execute("INSERT INTO place_amenity VALUES (?, ?)",
+                               (ids_["place"], ids_["wifi"]))
+            connection.executemany(
+                "INSERT INTO reviews VALUES ('Great', ?, ?, ?, ?, ?, ?)",
+                [(5, ids_["place"], ids_["bob"], ids_["review"], now, now),
+                 (2, ids_["place"], ids_["eve"], ids_["other"], now, now)])
+            connection.commit()
+        finally:
+            connection.close()
+        return ids_["place"], ids_["review"]
+
+    def test_copy_to_binary_ids(self):
+        place_id, review_id = self.seed_legacy()
+        target = self.make_app("hbnb.db", "binary")
+        result = target.test_cli_runner().invoke(
+            args=["hbnb", "migrate-ids", self.url("legacy.db")])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("reviews: 2 rows", result.output)
+        with target.app_context():
+            self.assertEqual(db.session.execute(text(
+                "SELECT typeof(id), length(id) FROM places")).one(), ("blob", 16))
+            place = db.session.get(Place, place_id)
+            self.assertEqual([a.name for a in place.amenities], ["Wifi"])
+            self.assertIn(review_id, [r.id for r in place.review_list])
+            self.assertEqual(place.owner.email, "ann@example.com")
+            # columns the original layout did not have
+            self.assertEqual(place.geohash, geo.encode(48.8, 2.3))
+            self.assertEqual((place.review_count, place.rating_sum), (2, 7))
+        resp = target.test_client().get('/api/v1/places/nearby', query_string={
+            "lat": 48.8, "lon": 2.3, "radius": 1})
+        self.assertEqual([hit["id"] for hit in resp.get_json()], [place_id])
+        resp = target.test_client().get('/api/v1/places/search', query_string={"q": "loft"})
+        self.assertEqual([hit["id"] for hit in resp.get_json()], [place_id])
+        # the target is not empty any more: a second run is refused
+        result = target.test_cli_runner().invoke(
+            args=["hbnb", "migrate-ids", self.url("legacy.db")])
+        self.assertNotEqual(result.exit_code, 0)
+        self.assertIn("not empty", result.output)
+
+    def test_malformed_id_aborts_the_copy(self):
+        self.seed_legacy()
+        connection = sqlite3.connect(os.path.join(self.tmpdir, "legacy.db"))
+        with connection:
+            connection.execute("UPDATE amenities SET id = 'wifi'")
+            connection.execute("UPDATE place_amenity SET amenity_id = 'wifi'")
+        connection.close()
+        target = self.make_app("hbnb.db", "binary")
+        result = target.test_cli_runner().invoke(
+            args=["hbnb", "migrate-ids", self.url("legacy.db")])
+        self.assertNotEqual(result.exit_code, 0)
+        self.assertIn("amenities.id: 'wifi' is not a UUID", result.output)
+        with target.app_context():
+            self.assertEqual(db.session.query(User).count(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
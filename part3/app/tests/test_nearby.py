@@ -0,0 +1,120 @@
+import random
+import unittest
+from unittest import mock
+from app.tests.base import BaseTestCase
+from app.extensions import db
+from app.models import geo
+from app.models.place import Place
+from app.services.repositories import place_repository
+
+
+class TestGeohash(unittest.TestCase):
+
+    def test_encode(self):
+        self.assertEqual(geo.encode(57.64911, 10.40744, 11), "u4pruydqqvj")
+
+    def test_cover_contains_center_cell(self):
+        prefixes = geo.cover_prefixes(48.8566, 2.3522, 10)
+        self.assertLessEqual(len(prefixes), geo.MAX_CELLS)
+        self.assertTrue(any(geo.encode(48.8566, 2.3522).startswith(p) for p in prefixes))
+
+    def test_cover_across_antimeridian(self):
+        prefixes = geo.cover_prefixes(0.0, 179.99, 5)
+        precision = len(next(iter(prefixes)))
+        self.assertIn(geo.encode(0.0, -179.99, precision), prefixes)
+        self.assertIn(geo.encode(0.0, 179.99, precision), prefixes)
+
+    def test_cell_distance_is_a_lower_bound(self):
+        rng = random.Random(5)
+        for _ in range(500):
+            latitude, longitude = rng.uniform(-80, 80), rng.uniform(-180, 180)
+            cell = geo.encode(latitude + rng.uniform(-2, 2),
+                              (longitude + rng.uniform(-2, 2) + 180) % 360 - 180, 4)
+            south, north, west, east = geo.bounds(cell)
+            points = [(rng.uniform(south, north), rng.uniform(west, east)) for _ in range(50)]
+            closest = min(geo.haversine_km(latitude, longitude, [lat], [lon])[0]
+                          for lat, lon in points)
+            self.assertLessEqual(geo.cell_distance_km(latitude, longitude, cell), closest + 1e-9)
+        self.assertEqual(geo.cell_distance_km(48.8566, 2.3522, geo.encode(48.8566, 2.3522, 5)), 0)
+
+    def test_cover_pole(self):
+        prefixes = geo.cover_prefixes(89.9, 0.0, 50)
+        precision = len(next(iter(prefixes)))
+        self.assertIn(geo.encode(89.95, 179.0, precision), prefixes)
+
+
+class TestNearbyEndpoint(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.owner_id, self.headers = self.create_user()
+        headers = self.headers
+        # Paris, Versailles (~17 km), Lyon (~390 km)
+        self.paris = self.create_place(headers, latitude=48.8566, longitude=2.3522)
+        self.versailles = self.create_place(headers, latitude=48.8049, longitude=2.1204)
+        self.lyon = self.create_place(headers, latitude=45.764, longitude=4.8357)
+
+    def nearby(self, query):
+        return self.client.get(f'/api/v1/places/nearby?{query}')
+
+    def test_radius_and_order(self):
+        r = self.nearby("lat=48.86&lon=2.35&radius_km=25")
+        self.assertEqual(r.status_code, 200)
+        body = r.get_json()
+        self.assertEqual([p["id"] for p in body], [self.paris, self.versailles])
+        self.assertLess(body[0]["distance_km"], 1)
+
+    def test_small_radius(self):
+        r = self.nearby("lat=48.86&lon=2.35&radius_km=5")
+        self.assertEqual([p["id"] for p in r.get_json()], [self.paris])
+
+    def test_closest_first_across_cells(self):
+        """The walk stopping early returns what sorting every candidate would"""
+        rng = random.Random(9)
+        places = [Place(title=f"P{i}", description="", price=1.0, owner_id=self.owner_id,
+                        latitude=rng.uniform(48.0, 49.6), longitude=rng.uniform(1.5, 3.2))
+                  for i in range(400)]
+        db.session.add_all(places)
+        db.session.commit()
+        distances = sorted(
+            (geo.haversine_km(48.86, 2.35, [p.latitude], [p.longitude])[0], p.id)
+            for p in places + [db.session.get(Place, place_id)
+                               for place_id in (self.paris, self.versailles, self.lyon)])
+        # cells read whole, then split down to a few places each
+        for split_rows in (place_repository.NEARBY_SPLIT_ROWS, 4):
+            with mock.patch.object(place_repository, "NEARBY_SPLIT_ROWS", split_rows):
+                for radius, limit in ((5, 3), (30, 10), (60, 50), (200, 20)):
+                    expected = [place_id for distance, place_id in distances
+                                if distance <= radius][:limit]
+                    body = self.nearby(
+                        f"lat=48.86&lon=2.35&radius_km={radius}&limit={limit}").get_json()
+                    self.assertEqual([p["id"] for p in body], expected,
+                                     (split_rows, radius, limit))
+
+    def test_geohash_follows_coordinates(self):
+        r = self.client.put(f'/api/v1/places/{self.lyon}', json={
+            "latitude": 48.857, "longitude": 2.353
+        }, headers=self.headers)
+        self.assertEqual(r.status_code, 200)
+        r = self.nearby("lat=48.86&lon=2.35&radius_km=5")
+        self.assertCountEqual([p["id"] for p in r.get_json()], [self.paris, self.lyon])
+
+    def test_rebuild_geohash_command(self):
+        db.session.execute(db.update(Place).values(geohash=None))
+        db.session.commit()
+        self.assertEqual(self.nearby("lat=48.86&lon=2.35&radius_km=25").get_json(), [])
+        result = self.app.test_cli_runner().invoke(
+            args=["hbnb", "rebuild-geohash", "--batch-size", "2"])
+        self.assertIn("for 3 places", result.output)
+        r = self.nearby("lat=48.86&lon=2.35&radius_km=25")
+        self.assertEqual([p["id"] for p in r.get_json()], [self.paris, self.versailles])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.nearby("lon=2.35").status_code, 400)
+        self.assertEqual(self.nearby("lat=95&lon=2.35").status_code, 400)
+        self.assertEqual(self.nearby("lat=48&lon=2&radius_km=-1").status_code, 400)
+        self.assertEqual(self.nearby("lat=48&lon=2&radius_km=100000").status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+import unittest
+from sqlalchemy import event
+from app.extensions import db
+from app.models.place import Place
+from app.services import facade
+from app.tests.base import BaseTestCase
+
+
+class TestPlacePagination(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.owner_id, self.headers = self.create_user()
+        self.place_ids = [
+            self.create_place(self.headers, title=f"Place {i}") for i in range(5)
+        ]
+
+    def test_full_list_without_parameters(self):
+        r = self.client.get('/api/v1/places/')
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(len(r.get_json()), 5)
+
+    def test_pages_follow_next_cursor(self):
+        seen = []
+        url = '/api/v1/places/?limit=2'
+        while True:
+            r = self.client.get(url)
+            self.assertEqual(r.status_code, 200)
+            body = r.get_json()
+            self.assertLessEqual(len(body["items"]), 2)
+            seen.extend(p["id"] for p in body["items"])
+            if body["next_cursor"] is None:
+                break
+            url = f'/api/v1/places/?limit=2&cursor={body["next_cursor"]}'
+        self.assertEqual(seen, self.place_ids)
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get('/api/v1/places/?limit=0').status_code, 400)
+        self.assertEqual(self.client.get('/api/v1/places/?limit=abc').status_code, 400)
+        self.assertEqual(self.client.get('/api/v1/places/?cursor=abc').status_code, 400)
+
+    def test_users_page(self):
+        r = self.client.get('/api/v1/users/?limit=10')
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual([u["id"] for u in r.get_json()["items"]], [self.owner_id])
+        self.assertIsNone(r.get_json()["next_cursor"])
+
+
+class TestPlaceRatingSort(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        _, headers = self.create_user()
+        self.place_ids = [self.create_place(headers, title=f"Place {i}") for i in range(6)]
+        # (review_count, rating_sum): averages 4.5, 2, none, 5, 2, 3.5
+        places = Place.__table__
+        for place_id, (count, total) in zip(self.place_ids, [
+                (2, 9), (1, 2), (0, 0), (1, 5), (3, 6), (2, 7)]):
+            db.session.execute(places.update().where(places.c.id == place_id)
+                               .values(review_count=count, rating_sum=total))
+        db.session.commit()
+        ties = sorted([self.place_ids[1], self.place_ids[4]], reverse=True)
+        self.expected = ([self.place_ids[3], self.place_ids[0], self.place_ids[5]]
+                         + ties + [self.place_ids[2]])
+
+    def test_full_list_and_pages(self):
+        r = self.client.get('/api/v1/places/?sort=rating')
+        self.assertEqual([p["id"] for p in r.get_json()], self.expected)
+        seen = []
+        url = '/api/v1/places/?sort=rating&limit=2'
+        while url:
+            body = self.client.get(url).get_json()
+            seen.extend(p["id"] for p in body["items"])
+            url = body["next_cursor"] and \
+                f'/api/v1/places/?sort=rating&limit=2&cursor={body["next_cursor"]}'
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(self.client.get('/api/v1/places/?sort=price').status_code, 400)
+
+    def test_page_seeks_the_rating_index(self):
+        _, cursor = facade.search_places({}, limit=2, sort="rating")
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append((statement, parameters))
+
+        event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            facade.search_places({}, limit=2, cursor=cursor, sort="rating")
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record)
+        statement, parameters = statements[-1]
+        plan = db.session.connection().exec_driver_sql(
+            f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+        self.assertIn("SEARCH places USING INDEX ix_places_rating", plan[0][-1])
+
+
+class TestPlaceFilters(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        _, self.headers = self.create_user()
+        self.cheap = self.create_place(self.headers, price=40.0,
+                                       latitude=48.85, longitude=2.35)
+        self.mid = self.create_place(self.headers, price=90.0,
+                                     latitude=43.6, longitude=1.44)
+        self.expensive = self.create_place(self.headers, price=250.0,
+                                           latitude=40.71, longitude=-74.0)
+
+    def ids(self, query):
+        r = self.client.get(f'/api/v1/places/?{query}')
+        self.assertEqual(r.status_code, 200)
+        body = r.get_json()
+        items = body["items"] if isinstance(body, dict) else body
+        return [p["id"] for p in items]
+
+    def test_price_range(self):
+        self.assertCountEqual(self.ids("max_price=100"), [self.cheap, self.mid])
+        self.assertCountEqual(self.ids("min_price=50&max_price=100"), [self.mid])
+
+    def test_bounding_box(self):
+        # France only
+        query = "lat_min=41&lat_max=51&lon_min=-5&lon_max=10"
+        self.assertCountEqual(self.ids(query), [self.cheap, self.mid])
+
+    def test_amenities_all_required(self):
+        amenity_ids = []
+        for name in ("WiFi", "Pool"):
+            r = self.client.post('/api/v1/amenities/', json={"name": name},
+                                 headers=self.headers)
+            amenity_ids.append(r.get_json()["id"])
+        self.client.post(f'/api/v1/places/{self.mid}/amenities',
+                         json={"amenities": amenity_ids}, headers=self.headers)
+        self.client.post(f'/api/v1/places/{self.cheap}/amenities',
+                         json={"amenities": amenity_ids[:1]}, headers=self.headers)
+        query = f"amenity={amenity_ids[0]}&amenity={amenity_ids[1]}"
+        self.assertCountEqual(self.ids(query), [self.mid])
+        self.assertCountEqual(self.ids(f"amenity={amenity_ids[0]}"), [self.cheap, self.mid])
+
+    def test_filters_with_pagination(self):
+        self.assertEqual(self.ids("max_price=100&limit=1"), [self.cheap])
+
+    def test_invalid_filter(self):
+        self.assertEqual(self.client.get('/api/v1/places/?max_price=cheap').status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
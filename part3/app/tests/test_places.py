@@ -0,0 +1,63 @@
+import unittest
+from sqlalchemy import event
+from app.tests.base import BaseTestCase
+from app.extensions import db
+from app.models.place import Place
+
+
+class TestCreatePlaceTransaction(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        _, self.headers = self.create_user()
+        self.amenity_ids = []
+        for i in range(20):
+            r = self.client.post('/api/v1/amenities/', json={"name": f"Amenity {i}"},
+                                 headers=self.headers)
+            self.amenity_ids.append(r.get_json()["id"])
+
+    def count_commits(self, fn):
+        commits = []
+        listener = lambda conn: commits.append(conn)
+        event.listen(db.engine, "commit", listener)
+        try:
+            result = fn()
+        finally:
+            event.remove(db.engine, "commit", listener)
+        return result, len(commits)
+
+    def post_place(self, amenity_ids):
+        return self.client.post('/api/v1/places/', json={
+            "title": "Big house",
+            "description": "Everything included",
+            "price": 300.0,
+            "latitude": 45.0,
+            "longitude": 2.0,
+            "amenities": amenity_ids
+        }, headers=self.headers)
+
+    def test_one_commit_with_20_amenities(self):
+        r, commits = self.count_commits(lambda: self.post_place(self.amenity_ids))
+        self.assertEqual(r.status_code, 201)
+        self.assertEqual(commits, 1)
+        place = self.client.get(f'/api/v1/places/{r.get_json()["id"]}').get_json()
+        self.assertEqual(len(place["amenities"]), 20)
+
+    def test_unknown_amenity_rolls_back(self):
+        r = self.post_place(self.amenity_ids[:2] + ["unknown-id"])
+        self.assertEqual(r.status_code, 404)
+        self.assertEqual(Place.query.count(), 0)
+
+
+class TestPlaceDetail(BaseTestCase):
+
+    def test_public_owner_has_no_email(self):
+        owner_id, headers = self.create_user()
+        place_id = self.create_place(headers)
+        place = self.client.get(f'/api/v1/places/{place_id}').get_json()
+        self.assertEqual(set(place["owner"]), {"id", "first_name", "last_name"})
+        self.assertEqual(place["owner"]["id"], owner_id)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+from contextlib import contextmanager
+from sqlalchemy import event
+from app.tests.base import BaseTestCase
+from app.extensions import db
+from app.models.place import Place
+from app.services import facade
+
+
+class TestColumnProjection(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.owner_id, self.headers = self.create_user()
+        self.place_ids = [self.create_place(self.headers, title=f"Place {i}",
+                                            description="x" * 1000)
+                          for i in range(3)]
+
+    @contextmanager
+    def selects(self):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT"):
+                statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record)
+
+    def test_get_all_returns_named_tuples(self):
+        rows = facade.place_repo.get_all(columns=["id", Place.title])
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]._fields, ("id", "title"))
+        self.assertCountEqual([row.id for row in rows], self.place_ids)
+        self.assertFalse(isinstance(rows[0], Place))
+
+    def test_page_adds_the_cursor_columns(self):
+        rows, cursor = facade.place_repo.page(2, columns=["title"])
+        self.assertEqual([row.title for row in rows], ["Place 0", "Place 1"])
+        rows, cursor = facade.place_repo.page(2, cursor, columns=["title"])
+        self.assertEqual([row.id for row in rows], self.place_ids[2:])
+        self.assertIsNone(cursor)
+
+    def test_listings_do_not_read_the_description(self):
+        for url in ('/api/v1/places/', '/api/v1/places/?limit=2',
+                    '/api/v1/places/?stream=1', '/api/v1/places/?max_price=500'):
+            with self.selects() as statements:
+                r = self.client.get(url)
+                r.get_data()
+            self.assertEqual(r.status_code, 200, url)
+            self.assertTrue(statements)
+            for statement in statements:
+                self.assertNotIn("description", statement, url)
+
+    def test_listing_output_is_unchanged(self):
+        body = self.client.get('/api/v1/places/').get_json()
+        self.assertEqual(set(body[0]), {"id", "title", "price", "review_count",
+                                        "average_rating"})
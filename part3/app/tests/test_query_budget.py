@@ -0,0 +1,132 @@
+import unittest
+from app.tests.base import BaseTestCase
+from app.extensions import entity_cache
+
+
+class TestQueryBudget(BaseTestCase):
+    """
+    SELECT budgets of the public read endpoints: they must not grow
+    with the number of amenities or reviews (no N+1 queries)
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.owner_id, owner_headers = self.create_user()
+        amenity_ids = []
+        for name in ("WiFi", "Pool", "Parking"):
+            r = self.client.post('/api/v1/amenities/', json={"name": name},
+                                 headers=owner_headers)
+            self.assertEqual(r.status_code, 201)
+            amenity_ids.append(r.get_json()["id"])
+        self.place_id = self.create_place(owner_headers)
+        r = self.client.post(f'/api/v1/places/{self.place_id}/amenities',
+                             json={"amenities": amenity_ids}, headers=owner_headers)
+        self.assertEqual(r.status_code, 200)
+        self.create_place(owner_headers, title="Second place")
+        for _ in range(3):
+            _, headers = self.create_user()
+            r = self.client.post('/api/v1/reviews/', json={
+                "text": "Very nice!",
+                "rating": 5,
+                "place_id": self.place_id
+            }, headers=headers)
+            self.assertEqual(r.status_code, 201)
+
+    def test_place_detail(self):
+        with self.assert_max_selects(3):
+            r = self.client.get(f'/api/v1/places/{self.place_id}')
+        self.assertEqual(r.status_code, 200)
+        body = r.get_json()
+        self.assertEqual(body["owner"]["id"], self.owner_id)
+        self.assertEqual(len(body["amenities"]), 3)
+        self.assertEqual(len(body["reviews"]), 3)
+
+    def test_place_list(self):
+        # collection version (ETag) + the list itself
+        with self.assert_max_selects(2):
+            r = self.client.get('/api/v1/places/')
+        self.assertEqual(len(r.get_json()), 2)
+        # a revalidation only reads the version
+        with self.assert_max_selects(1):
+            r = self.client.get('/api/v1/places/',
+                                headers={"If-None-Match": r.headers["ETag"]})
+        self.assertEqual(r.status_code, 304)
+
+    def test_place_reviews(self):
+        with self.assert_max_selects(2):
+            r = self.client.get(f'/api/v1/places/{self.place_id}/reviews')
+        self.assertEqual(len(r.get_json()), 3)
+
+    def test_review_list(self):
+        with self.assert_max_selects(2):
+            r = self.client.get('/api/v1/reviews/')
+        self.assertEqual(len(r.get_json()), 3)
+
+
+class TestWriteBudget(BaseTestCase):
+    """
+    Authorization of the writes reads no user: the JWT gives the caller,
+    ownership compares owner_id / user_id
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.app.config['ENTITY_CACHE_BACKEND'] = None
+        entity_cache.init_app(self.app)
+        self.create_user()  # the first user is admin
+        _, self.owner = self.create_user()
+        self.place_id = self.create_place(self.owner)
+        _, self.author = self.create_user()
+        r = self.client.post('/api/v1/reviews/', json={
+            "text": "Very nice!", "rating": 5, "place_id": self.place_id
+        }, headers=self.author)
+        self.assertEqual(r.status_code, 201)
+        self.review_id = r.get_json()["id"]
+
+    def test_update_place(self):
+        # the place, then its amenities for the response
+        with self.assert_max_selects(2):
+            r = self.client.put(f'/api/v1/places/{self.place_id}',
+                                json={"title": "Renamed"}, headers=self.owner)
+        self.assertEqual(r.status_code, 200)
+        with self.assert_max_selects(1):
+            r = self.client.put(f'/api/v1/places/{self.place_id}',
+                                json={"title": "Stolen"}, headers=self.author)
+        self.assertEqual(r.status_code, 403)
+
+    def test_update_review(self):
+        with self.assert_max_selects(2):
+            r = self.client.put(f'/api/v1/reviews/{self.review_id}',
+                                json={"text": "Fine", "rating": 3}, headers=self.author)
+        self.assertEqual(r.status_code, 200)
+        with self.assert_max_selects(1):
+            r = self.client.put(f'/api/v1/reviews/{self.review_id}',
+                                json={"text": "Bad", "rating": 1}, headers=self.owner)
+        self.assertEqual(r.status_code, 403)
+
+    def test_create_review_and_place(self):
+        # user, place, already reviewed check, place aggregates refresh:
+        # the reviews of the place and of the user are never loaded
+        _, headers = self.create_user()
+        with self.assert_max_selects(4) as selects:
+            r = self.client.post('/api/v1/reviews/', json={
+                "text": "Good", "rating": 4, "place_id": self.place_id
+            }, headers=headers)
+        self.assertEqual(r.status_code, 201)
+        # a lazy collection load filters on "? = reviews.<foreign key>"
+        self.assertFalse([s for s in selects if "? = reviews." in s])
+        with self.assert_max_selects(2) as selects:
+            self.create_place(self.owner, title="Another one")
+        self.assertFalse([s for s in selects if "? = places.owner_id" in s])
+
+    def test_delete_review(self):
+        with self.assert_max_selects(1):
+            r = self.client.delete(f'/api/v1/reviews/{self.review_id}',
+                                   headers=self.author)
+        self.assertEqual(r.status_code, 204)
+        r = self.client.get(f'/api/v1/places/{self.place_id}')
+        self.assertEqual(r.get_json()["reviews"], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
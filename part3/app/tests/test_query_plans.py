@@ -0,0 +1,225 @@
+import re
+import unittest
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from app.extensions import db, entity_cache
+from app.models import geo
+from app.models.amenity import Amenity
+from app.models.place import Place, place_amenity
+from app.models.review import Review
+from app.models.user import User
+from app.services import facade
+from app.tests.base import BaseTestCase
+
+# A SCAN of a table with more rows than this fails the test
+SCAN_THRESHOLD = 100
+
+SCAN = re.compile(r"SCAN (\w+)(?: USING (?:COVERING )?INDEX (\w+))?")
+
+
+class TestQueryPlans(BaseTestCase):
+    """
+    EXPLAIN QUERY PLAN of the statements run by every repository query.
+    None may SCAN a table larger than SCAN_THRESHOLD, except:
+    - the whole-table operations (listings, exports, versions, repair
+      job), which read every row by design;
+    - an ordered walk of an index under a LIMIT (keyset pages), which
+      stops after the page.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.app.config['ENTITY_CACHE_BACKEND'] = None  # every get() hits the database
+        entity_cache.init_app(self.app)
+        self.seed(users=300, places=300, reviews=600, amenities=20)
+        self.sizes = {table: db.session.execute(db.select(db.func.count()).select_from(
+            db.table(table))).scalar() for table in db.metadata.tables}
+
+    def seed(self, users, places, reviews, amenities):
+        now = datetime.utcnow()
+
+        def rows(count, make):
+            return [dict(make(i), id=str(uuid.uuid4()), created_at=now + timedelta(microseconds=i),
+                         updated_at=now) for i in range(count)]
+
+        self.users = rows(users, lambda i: {
+            "first_name": "Plan", "last_name": f"User{i}", "email": f"plan{i}@example.com",
+            "password": "x", "is_admin": False})
+        self.places = rows(places, lambda i: {
+            "title": f"Place {i}", "description": "", "price": float(i % 500),
+            "latitude": -80.0 + (i * 7.31) % 160.0, "longitude": -170.0 + (i * 13.17) % 340.0,
+            "owner_id": self.users[i % users]["id"]})
+        for place in self.places:
+            place["geohash"] = geo.encode(place["latitude"], place["longitude"])
+        self.reviews = rows(reviews, lambda i: {
+            "text": "Fine", "rating": 1 + i % 5, "user_id": self.users[i // places]["id"],
+            "place_id": self.places[i % places]["id"]})
+        self.amenities = rows(amenities, lambda i: {"name": f"Amenity {i}"})
+        links = [{"place_id": place["id"], "amenity_id": self.amenities[(i + k) % amenities]["id"]}
+                 for i, place in enumerate(self.places) for k in range(2)]
+        for model, values in ((User, self.users), (Place, self.places),
+                              (Review, self.reviews), (Amenity, self.amenities)):
+            db.session.execute(model.__table__.insert(), values)
+        db.session.execute(place_amenity.insert(), links)
+        db.session.commit()
+
+    @contextmanager
+    def capture(self):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if not executemany and not statement.lstrip().upper().startswith("EXPLAIN"):
+                statements.append((statement, parameters))
+
+        db.session.remove()
+        event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record)
+
+    def full_scans(self, statement, parameters):
+        """SCAN steps of the plan of a statement over tables above the threshold"""
+        plan = db.session.connection().exec_driver_sql(
+            f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+        scans = []
+        for row in plan:
+            match = SCAN.match(row[-1])
+            if not match or self.sizes.get(match.group(1), 0) <= SCAN_THRESHOLD:
+                continue
+            if match.group(2) and re.search(r"\bLIMIT\b", statement):
+                continue  # ordered index walk, stopped by the LIMIT
+            scans.append(row[-1])
+        return scans
+
+    def assert_no_full_scan(self, name, operation):
+        with self.capture() as statements:
+            operation()
+        self.assertTrue(statements, f"{name}: no statement captured")
+        for statement, parameters in statements:
+            scans = self.full_scans(statement, parameters)
+            if scans:
+                self.fail(f"{name}: {', '.join(scans)} in\n{statement}")
+
+    def operations(self):
+        """(name, callable) of every repository query with selective filters"""
+        user = self.users[7]
+        place = self.places[11]
+        review = self.reviews[13]
+        amenity = self.amenities[3]
+        _, cursor = facade.place_repo.page(5)
+        _, rating_cursor = facade.place_repo.page_by_rating(5)
+        return [
+            ("user by id", lambda: facade.get_user(user["id"])),
+            ("user by email", lambda: facade.get_user_by_email(user["email"])),
+            ("users page", lambda: facade.get_users_page(5, cursor=None)),
+            ("places of an owner", lambda: db.session.scalars(
+                facade.get_user(user["id"]).places.select()).all()),
+            ("reviews of a user", lambda: db.session.scalars(
+                facade.get_user(user["id"]).reviews.select()).all()),
+            ("place detail", lambda: facade.get_place(place["id"], "detail").to_dict_list()),
+            ("places by price", lambda: facade.search_places({"min_price": 10, "max_price": 12})),
+            ("places in a box", lambda: facade.search_places(
+                {"lat_min": 10, "lat_max": 11, "lon_min": 10, "lon_max": 12})),
+            ("places with amenities", lambda: facade.search_places(
+                {"amenity_ids": [amenity["id"]], "min_price": 10, "max_price": 20})),
+            ("places of an amenity", lambda: db.session.get(Amenity, amenity["id"]).places),
+            ("places page", lambda: facade.search_places({}, limit=5, cursor=cursor)),
+            ("places by rating page", lambda: facade.search_places(
+                {}, limit=5, cursor=rating_cursor, sort="rating")),
+            ("places version", lambda: facade.places_version({"min_price": 10, "max_price": 12})),
+            ("nearby places", lambda: facade.get_nearby_places(
+                place["latitude"], place["longitude"], 50, 10)),
+            ("rating update", lambda: facade.place_repo.adjust_ratings(place["id"], 0, 0)),
+            ("review by id", lambda: facade.get_review(review["id"], "detail")),
+            ("reviews of a place", lambda: facade.get_reviews_by_place(place["id"])),
+            ("already reviewed", lambda: facade.user_already_reviewed(
+                review["user_id"], review["place_id"])),
+            ("reviews page", lambda: facade.get_reviews_page(5)),
+            ("amenities by ids", lambda: facade.amenity_repo.get_many(
+                [amenity["id"], self.amenities[4]["id"]])),
+        ]
+
+    def test_no_full_scan(self):
+        for name, operation in self.operations():
+            with self.subTest(name):
+                self.assert_no_full_scan(name, operation)
+
+    def test_harness_detects_a_full_scan(self):
+        with self.assertRaises(AssertionError):
+            self.assert_no_full_scan("reviews by text", lambda: db.session.query(Review).filter(
+                Review.text == "Fine").all())
+
+    def test_foreign_keys_are_indexed(self):
+        indexed = {(table.name, column.name)
+                   for table in db.metadata.sorted_tables
+                   for index in table.indexes
+                   for column in list(index.columns)[:1]}
+        indexed |= {(table.name, list(constraint.columns)[0].name)
+                    for table in db.metadata.sorted_tables
+                    for constraint in table.constraints
+                    if isinstance(constraint, (db.PrimaryKeyConstraint, db.UniqueConstraint))
+                    and constraint.columns}
+        for table in db.metadata.sorted_tables:
+            for key in table.foreign_keys:
+                with self.subTest(f"{table.name}.{key.parent.name}"):
+                    self.assertIn((table.name, key.parent.name), indexed)
+
+
+class TestCreateIndexes(BaseTestCase):
+    """flask hbnb create-indexes on a database older than the models"""
+
+    def setUp(self):
+        super().setUp()
+        # a reviews table without its indexes nor its unique constraint
+        for statement in ("ALTER TABLE reviews RENAME TO reviews_old",
+                          "CREATE TABLE reviews AS SELECT * FROM reviews_old",
+                          "DROP TABLE reviews_old"):
+            db.session.execute(db.text(statement))
+        db.session.commit()
+        self.owner_id, self.headers = self.create_user()
+        self.place_id = self.create_place(self.headers)
+        self.guest_id = self.create_user()[0]
+
+    def add_review(self):
+        db.session.execute(db.insert(Review).values(
+            id=str(uuid.uuid4()), text="Fine", rating=4, user_id=self.guest_id,
+            place_id=self.place_id, created_at=datetime.utcnow(), updated_at=datetime.utcnow()))
+        db.session.commit()
+
+    def create_indexes(self):
+        return self.app.test_cli_runner().invoke(args=["hbnb", "create-indexes"])
+
+    def unique_indexes(self):
+        return {index["name"] for index in db.inspect(db.engine).get_indexes("reviews")
+                if index["unique"]}
+
+    def test_unique_constraints_become_unique_indexes(self):
+        self.add_review()
+        result = self.create_indexes()
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("uq_reviews_user_place", result.output)
+        self.assertIn("ix_reviews_place_id", result.output)
+        self.assertEqual(self.unique_indexes(), {"uq_reviews_user_place"})
+        with self.assertRaises(IntegrityError):
+            self.add_review()
+        db.session.rollback()
+        # nothing left to create; the metadata is untouched
+        self.assertEqual(self.create_indexes().output.strip(), "0 indexes created")
+        self.assertNotIn("uq_reviews_user_place",
+                         {index.name for index in Review.__table__.indexes})
+
+    def test_duplicates_are_reported(self):
+        self.add_review()
+        self.add_review()
+        result = self.create_indexes()
+        self.assertNotEqual(result.exit_code, 0)
+        self.assertIn("uq_reviews_user_place: duplicate rows in reviews", result.output)
+        self.assertEqual(self.unique_indexes(), set())
+
+
+if __name__ == "__main__":
+    unittest.main()
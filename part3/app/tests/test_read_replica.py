@@ -0,0 +1,140 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+from sqlalchemy import event, text
+import config
+from app import create_app
+from app.extensions import db, entity_cache, read_replica
+from app.persistence.routing import STICKY_COOKIE
+from app.tests.base import BaseTestCase
+from app.tests.test_entity_cache import FakeClock
+
+
+class TestReadReplica(BaseTestCase):
+    """The replica is a second SQLite file, refreshed by replicate()"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.primary = os.path.join(self.tmpdir, "primary.db")
+        self.replica = os.path.join(self.tmpdir, "replica.db")
+
+        class ReplicaConfig(config.TestingConfig):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{self.primary}"
+            SQLALCHEMY_BINDS = {'replica': f"sqlite:///{self.replica}"}
+
+        self.app = create_app(ReplicaConfig)
+        self.client = self.app.test_client()
+        self.clock = FakeClock()
+        self.app.extensions['read_replica'].clock = self.clock
+        # requests run in their own app context (and session)
+        with self.app.app_context():
+            db.create_all()
+        self.replicate()
+
+        self.statements = {"primary": 0, "replica": 0}
+        with self.app.app_context():
+            for name, engine in (("primary", db.engines[None]),
+                                 ("replica", db.engines['replica'])):
+                event.listen(engine, "before_cursor_execute", self.counter(name))
+
+    def tearDown(self):
+        with self.app.app_context():
+            for engine in db.engines.values():
+                engine.dispose()
+        # db.init_app registered a metadata for the bind on the shared db
+        db.metadatas.pop('replica', None)
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def counter(self, name):
+        def count(conn, cursor, statement, parameters, context, executemany):
+            self.statements[name] += 1
+        return count
+
+    def replicate(self):
+        """Copy the primary into the replica (replication catching up)"""
+        with self.app.app_context():
+            db.engines['replica'].dispose()
+        source, target = sqlite3.connect(self.primary), sqlite3.connect(self.replica)
+        try:
+            source.backup(target)
+        finally:
+            source.close()
+            target.close()
+
+    def test_get_reads_replica_until_replicated(self):
+        owner_id, owner = self.create_user()
+        reader_id, reader = self.create_user()
+        self.clock.now = 60  # past the stickiness of the logins
+        place_id = self.create_place(owner)
+
+        # not replicated yet: other users (their own cookie jar) read the replica
+        other = self.app.test_client()
+        resp = other.get(f'/api/v1/places/{place_id}', headers=reader)
+        self.assertEqual(resp.status_code, 404)
+        self.replicate()
+        resp = other.get(f'/api/v1/places/{place_id}', headers=reader)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.get_json()["owner"]["id"], owner_id)
+
+    def test_read_your_writes(self):
+        owner_id, owner = self.create_user()
+        place_id = self.create_place(owner)
+
+        self.statements.update(primary=0, replica=0)
+        resp = self.client.get(f'/api/v1/places/{place_id}', headers=owner)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(self.statements["replica"], 0)
+
+        # the window closes: the owner reads the (stale) replica again
+        self.clock.now = 60
+        resp = self.client.get(f'/api/v1/places/{place_id}', headers=owner)
+        self.assertEqual(resp.status_code, 404)
+
+    def test_window_follows_the_client_across_workers(self):
+        owner_id, owner = self.create_user()
+        place_id = self.create_place(owner)
+        cookie = self.client.get_cookie(STICKY_COOKIE)
+        self.assertIsNotNone(cookie)
+        # another worker: it never saw the write, only the cookie tells
+        self.app.extensions['read_replica'].recent.clear()
+        resp = self.app.test_client().get(f'/api/v1/places/{place_id}', headers=owner)
+        self.assertEqual(resp.status_code, 404)
+        other = self.app.test_client()
+        other.set_cookie(STICKY_COOKIE, cookie.value)
+        resp = other.get(f'/api/v1/places/{place_id}', headers=owner)
+        self.assertEqual(resp.status_code, 200)
+        # a forged window longer than REPLICA_STICKY_SECONDS is ignored
+        other.set_cookie(STICKY_COOKIE, "1e12")
+        resp = other.get(f'/api/v1/places/{place_id}', headers=owner)
+        self.assertEqual(resp.status_code, 404)
+
+    def test_writes_go_to_primary(self):
+        owner_id, owner = self.create_user()
+        self.replicate()
+        self.clock.now = 60
+        # first token check: loads the revoked tokens from the primary
+        self.client.get('/api/v1/places/', headers=owner)
+        self.statements.update(primary=0, replica=0)
+        resp = self.client.get('/api/v1/places/', headers=owner)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(self.statements["primary"], 0)
+        self.assertGreater(self.statements["replica"], 0)
+
+        self.statements.update(primary=0, replica=0)
+        self.create_place(owner)
+        self.assertEqual(self.statements["replica"], 0)
+
+    def test_replica_reads_are_not_cached(self):
+        owner_id, owner = self.create_user()
+        self.replicate()
+        self.clock.now = 60
+        with self.app.app_context():
+            with read_replica.reads():
+                self.assertTrue(read_replica.active())
+                self.assertEqual(db.session.execute(
+                    text("SELECT COUNT(*) FROM users")).scalar(), 1)
+                entity_cache.clear()
+                self.client.get(f'/api/v1/users/{owner_id}', headers=owner)
+            self.assertFalse(read_replica.active())
+            self.assertEqual(entity_cache.stats().get("users", {}).get("size", 0), 0)
@@ -0,0 +1,95 @@
+import unittest
+from unittest import mock
+from app.tests.base import BaseTestCase
+from app.extensions import db
+from app.models.review import Review
+from app.models.place import Place
+from app.services import facade
+
+
+class ReviewTestCase(BaseTestCase):
+    """One owner, one place and one guest allowed to review it"""
+
+    def setUp(self):
+        super().setUp()
+        self.owner_id, self.owner_headers = self.create_user()
+        self.guest_id, self.guest_headers = self.create_user()
+        self.place_id = self.create_place(self.owner_headers)
+
+    def post_review(self, headers):
+        return self.client.post('/api/v1/reviews/', json={
+            "text": "Very nice!",
+            "rating": 5,
+            "place_id": self.place_id
+        }, headers=headers)
+
+
+class TestReviewEndpoints(ReviewTestCase):
+
+    def test_create_review(self):
+        r = self.post_review(self.guest_headers)
+        self.assertEqual(r.status_code, 201)
+        self.assertEqual(r.get_json()["user_id"], self.guest_id)
+
+    def test_review_own_place(self):
+        r = self.post_review(self.owner_headers)
+        self.assertEqual(r.status_code, 400)
+
+    def test_review_twice(self):
+        self.assertEqual(self.post_review(self.guest_headers).status_code, 201)
+        r = self.post_review(self.guest_headers)
+        self.assertEqual(r.status_code, 400)
+        self.assertEqual(r.get_json()["error"], "You have already reviewed this place")
+
+    def test_concurrent_duplicate_is_a_400(self):
+        """The second of two racing POSTs hits the unique constraint"""
+        self.assertEqual(self.post_review(self.guest_headers).status_code, 201)
+        with mock.patch.object(facade, "user_already_reviewed", side_effect=[False, True]):
+            r = self.post_review(self.guest_headers)
+        self.assertEqual(r.status_code, 400)
+        self.assertEqual(r.get_json()["error"], "You have already reviewed this place")
+        self.assertEqual(db.session.query(Review).count(), 1)
+
+    def test_unique_index_on_user_and_place(self):
+        indexes = db.inspect(db.engine).get_unique_constraints(Review.__tablename__)
+        columns = [sorted(i["column_names"]) for i in indexes]
+        self.assertIn(["place_id", "user_id"], columns)
+
+
+class TestRatingAggregates(ReviewTestCase):
+
+    def ratings(self):
+        place = self.client.get(f'/api/v1/places/{self.place_id}').get_json()
+        return place["review_count"], place["average_rating"]
+
+    def test_create_update_delete(self):
+        review_id = self.post_review(self.guest_headers).get_json()["id"]
+        _, other_headers = self.create_user()
+        r = self.client.post('/api/v1/reviews/', json={
+            "text": "Ok", "rating": 2, "place_id": self.place_id
+        }, headers=other_headers)
+        self.assertEqual(r.status_code, 201)
+        self.assertEqual(self.ratings(), (2, 3.5))
+
+        r = self.client.put(f'/api/v1/reviews/{review_id}', json={"rating": 4},
+                            headers=self.guest_headers)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(self.ratings(), (2, 3.0))
+
+        r = self.client.delete(f'/api/v1/reviews/{review_id}', headers=self.guest_headers)
+        self.assertEqual(r.status_code, 204)
+        self.assertEqual(self.ratings(), (1, 2.0))
+
+    def test_repair_job(self):
+        self.post_review(self.guest_headers)
+        db.session.execute(db.update(Place).values(review_count=7, rating_sum=1))
+        db.session.commit()
+
+        result = self.app.test_cli_runner().invoke(args=["hbnb", "repair-ratings"])
+        self.assertEqual(result.exit_code, 0)
+        db.session.expire_all()
+        self.assertEqual(self.ratings(), (1, 5.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+import unittest
+import uuid
+from datetime import datetime, timedelta
+from flask_jwt_extended import decode_token
+from app.extensions import db
+from app.models.revoked_token import RevokedToken
+from app.persistence.bloom import BloomFilter
+from app.services.revocation import revocation
+from app.tests.base import BaseTestCase
+
+
+class TestBloomFilter(unittest.TestCase):
+
+    def test_no_false_negative_and_bounded_false_positives(self):
+        bloom = BloomFilter(1000, error_rate=0.01)
+        keys = [str(uuid.uuid4()) for _ in range(1000)]
+        for key in keys:
+            bloom.add(key)
+        self.assertTrue(all(key in bloom for key in keys))
+        false_positives = sum(str(uuid.uuid4()) in bloom for _ in range(10000))
+        self.assertLess(false_positives, 300)
+        self.assertFalse(bloom.full())
+        bloom.add("one more")
+        self.assertTrue(bloom.full())
+
+
+class TestRevocation(BaseTestCase):
+
+    def login(self):
+        email = f"user{uuid.uuid4().hex}@example.com"
+        self.client.post('/api/v1/users/', json={
+            "first_name": "John", "last_name": "Doe",
+            "email": email, "password": "secret"})
+        resp = self.client.post('/api/v1/auth/login', json={
+            "email": email, "password": "secret"})
+        self.assertEqual(resp.status_code, 200)
+        return resp.get_json()
+
+    def bearer(self, token):
+        return {"Authorization": f"Bearer {token}"}
+
+    def test_refresh_rotates_the_refresh_token(self):
+        tokens = self.login()
+        resp = self.client.post('/api/v1/auth/refresh',
+                                headers=self.bearer(tokens["refresh_token"]))
+        self.assertEqual(resp.status_code, 200)
+        renewed = resp.get_json()
+        resp = self.client.get('/api/v1/protected', headers=self.bearer(renewed["access_token"]))
+        self.assertEqual(resp.status_code, 200)
+        # the first refresh token was revoked by the rotation
+        resp = self.client.post('/api/v1/auth/refresh',
+                                headers=self.bearer(tokens["refresh_token"]))
+        self.assertEqual(resp.status_code, 401)
+
+    def test_access_token_cannot_refresh(self):
+        tokens = self.login()
+        resp = self.client.post('/api/v1/auth/refresh',
+                                headers=self.bearer(tokens["access_token"]))
+        self.assertIn(resp.status_code, (401, 422))
+
+    def test_logout_revokes_the_token(self):
+        tokens = self.login()
+        headers = self.bearer(tokens["access_token"])
+        self.assertEqual(self.client.get('/api/v1/protected', headers=headers).status_code, 200)
+        self.assertEqual(self.client.post('/api/v1/auth/logout', headers=headers).status_code, 200)
+        self.assertEqual(self.client.get('/api/v1/protected', headers=headers).status_code, 401)
+        self.assertEqual(db.session.query(RevokedToken).count(), 1)
+
+    def test_logout_revokes_the_refresh_token_too(self):
+        tokens = self.login()
+        headers = self.bearer(tokens["access_token"])
+        resp = self.client.post('/api/v1/auth/logout', headers=headers,
+                                json={"refresh_token": tokens["refresh_token"]})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(self.client.get('/api/v1/protected', headers=headers).status_code, 401)
+        resp = self.client.post('/api/v1/auth/refresh',
+                                headers=self.bearer(tokens["refresh_token"]))
+        self.assertEqual(resp.status_code, 401)
+        self.assertEqual(db.session.query(RevokedToken).count(), 2)
+
+    def test_logout_rejects_a_foreign_refresh_token(self):
+        mine, other = self.login(), self.login()
+        for token in (other["refresh_token"], mine["access_token"], "garbage"):
+            resp = self.client.post('/api/v1/auth/logout',
+                                    headers=self.bearer(mine["access_token"]),
+                                    json={"refresh_token": token})
+            self.assertEqual(resp.status_code, 400)
+        self.assertEqual(db.session.query(RevokedToken).count(), 0)
+
+    def test_revocation_from_another_process_applies_on_sync(self):
+        tokens = self.login()
+        headers = self.bearer(tokens["access_token"])
+        self.assertEqual(self.client.get('/api/v1/protected', headers=headers).status_code, 200)
+        # row written by another worker
+        payload = decode_token(tokens["access_token"])
+        db.session.add(RevokedToken(jti=payload["jti"], token_type="access",
+                                    user_id=payload["sub"],
+                                    expires_at=datetime.utcnow() + timedelta(minutes=5)))
+        db.session.commit()
+        self.assertEqual(self.client.get('/api/v1/protected', headers=headers).status_code, 200)
+        self.app.extensions['revocation'].next_sync = 0
+        self.assertEqual(self.client.get('/api/v1/protected', headers=headers).status_code, 401)
+
+    def test_filter_false_positive_is_settled_by_the_table(self):
+        tokens = self.login()
+        headers = self.bearer(tokens["access_token"])
+        jti = decode_token(tokens["access_token"])["jti"]
+        revocation.sync()
+        self.app.extensions['revocation'].bloom.add(jti)
+        self.assertFalse(revocation.is_revoked(jti))
+        self.assertEqual(self.client.get('/api/v1/protected', headers=headers).status_code, 200)
+
+    def test_expired_rows_are_not_loaded(self):
+        db.session.add(RevokedToken(jti="old", token_type="access", user_id="u",
+                                    expires_at=datetime.utcnow() - timedelta(seconds=1)))
+        db.session.commit()
+        self.app.extensions['revocation'].bloom = None
+        revocation.sync()
+        self.assertEqual(revocation.stats()["bloom_entries"], 0)
+        self.assertEqual(revocation.stats()["recent"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+import json
+import unittest
+from app.extensions import db
+from app.models.place import Place
+from app.services.search import FTS5Index, parse_query, place_search, tokenize
+from app.tests.base import BaseTestCase
+
+PLACES = [
+    ("Sea view loft", "Bright loft, the sea from every window. Sea breeze."),
+    ("Mountain chalet", "Cosy chalet with a view on the Alps"),
+    ("Café près de la mer", "Appartement lumineux au bord de la mer"),
+    ("City studio", "Small studio near the station, no sea view"),
+    ("Seaside cabin", "Wooden cabin"),
+]
+
+
+class TestQueryParsing(unittest.TestCase):
+
+    def test_tokenize_folds_case_and_accents(self):
+        self.assertEqual(tokenize("Café PRÈS-de_la mer!"), ["cafe", "pres", "de", "la", "mer"])
+
+    def test_prefix_and_errors(self):
+        self.assertEqual(parse_query("sea vie*"), [("sea", False), ("vie", True)])
+        for query in ("", "  !! ", "se*", " ".join(["word"] * 9)):
+            with self.assertRaises(ValueError):
+                parse_query(query)
+
+
+class SearchTests:
+    """Run against each backend by the subclasses"""
+    BACKEND = None
+
+    def setUp(self):
+        super().setUp()
+        self.app.config['SEARCH_BACKEND'] = self.BACKEND
+        place_search.init_app(self.app)
+        self.owner_id, self.headers = self.create_user()
+        self.ids = {title: self.create_place(self.headers, title=title, description=description)
+                    for title, description in PLACES}
+
+    def search(self, query, status=200):
+        resp = self.client.get('/api/v1/places/search', query_string={"q": query})
+        self.assertEqual(resp.status_code, status, resp.get_json())
+        return resp.get_json()
+
+    def titles(self, query):
+        return [place["title"] for place in self.search(query)]
+
+    def test_ranking_prefix_and_accents(self):
+        # a title hit outweighs description hits, short texts rank higher
+        self.assertEqual(self.titles("sea"), ["Sea view loft", "City studio"])
+        self.assertEqual(self.titles("sea*"), ["Seaside cabin", "Sea view loft", "City studio"])
+        self.assertEqual(self.titles("cafe MER"), ["Café près de la mer"])
+        self.assertEqual(self.titles("sea chalet"), [])
+        place = self.search("loft")[0]
+        self.assertEqual(set(place), {"id", "title", "price", "review_count",
+                                      "average_rating", "score"})
+        self.assertGreater(place["score"], 0)
+        self.search("se*", status=400)
+
+    def test_queries_matching_too_many_places_are_refused(self):
+        self.app.config['SEARCH_MAX_MATCHES'] = 2
+        self.assertEqual(self.titles("sea"), ["Sea view loft", "City studio"])
+        error = self.search("sea*", status=400)["error"]
+        self.assertEqual(error, "q matches more than 2 places: "
+                                "add a word or make the prefix longer")
+        self.assertEqual(self.titles("sea* cabin"), ["Seaside cabin"])
+
+    def test_index_follows_updates_and_deletes(self):
+        resp = self.client.put(f'/api/v1/places/{self.ids["Mountain chalet"]}',
+                               json={"title": "Sea chalet"}, headers=self.headers)
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn("Sea chalet", self.titles("sea"))
+        self.assertEqual(self.titles("mountain"), [])
+        db.session.delete(db.session.get(Place, self.ids["Sea view loft"]))
+        db.session.commit()
+        self.assertEqual(self.titles("loft"), [])
+
+    def test_rolled_back_place_is_not_indexed(self):
+        self.search("warmup")  # the memory backend is built by the first search
+        db.session.add(Place(title="Ghost house", description="", price=1.0,
+                             latitude=1.0, longitude=1.0, owner_id=self.owner_id))
+        db.session.flush()
+        db.session.rollback()
+        self.assertEqual(self.titles("ghost"), [])
+
+    def test_bulk_import_is_indexed(self):
+        self.search("warmup")
+        line = {"type": "place", "title": "Imported barn", "price": 10,
+                "latitude": 1.0, "longitude": 1.0, "owner_id": self.owner_id}
+        resp = self.client.post('/api/v1/import/', data=json.dumps(line) + "\n",
+                                content_type='application/x-ndjson', headers=self.headers)
+        self.assertEqual(resp.get_json()["inserted"]["place"], 1)
+        self.assertEqual(self.titles("barn"), ["Imported barn"])
+
+
+class TestFTS5Search(SearchTests, BaseTestCase):
+    BACKEND = 'fts5'
+
+    def test_rebuild_command(self):
+        db.session.execute(db.text("DELETE FROM places_fts"))
+        db.session.commit()
+        self.assertEqual(self.titles("loft"), [])
+        result = self.app.test_cli_runner().invoke(args=["hbnb", "rebuild-search"])
+        self.assertIn("5 places", result.output)
+        self.assertEqual(self.titles("loft"), ["Sea view loft"])
+
+    def test_table_created_on_a_database_older_than_it(self):
+        FTS5Index().drop(db.session.connection())
+        db.session.commit()
+        # the app of a new process, before any request
+        place_search.init_app(self.app)
+        self.assertEqual(self.titles("loft"), ["Sea view loft"])
+        self.create_place(self.headers, title="Harbour loft", description="")
+        self.assertEqual(sorted(self.titles("loft")), ["Harbour loft", "Sea view loft"])
+        self.assertEqual(db.session.execute(db.text(
+            "SELECT COUNT(*) FROM places_fts")).scalar(), len(PLACES) + 1)
+
+
+class TestMemorySearch(SearchTests, BaseTestCase):
+    BACKEND = 'memory'
+
+    def test_same_ranking_as_fts5(self):
+        """BM25 of the inverted index matches the one of FTS5"""
+        connection = db.session.connection()
+        FTS5Index().rebuild(connection)
+        for query in ("sea", "sea*", "view", "the", "la mer", "stu*"):
+            terms = parse_query(query)
+            memory = place_search.search(query, 10)
+            fts5 = FTS5Index().search(connection, terms, 10, 20000)
+            self.assertEqual([place_id for place_id, _ in memory],
+                             [place_id for place_id, _ in fts5], query)
+            for (_, expected), (_, score) in zip(fts5, memory):
+                self.assertAlmostEqual(score, expected, places=6)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+from app.tests.base import BaseTestCase
+from app.extensions import db
+from app.models.amenity import Amenity
+from app.models.place import Place
+from app.models.review import Review
+from app.models.user import User
+from app.api.v1.serializers import (AMENITY, PLACE_SUMMARY, REVIEW, USER,
+                                    Serializer, json_response)
+
+
+class TestSerializers(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.owner_id, self.headers = self.create_user()
+        self.place_id = self.create_place(self.headers)
+        self.client.post('/api/v1/amenities/', json={"name": "WiFi"}, headers=self.headers)
+        _, headers = self.create_user()
+        self.client.post('/api/v1/reviews/', json={
+            "text": "Nice", "rating": 3, "place_id": self.place_id
+        }, headers=headers)
+
+    def test_same_output_as_to_dict(self):
+        for serializer, model in ((USER, User), (AMENITY, Amenity), (REVIEW, Review)):
+            objects = model.query.all()
+            self.assertEqual(serializer.many(objects), [obj.to_dict() for obj in objects])
+
+    def test_rows_and_objects_agree(self):
+        for serializer in (USER, AMENITY, REVIEW, PLACE_SUMMARY):
+            rows = db.session.query(*serializer.columns).order_by(serializer.model.id).all()
+            objects = serializer.model.query.order_by(serializer.model.id).all()
+            self.assertEqual(serializer.rows(rows), serializer.many(objects))
+
+    def test_computed_field(self):
+        place = db.session.get(Place, self.place_id)
+        self.assertEqual(PLACE_SUMMARY.one(place), {
+            "id": place.id, "title": place.title, "price": place.price,
+            "review_count": 1, "average_rating": 3.0,
+        })
+        # rating_sum is read but not part of the output
+        self.assertIn(Place.rating_sum, PLACE_SUMMARY.columns)
+
+    def test_custom_plan(self):
+        serializer = Serializer(Amenity, ["name", ("upper", str.upper, ("name",))])
+        self.assertEqual(serializer.from_row(("Pool",)), {"name": "Pool", "upper": "POOL"})
+
+    def test_json_response(self):
+        response = json_response([{"id": "1", "price": 1.5}])
+        self.assertEqual(response.mimetype, "application/json")
+        self.assertEqual(response.get_json(), [{"id": "1", "price": 1.5}])
@@ -0,0 +1,81 @@
+import os
+import shutil
+import tempfile
+import unittest
+from sqlalchemy import text
+import config
+from app import create_app
+from app.extensions import db
+from app.persistence.sqlite import pragma_statements
+
+
+class TestSQLitePragmas(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.apps = []
+
+    def tearDown(self):
+        for app in self.apps:
+            with app.app_context():
+                db.engine.dispose()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def make_app(self, pragmas, name="hbnb.db"):
+        class FileConfig(config.TestingConfig):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(self.tmpdir, name)}"
+            SQLITE_PRAGMAS = pragmas
+
+        app = create_app(FileConfig)
+        self.apps.append(app)
+        return app
+
+    def pragma(self, name):
+        return db.session.execute(text(f"PRAGMA {name}")).scalar()
+
+    def test_pragmas_applied_on_connect(self):
+        app = self.make_app(config.Config.SQLITE_PRAGMAS)
+        with app.app_context():
+            self.assertEqual(self.pragma("journal_mode"), "wal")
+            self.assertEqual(self.pragma("synchronous"), 1)  # NORMAL
+            self.assertEqual(self.pragma("busy_timeout"), 5000)
+            self.assertEqual(self.pragma("cache_size"), -65536)
+            self.assertEqual(self.pragma("mmap_size"), 256 * 1024 * 1024)
+
+    def test_no_pragmas_keeps_sqlite_defaults(self):
+        app = self.make_app(None)
+        with app.app_context():
+            self.assertEqual(self.pragma("journal_mode"), "delete")
+            self.assertEqual(self.pragma("synchronous"), 2)  # FULL
+
+    def test_readers_not_blocked_by_open_write(self):
+        app = self.make_app(dict(config.Config.SQLITE_PRAGMAS, busy_timeout=100))
+        with app.app_context():
+            db.create_all()
+            writer = db.engine.connect()
+            reader = db.engine.connect()
+            try:
+                writer.execute(text("INSERT INTO amenities (id, name, created_at, "
+                                    "updated_at) VALUES ('1', 'Wifi', "
+                                    "CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)"))
+                # the write transaction is still open: WAL readers see the
+                # last committed state instead of waiting for the lock
+                count = reader.execute(text("SELECT COUNT(*) FROM amenities")).scalar()
+                self.assertEqual(count, 0)
+                writer.commit()
+                reader.rollback()
+                count = reader.execute(text("SELECT COUNT(*) FROM amenities")).scalar()
+                self.assertEqual(count, 1)
+            finally:
+                writer.close()
+                reader.close()
+
+    def test_statements_order(self):
+        self.assertEqual(pragma_statements({'busy_timeout': 10, 'foreign_keys': 'ON',
+                                            'journal_mode': 'WAL', 'mmap_size': None}),
+                         ["PRAGMA journal_mode=WAL", "PRAGMA busy_timeout=10",
+                          "PRAGMA foreign_keys=ON"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import json
+from app.tests.base import BaseTestCase
+
+
+def ndjson_lines(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+class TestNdjsonExport(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # rows are sent 2 by 2, so every list below spans several chunks
+        self.app.config['STREAM_BATCH_SIZE'] = 2
+        self.owner_id, self.headers = self.create_user()
+        self.place_ids = [
+            self.create_place(self.headers, title=f"Place {i}", price=10.0 * (i + 1))
+            for i in range(5)
+        ]
+        for i in range(3):
+            _, headers = self.create_user()
+            self.client.post('/api/v1/reviews/', json={
+                "text": f"Review {i}", "rating": 4, "place_id": self.place_ids[0]
+            }, headers=headers)
+
+    def test_accept_header_streams_places(self):
+        r = self.client.get('/api/v1/places/',
+                            headers={"Accept": "application/x-ndjson"})
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.mimetype, "application/x-ndjson")
+        self.assertTrue(r.is_streamed)
+        places = ndjson_lines(r)
+        self.assertEqual([p["id"] for p in places], self.place_ids)
+        self.assertEqual(places[0]["review_count"], 3)
+
+    def test_stream_matches_json_list(self):
+        for name in ("users", "reviews", "amenities", "places"):
+            listed = self.client.get(f'/api/v1/{name}/').get_json()
+            streamed = ndjson_lines(self.client.get(f'/api/v1/{name}/?stream=1'))
+            self.assertCountEqual(streamed, listed, name)
+
+    def test_stream_applies_place_filters(self):
+        r = self.client.get('/api/v1/places/?stream=1&max_price=30')
+        self.assertEqual([p["id"] for p in ndjson_lines(r)], self.place_ids[:3])
+        r = self.client.get('/api/v1/places/?stream=1&max_price=abc')
+        self.assertEqual(r.status_code, 400)
+
+    def test_plain_json_by_default(self):
+        r = self.client.get('/api/v1/reviews/', headers={"Accept": "application/json"})
+        self.assertEqual(r.mimetype, "application/json")
+        self.assertEqual(len(r.get_json()), 3)
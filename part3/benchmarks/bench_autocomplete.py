@@ -0,0 +1,94 @@
+"""
+Latency of the title autocomplete (GET /places/autocomplete) on 1M places.
+
+Titles come from the Zipf vocabulary of bench_search (4 words each, so
+thousands of titles start with "the" or "a"), review counts are random
+between 0 and 49. Prefixes of 1 to 6 characters are cut from random
+titles and timed through the facade (index only; the first query of a
+prefix ranks its slice) and through the test client (whole request),
+then again between review writes.
+
+    python -m benchmarks.bench_autocomplete [--places 1000000] [--capacity 200000]
+"""
+import argparse
+import os
+import random
+import time
+import tracemalloc
+
+from app.extensions import db
+from app.models.place import Place
+from app.services import facade
+from app.services.autocomplete import normalize, place_autocomplete
+from benchmarks.bench_search import texts
+from benchmarks.common import make_app, measure, seed_places, seed_users, summary
+
+
+def run(places, capacity, repeat):
+    rng = random.Random(42)
+    app, db_path = make_app(AUTOCOMPLETE_CAPACITY=capacity, ENTITY_CACHE_BACKEND=None)
+    client = app.test_client()
+    with app.app_context():
+        owners = seed_users(100)
+        place_ids = seed_places(owners, places, texts=texts(places, rng))
+        db.session.execute(db.text("UPDATE places SET review_count = abs(random()) % 50"))
+        db.session.commit()
+
+        start = time.perf_counter()
+        count = place_autocomplete.warm()
+        elapsed = time.perf_counter() - start
+        # size of the index: built again, with the allocations traced
+        db.session.remove()
+        tracemalloc.start()
+        place_autocomplete.rebuild()
+        size = tracemalloc.get_traced_memory()[0] / 2**20
+        tracemalloc.stop()
+        print(f"\n{places} places, capacity {capacity}: {count} indexed in "
+              f"{elapsed:.1f} s, {size:.0f} MiB")
+        titles = [normalize(title) for title, in
+                  db.session.execute(db.select(Place.title).limit(20000))]
+
+        for length in (1, 2, 3, 6):
+            prefixes = [rng.choice(titles)[:length] for _ in range(repeat)]
+            print(f"  prefix {length} chars")
+            hits = []
+
+            def index(i):
+                hits.append(len(facade.autocomplete_places(prefixes[i], 10)))
+
+            def request(i):
+                client.get("/api/v1/places/autocomplete",
+                           query_string={"prefix": prefixes[i]})
+
+            print(f"    index    {summary(measure(index, repeat))}   "
+                  f"avg hits {sum(hits) / len(hits):.1f}")
+            print(f"    request  {summary(measure(request, repeat))}")
+
+        # review counts moving under the cached prefixes: 10 committed
+        # changes, then one timed 2-char query
+        prefixes = [rng.choice(titles)[:2] for _ in range(repeat)]
+        timings = []
+        for prefix in prefixes:
+            for place_id in rng.sample(place_ids, 10):
+                place_autocomplete.notify_reviews({place_id: rng.choice((1, -1))})
+            db.session.commit()
+            timings.append(measure(lambda i: facade.autocomplete_places(prefix, 10), 1)[0])
+        print(f"  2-char prefix between review writes\n    index    {summary(timings)}")
+        print(f"  {place_autocomplete.stats()}")
+        db.session.remove()
+        db.engine.dispose()
+    os.remove(db_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--places", type=int, default=1000000)
+    parser.add_argument("--capacity", type=int, nargs="+", default=[200000, 1000000])
+    parser.add_argument("--repeat", type=int, default=1000)
+    args = parser.parse_args()
+    for capacity in args.capacity:
+        run(args.places, capacity, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
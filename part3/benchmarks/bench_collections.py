@@ -0,0 +1,64 @@
+"""
+Writes next to large collections: create and delete a review on a
+place with 50k reviews, create a place for a host with 10k listings.
+
+Appending to or removing from a collection must not load it: the
+timings must not depend on the size of the collection.
+
+    python -m benchmarks.bench_collections [--reviews 50000] [--listings 10000]
+"""
+import argparse
+import os
+
+from app.extensions import db
+from app.services import facade
+from benchmarks.common import (make_app, measure, seed_places, seed_reviews,
+                               seed_users, summary)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--reviews", type=int, default=50000)
+    parser.add_argument("--listings", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    # without the entity cache: every write pays its own SELECTs
+    app, db_path = make_app(ENTITY_CACHE_BACKEND=None)
+    with app.app_context():
+        users = seed_users(1 + args.reviews + args.repeat)
+        host, reviewers, fresh = (users[0], users[1:args.reviews + 1],
+                                  users[args.reviews + 1:])
+        place_ids = seed_places([host], args.listings)
+        target = place_ids[0]
+        seed_reviews(reviewers, [target], args.reviews)
+        print(f"place with {args.reviews} reviews, host with {args.listings} listings")
+
+        review_ids = []
+
+        def create_review(i):
+            db.session.remove()
+            review = facade.create_review(fresh[i], {
+                "text": "Benchmark review", "rating": 4, "place_id": target})
+            review_ids.append(review.id)
+
+        def delete_review(i):
+            db.session.remove()
+            facade.delete_review(fresh[i], review_ids[i])
+
+        def create_place(i):
+            db.session.remove()
+            facade.create_place(host, {
+                "title": f"New place {i}", "description": "Benchmark place",
+                "price": 50.0, "latitude": 10.0, "longitude": 10.0})
+
+        for name, fn in (("create review", create_review),
+                         ("delete review", delete_review),
+                         ("create place", create_place)):
+            print(f"{name:<14} {summary(measure(fn, args.repeat))}")
+        db.engine.dispose()
+    os.remove(db_path)
+
+
+if __name__ == "__main__":
+    main()
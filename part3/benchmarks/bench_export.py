@@ -0,0 +1,61 @@
+"""
+Peak Python memory of GET /api/v1/reviews/ as one JSON list against
+the NDJSON export (?stream=1) for a growing reviews table. The peak
+of the export must stay flat while the JSON list grows with the rows.
+
+    python -m benchmarks.bench_export [--sizes 10000 100000 ...]
+"""
+import argparse
+import math
+import os
+import time
+import tracemalloc
+
+from app.extensions import db
+from benchmarks.common import make_app, seed_places, seed_reviews, seed_users
+
+
+def peak(client, url):
+    """(peak MiB, seconds, bytes) of one GET, the body being consumed chunk by chunk"""
+    db.session.remove()
+    tracemalloc.start()
+    start = time.perf_counter()
+    response = client.get(url, buffered=False)
+    size = sum(len(chunk) for chunk in response.response)
+    response.close()
+    elapsed = time.perf_counter() - start
+    _, top = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return top / 2 ** 20, elapsed, size
+
+
+def run(size):
+    app, db_path = make_app()
+    with app.app_context():
+        side = math.isqrt(size) + 1
+        user_ids = seed_users(side)
+        place_ids = seed_places(user_ids, side)
+        seed_reviews(user_ids, place_ids, size)
+        db.session.remove()
+
+    client = app.test_client()
+    for label, url in (("list", "/api/v1/reviews/"),
+                       ("stream", "/api/v1/reviews/?stream=1")):
+        with app.app_context():
+            mib, elapsed, body = peak(client, url)
+        print(f"{size:>9} reviews   {label:<6}  peak {mib:8.1f} MiB   "
+              f"{elapsed:6.2f} s   {body / 2 ** 20:7.1f} MiB sent")
+    os.remove(db_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[10000, 100000, 500000])
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Primary key layouts on 1M reviews: random uuid4 as 36-char text (the
+layout before ID_STORAGE), UUIDv7 as text, UUIDv7 as 16 bytes (the
+default).
+
+For each layout: bulk insert throughput of the reviews (batches of
+10k rows, like the NDJSON import), size of the table and of each
+index (SQLite dbstat), then the latency of an ORM review creation, a
+review lookup by id, the reviews of a place, and a three-table join
+(reviews per host) over the whole table.
+
+    python -m benchmarks.bench_ids [--reviews 1000000] [--layout uuid7-binary]
+"""
+import argparse
+import os
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from app.extensions import db
+from app.models import geo, ids
+from app.models.place import Place
+from app.models.review import Review
+from app.models.user import User
+from app.services import facade
+from benchmarks.common import BATCH_SIZE, bulk_insert, make_app, measure, summary
+
+LAYOUTS = {
+    "uuid4-text": (lambda: str(uuid.uuid4()), "text"),
+    "uuid7-text": (ids.uuid7, "text"),
+    "uuid7-binary": (ids.uuid7, "binary"),
+}
+
+# coprime counts: review i is (user i % USERS, place i % PLACES), a
+# distinct pair for the first USERS * PLACES reviews
+USERS = 10007
+PLACES = 50021
+
+
+def seed(new_id, reviews):
+    """
+    Users and places, then the reviews. Returns the place ids, a
+    sample of the review ids and the insert rate of the reviews.
+    """
+    now = datetime.utcnow()
+    users = [{"id": new_id(), "first_name": "Bench", "last_name": f"User{i}",
+              "email": f"bench{i}@example.com", "password": "x", "is_admin": False,
+              "created_at": now, "updated_at": now} for i in range(USERS)]
+    bulk_insert(User, users)
+    places = []
+    for i in range(PLACES):
+        latitude, longitude = -80.0 + (i * 7.31) % 160.0, -170.0 + (i * 13.17) % 340.0
+        places.append({"id": new_id(), "title": f"Place {i}", "description": "",
+                       "price": float(20 + i % 480), "latitude": latitude,
+                       "longitude": longitude, "geohash": geo.encode(latitude, longitude),
+                       "owner_id": users[i % USERS]["id"],
+                       "created_at": now, "updated_at": now})
+    bulk_insert(Place, places)
+    user_ids = [row["id"] for row in users]
+    place_ids = [row["id"] for row in places]
+
+    sample = []
+    elapsed = 0.0
+    for start in range(0, reviews, BATCH_SIZE):
+        # ids are generated as the rows arrive, as they would be in production
+        rows = [{"id": new_id(), "text": "Benchmark review", "rating": 1 + i % 5,
+                 "user_id": user_ids[i % USERS], "place_id": place_ids[i % PLACES],
+                 "created_at": now + timedelta(microseconds=i), "updated_at": now}
+                for i in range(start, min(start + BATCH_SIZE, reviews))]
+        begin = time.perf_counter()
+        bulk_insert(Review, rows)
+        elapsed += time.perf_counter() - begin
+        sample.extend(row["id"] for row in rows[::100])
+    return place_ids, sample, reviews / elapsed
+
+
+def sizes():
+    """{table or index name: bytes} of the reviews table"""
+    rows = db.session.execute(db.text(
+        "SELECT name, SUM(pgsize) FROM dbstat WHERE name IN "
+        "(SELECT name FROM sqlite_master WHERE tbl_name = 'reviews') GROUP BY name"))
+    return dict(rows.all())
+
+
+def run(name, reviews, repeat):
+    new_id, storage = LAYOUTS[name]
+    app, db_path = make_app(ID_STORAGE=storage, ENTITY_CACHE_BACKEND=None)
+    rng = random.Random(42)
+    with app.app_context():
+        place_ids, review_ids, rate = seed(new_id, reviews)
+        print(f"\n{name}: {reviews} reviews inserted at {rate:,.0f} rows/s, "
+              f"file {os.path.getsize(db_path) / 2**20:.0f} MiB")
+        for index, size in sorted(sizes().items()):
+            print(f"  {index:<28} {size / 2**20:8.1f} MiB")
+
+        targets = [rng.choice(review_ids) for _ in range(repeat)]
+        places = [rng.choice(place_ids) for _ in range(repeat)]
+        # fresh users: one new review each on a random place
+        authors = [new_id() for _ in range(repeat)]
+        bulk_insert(User, [{"id": author, "first_name": "New", "last_name": "User",
+                            "email": f"new-{author}@example.com", "password": "x",
+                            "is_admin": False} for author in authors])
+
+        def create_review(i):
+            db.session.remove()
+            db.session.add(Review(id=new_id(), text="New review", rating=4,
+                                  user_id=authors[i], place_id=places[i]))
+            db.session.commit()
+
+        def get_review(i):
+            db.session.remove()
+            db.session.get(Review, targets[i])
+
+        def reviews_of_place(i):
+            db.session.remove()
+            facade.get_reviews_by_place(places[i])
+
+        for label, fn in (("create review", create_review),
+                          ("review by id", get_review),
+                          ("reviews of a place", reviews_of_place)):
+            print(f"  {label:<20} {summary(measure(fn, repeat))}")
+
+        join = (db.select(Place.owner_id, db.func.count())
+                .join(Review, Review.place_id == Place.id)
+                .join(User, User.id == Place.owner_id)
+                .group_by(Place.owner_id))
+        timings = measure(lambda i: db.session.execute(join).all(), 3)
+        print(f"  {'reviews per host':<20} {min(timings):9.1f} ms (join of 3 tables, best of 3)")
+        db.session.remove()
+        db.engine.dispose()
+    os.remove(db_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--reviews", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--layout", choices=LAYOUTS, nargs="+", default=list(LAYOUTS))
+    args = parser.parse_args()
+    for name in args.layout:
+        run(name, args.reviews, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
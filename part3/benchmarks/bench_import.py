@@ -0,0 +1,63 @@
+"""
+Bulk import throughput (rows/s) of HBnBFacade.import_ndjson into
+SQLite. The target is at least 20k rows/s for a mix of places and
+reviews.
+
+    python -m benchmarks.bench_import [--rows 100000] [--batch-size 5000]
+"""
+import argparse
+import json
+import os
+import time
+
+from app.extensions import db
+from app.services import facade
+from benchmarks.common import make_app, new_id, seed_users
+
+
+def generate(owner_ids, reviewer_ids, rows):
+    """NDJSON lines: one place then reviews of the previous places"""
+    lines = []
+    place_ids = []
+    for i in range(rows):
+        if i % 2 == 0 or not place_ids:
+            place_id = new_id()
+            place_ids.append(place_id)
+            row = {"type": "place", "id": place_id, "title": f"Place {i}",
+                   "price": 20 + i % 480, "latitude": 45.0 + (i % 1000) / 1000,
+                   "longitude": 2.0 + (i % 997) / 1000,
+                   "owner_id": owner_ids[i % len(owner_ids)]}
+        else:
+            row = {"type": "review", "text": "Imported review",
+                   "rating": 1 + i % 5, "place_id": place_ids[-1],
+                   "user_id": reviewer_ids[i % len(reviewer_ids)]}
+        lines.append(json.dumps(row) + "\n")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    app, db_path = make_app()
+    with app.app_context():
+        owner_ids = seed_users(100)
+        reviewer_ids = seed_users(100)
+        lines = generate(owner_ids, reviewer_ids, args.rows)
+
+        start = time.perf_counter()
+        report = facade.import_ndjson(lines, batch_size=args.batch_size)
+        elapsed = time.perf_counter() - start
+
+        inserted = sum(report["inserted"].values())
+        print(f"{args.rows} rows, {inserted} inserted, "
+              f"{report['error_count']} errors in {elapsed:.2f} s "
+              f"({args.rows / elapsed:,.0f} rows/s)")
+        db.session.remove()
+    os.remove(db_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Login throughput (POST /api/v1/auth/login) against the number of
+bcrypt workers in the hashing pool.
+
+Client threads stand in for the threads of a WSGI server; the pool
+bounds how many of them hash at the same time.
+
+    python -m benchmarks.bench_login [--workers 1 2 4 8] [--rounds 12]
+"""
+import argparse
+import os
+import threading
+import time
+
+from app.services import facade
+from benchmarks.common import make_app
+
+
+def run(workers, args):
+    app, db_path = make_app(
+        BCRYPT_LOG_ROUNDS=args.rounds,
+        HASH_POOL_WORKERS=workers,
+        HASH_POOL_QUEUE_SIZE=args.queue)
+    with app.app_context():
+        facade.create_user({
+            "first_name": "Bench",
+            "last_name": "User",
+            "email": "bench@example.com",
+            "password": "password"
+        })
+
+    statuses = []
+    lock = threading.Lock()
+
+    def client():
+        test_client = app.test_client()
+        for _ in range(args.logins):
+            r = test_client.post('/api/v1/auth/login', json={
+                "email": "bench@example.com",
+                "password": "password"
+            })
+            with lock:
+                statuses.append(r.status_code)
+
+    threads = [threading.Thread(target=client) for _ in range(args.clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    ok = statuses.count(200)
+    busy = statuses.count(503)
+    print(f"{workers:>3} workers   {ok / elapsed:8.1f} logins/s   "
+          f"{busy:>4} x 503   ({len(statuses)} requests in {elapsed:.2f} s)")
+    os.remove(db_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--logins", type=int, default=5, help="per client")
+    parser.add_argument("--queue", type=int, default=32)
+    args = parser.parse_args()
+    print(f"bcrypt cost {args.rounds}, {args.clients} client threads, "
+          f"{os.cpu_count()} CPUs")
+    for workers in args.workers:
+        run(workers, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Latency of the radius search (GET /places/nearby) on a large catalog.
+
+Places are spread uniformly over Europe (lat 36..70, lon -10..40), a
+denser setup than the whole globe. Each query uses a random center.
+
+    python -m benchmarks.bench_nearby [--places 1000000] [--radius 2 10 50 200]
+"""
+import argparse
+import os
+import random
+
+from app.extensions import db
+from app.services import facade
+from benchmarks.common import make_app, measure, seed_places, seed_users, summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--places", type=int, default=1000000)
+    parser.add_argument("--radius", type=float, nargs="+", default=[2, 10, 50, 200])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    app, db_path = make_app()
+    with app.app_context():
+        owners = seed_users(100)
+        seed_places(owners, args.places, lambda i: (
+            rng.uniform(36.0, 70.0), rng.uniform(-10.0, 40.0)))
+
+        for radius in args.radius:
+            centers = [(rng.uniform(36.0, 70.0), rng.uniform(-10.0, 40.0))
+                       for _ in range(args.repeat)]
+            found = []
+
+            def search(i):
+                found.append(len(facade.get_nearby_places(
+                    *centers[i], radius, 100)))
+
+            timings = measure(search, args.repeat)
+            print(f"{args.places:>9} places   radius {radius:>5} km   "
+                  f"{summary(timings)}   avg hits {sum(found) / len(found):.1f}")
+        db.session.remove()
+    os.remove(db_path)
+
+
+if __name__ == "__main__":
+    main()
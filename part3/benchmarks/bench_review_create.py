@@ -0,0 +1,60 @@
+"""
+Review creation latency against the size of the reviews table.
+
+The duplicate check (HBnBFacade.user_already_reviewed) is an EXISTS
+query on the (user_id, place_id) unique index, so its latency must
+stay flat from 1k to 1M reviews. The full facade.create_review
+latency is reported next to it.
+
+    python -m benchmarks.bench_review_create [--sizes 1000 10000 ...]
+"""
+import argparse
+import math
+import os
+
+from app.extensions import db
+from app.services import facade
+from benchmarks.common import (make_app, measure, seed_places, seed_reviews,
+                               seed_users, summary)
+
+
+def run(size, repeat):
+    app, db_path = make_app()
+    with app.app_context():
+        side = math.isqrt(size) + 1
+        user_ids = seed_users(side)
+        place_ids = seed_places(user_ids, side)
+        seed_reviews(user_ids, place_ids, size)
+
+        # fresh reviewers, all posting on the same place
+        reviewers = seed_users(repeat)
+        place_id = place_ids[0]
+
+        def create(i):
+            facade.create_review(reviewers[i], {
+                "text": "Benchmark review",
+                "rating": 4,
+                "place_id": place_id,
+            })
+
+        def check(i):
+            facade.user_already_reviewed(reviewers[i], place_id)
+
+        print(f"{size:>9} reviews   check   {summary(measure(check, repeat))}")
+        print(f"{size:>9} reviews   create  {summary(measure(create, repeat))}")
+        db.session.remove()
+    os.remove(db_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[1000, 10000, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
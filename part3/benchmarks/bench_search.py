@@ -0,0 +1,133 @@
+"""
+Latency of the full-text search (GET /places/search) on 1M places.
+
+Titles and descriptions are drawn from a vocabulary of 20k words with
+a Zipf distribution (a few stop words in most places, a long tail of
+rare ones), 4 words per title and 40 per description. The "common"
+query words rank about 100th, in ~4% of the places; the rare ones
+rank 5000th to 6000th, in ~0.04%. Each query shape is
+timed end to end through the facade (index lookup, BM25, then the
+SELECT of the 20 best places).
+
+    python -m benchmarks.bench_search [--places 1000000] [--backend fts5 memory]
+                                      [--max-matches 20000]
+
+Queries matching more than --max-matches places are refused, as the
+endpoint does past SEARCH_MAX_MATCHES: "refused" counts them.
+
+The in-memory inverted index holds every posting in Python objects;
+give it fewer places (--memory-places) on a small machine.
+"""
+import argparse
+import itertools
+import os
+import random
+import resource
+import time
+
+from app.extensions import db
+from app.services import facade
+from app.services.search import TooManyMatches, place_search
+from app.api.v1.serializers import PLACE_SUMMARY
+from benchmarks.common import make_app, measure, seed_places, seed_users, summary
+
+STOP_WORDS = ["the", "a", "with", "and", "of", "in", "near", "for"]
+COMMON = ["sea", "view", "loft", "garden", "quiet", "bright", "studio", "terrace"]
+COMMON_RANK = 100
+
+
+def vocabulary(size, rng):
+    syllables = ["ka", "lo", "mi", "ter", "san", "vel", "ro", "na", "bis", "cor",
+                 "du", "fen", "gra", "hal", "jo", "ple", "qui", "zan", "tor", "wen"]
+    reserved = set(STOP_WORDS + COMMON)
+    words = set(reserved)
+    while len(words) < size:
+        words.add("".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))))
+    words = sorted(words - reserved)
+    rng.shuffle(words)
+    middle = COMMON_RANK - len(STOP_WORDS)
+    return STOP_WORDS + words[:middle] + COMMON + words[middle:]
+
+
+def texts(count, rng):
+    """(title, description) pairs, Zipf-distributed words"""
+    words = vocabulary(20000, rng)
+    weights = list(itertools.accumulate(1.0 / rank for rank in range(1, len(words) + 1)))
+    for _ in range(count):
+        picked = rng.choices(words, cum_weights=weights, k=44)
+        yield " ".join(picked[:4]).capitalize(), " ".join(picked[4:]) + "."
+
+
+def queries(rng):
+    words = vocabulary(20000, random.Random(7))
+    rare = words[5000:6000]
+    return {
+        "common word": lambda: "sea",
+        "rare word": lambda: rng.choice(rare),
+        "two common words": lambda: "sea view",
+        "common + rare": lambda: f"garden {rng.choice(rare)}",
+        "prefix 3 chars": lambda: rng.choice(rare)[:3] + "*",
+        "prefix 4 chars": lambda: rng.choice(rare)[:4] + "*",
+    }
+
+
+def run(backend, places, repeat, max_matches):
+    rng = random.Random(42)
+    app, db_path = make_app(SEARCH_BACKEND=backend, ENTITY_CACHE_BACKEND=None,
+                            SEARCH_MAX_MATCHES=max_matches)
+    with app.app_context():
+        owners = seed_users(100)
+        # Core inserts: the index is built below, in one pass
+        seed_places(owners, places, texts=texts(places, rng))
+
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.perf_counter()
+        place_search.rebuild()
+        elapsed = time.perf_counter() - start
+        grown = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss) / 1024
+        print(f"\n{backend}: {places} places indexed in {elapsed:.1f} s"
+              + (f", +{grown:.0f} MiB resident" if backend == "memory" else
+                 f", database file {os.path.getsize(db_path) / 2**20:.0f} MiB"))
+
+        hits = []
+        for label, make_query in queries(rng).items():
+            batch = [make_query() for _ in range(repeat)]
+            refused = []
+
+            def search(i):
+                db.session.remove()
+                try:
+                    hits.append(len(facade.text_search_places(batch[i], 20,
+                                                              PLACE_SUMMARY.columns)))
+                except TooManyMatches:
+                    refused.append(i)
+                    hits.append(0)
+
+            timings = measure(search, repeat)
+            print(f"  {label:<18} {summary(timings)}   avg hits {sum(hits[-repeat:]) / repeat:.1f}"
+                  f"   refused {len(refused)}/{repeat}")
+        db.session.remove()
+        db.engine.dispose()
+    os.remove(db_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--places", type=int, default=1000000)
+    parser.add_argument("--memory-places", type=int, default=None,
+                        help="places for the memory backend (default: --places)")
+    parser.add_argument("--backend", choices=["fts5", "memory"], nargs="+",
+                        default=["fts5", "memory"])
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--max-matches", type=int, default=20000,
+                        help="SEARCH_MAX_MATCHES: queries matching more are refused")
+    args = parser.parse_args()
+    for backend in args.backend:
+        places = args.places
+        if backend == "memory" and args.memory_places:
+            places = args.memory_places
+        run(backend, places, args.repeat, args.max_matches)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Serialization of the places listing at 10k rows: the former to_dict
+path (ORM instances, one dict built per row, stdlib json) against the
+compiled PLACE_SUMMARY plan, on instances and on row tuples.
+
+    python -m benchmarks.bench_serializers [--rows 10000] [--repeat 20]
+"""
+import argparse
+import json
+import os
+
+from app.api.v1.serializers import PLACE_SUMMARY, dumps
+from app.extensions import db
+from app.models.place import Place
+from benchmarks.common import make_app, measure, seed_places, seed_users, summary
+
+
+def place_summary(place):
+    """The per-object dict of the listing before the compiled serializers"""
+    return {
+        "id": place.id,
+        "title": place.title,
+        "price": place.price,
+        "review_count": place.review_count,
+        "average_rating": place.average_rating
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    app, db_path = make_app()
+    with app.app_context():
+        seed_places(seed_users(100), args.rows)
+
+        def to_dict(_):
+            db.session.expunge_all()
+            json.dumps([place_summary(p) for p in Place.query.all()])
+
+        def compiled_objects(_):
+            db.session.expunge_all()
+            dumps(PLACE_SUMMARY.many(Place.query.all()))
+
+        def compiled_rows(_):
+            dumps(PLACE_SUMMARY.rows(db.session.query(*PLACE_SUMMARY.columns).all()))
+
+        places = Place.query.all()
+        rows = db.session.query(*PLACE_SUMMARY.columns).all()
+
+        print(f"{args.rows} places, query + serialization")
+        print(f"  to_dict + json            {summary(measure(to_dict, args.repeat))}")
+        print(f"  compiled, instances       {summary(measure(compiled_objects, args.repeat))}")
+        print(f"  compiled, row tuples      {summary(measure(compiled_rows, args.repeat))}")
+        print(f"{args.rows} places, serialization only")
+        print("  to_dict + json            "
+              + summary(measure(lambda _: json.dumps([place_summary(p) for p in places]),
+                                args.repeat)))
+        print("  compiled + orjson         "
+              + summary(measure(lambda _: dumps(PLACE_SUMMARY.rows(rows)), args.repeat)))
+        db.session.remove()
+    os.remove(db_path)
+
+
+if __name__ == "__main__":
+    main()
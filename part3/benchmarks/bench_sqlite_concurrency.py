@@ -0,0 +1,101 @@
+"""
+Readers against one writer on a SQLite file: SQLite defaults (rollback
+journal, synchronous=FULL) against the SQLITE_PRAGMAS of Config (WAL,
+synchronous=NORMAL, mmap, cache, busy_timeout).
+
+Reader threads run the places listing query, the writer thread
+updates a place and commits, both for a fixed duration.
+
+    python -m benchmarks.bench_sqlite_concurrency [--readers 4] [--seconds 5]
+"""
+import argparse
+import os
+import random
+import threading
+import time
+
+from sqlalchemy.exc import OperationalError
+
+from config import Config
+from app.extensions import db
+from app.models.place import Place
+from benchmarks.common import make_app, seed_users, seed_places
+
+MODES = {
+    "defaults": None,
+    "tuned": Config.SQLITE_PRAGMAS,
+}
+
+
+def run(mode, args):
+    app, db_path = make_app(SQLITE_PRAGMAS=MODES[mode], ENTITY_CACHE_BACKEND=None)
+    with app.app_context():
+        place_ids = seed_places(seed_users(100), args.places)
+
+    counts = {"reads": 0, "writes": 0, "locked": 0}
+    lock = threading.Lock()
+    stop = time.perf_counter() + args.seconds
+
+    def count(key):
+        with lock:
+            counts[key] += 1
+
+    def reader():
+        rng = random.Random()
+        with app.app_context():
+            while time.perf_counter() < stop:
+                price = rng.uniform(20, 500)
+                try:
+                    db.session.query(Place.id, Place.title, Place.price).filter(
+                        Place.price >= price).order_by(Place.price).limit(20).all()
+                    count("reads")
+                except OperationalError:
+                    count("locked")
+                db.session.remove()
+
+    def writer():
+        rng = random.Random()
+        with app.app_context():
+            while time.perf_counter() < stop:
+                try:
+                    place = db.session.get(Place, rng.choice(place_ids))
+                    place.price = rng.uniform(20, 500)
+                    db.session.commit()
+                    count("writes")
+                except OperationalError:
+                    db.session.rollback()
+                    count("locked")
+                db.session.remove()
+
+    threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+    threads.append(threading.Thread(target=writer))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    print(f"{mode:>9}   {counts['reads'] / args.seconds:9.1f} reads/s   "
+          f"{counts['writes'] / args.seconds:8.1f} writes/s   "
+          f"{counts['locked']:>4} x database locked")
+    with app.app_context():
+        db.engine.dispose()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--places", type=int, default=10000)
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    args = parser.parse_args()
+    print(f"{args.readers} reader threads + 1 writer, {args.places} places, "
+          f"{args.seconds:g} s, {os.cpu_count()} CPUs")
+    for mode in args.modes:
+        run(mode, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Shared helpers for the benchmarks: a throw-away SQLite app and
+bulk seeding that bypasses the ORM (and bcrypt) so that large
+tables can be built in seconds.
+
+Run a benchmark from the part3/ folder, e.g.:
+    python -m benchmarks.bench_review_create
+"""
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from app import create_app
+from config import Config
+from app.extensions import db, bcrypt
+from app.models import geo, ids
+from app.models.user import User
+from app.models.place import Place
+from app.models.review import Review
+
+BATCH_SIZE = 10000
+
+
+def make_app(db_path=None, **overrides):
+    """Create the app on a SQLite file and create all tables"""
+    if db_path is None:
+        fd, db_path = tempfile.mkstemp(suffix=".db", prefix="hbnb-bench-")
+        os.close(fd)
+        os.remove(db_path)
+
+    class BenchConfig(Config):
+        SECRET_KEY = "bench"
+        JWT_SECRET_KEY = "bench-jwt-secret-key-with-enough-bytes"
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{db_path}"
+        SQLALCHEMY_TRACK_MODIFICATIONS = False
+        BCRYPT_LOG_ROUNDS = 4
+
+    for key, value in overrides.items():
+        setattr(BenchConfig, key, value)
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+    return app, db_path
+
+
+def new_id():
+    return ids.uuid7()
+
+
+def bulk_insert(model, rows):
+    """executemany() insert in batches of BATCH_SIZE rows"""
+    table = model.__table__
+    for start in range(0, len(rows), BATCH_SIZE):
+        db.session.execute(table.insert(), rows[start:start + BATCH_SIZE])
+    db.session.commit()
+
+
+def seed_users(count):
+    password = bcrypt.generate_password_hash("password", 4).decode("utf-8")
+    now = datetime.utcnow()
+    rows = [{
+        "id": new_id(),
+        "first_name": "Bench",
+        "last_name": f"User{i}",
+        "email": f"bench{i}-{uuid.uuid4().hex[:8]}@example.com",
+        "password": password,
+        "is_admin": False,
+        "created_at": now,
+        "updated_at": now,
+    } for i in range(count)]
+    bulk_insert(User, rows)
+    return [row["id"] for row in rows]
+
+
+def seed_places(owner_ids, count, coordinates=None, texts=None):
+    """
+    count places; coordinates(i) -> (latitude, longitude) defaults
+    to a deterministic spread over the globe, texts is an iterator of
+    (title, description) pairs
+    """
+    if coordinates is None:
+        def coordinates(i):
+            return -80.0 + (i * 7.31) % 160.0, -170.0 + (i * 13.17) % 340.0
+    now = datetime.utcnow()
+    rows = []
+    for i in range(count):
+        latitude, longitude = coordinates(i)
+        title, description = (next(texts) if texts is not None
+                              else (f"Place {i}", "Benchmark place " * 8))
+        rows.append({
+            "id": new_id(),
+            "title": title,
+            "description": description,
+            "price": float(20 + i % 480),
+            "latitude": latitude,
+            "longitude": longitude,
+            "geohash": geo.encode(latitude, longitude),
+            "owner_id": owner_ids[i % len(owner_ids)],
+            "created_at": now + timedelta(microseconds=i),
+            "updated_at": now,
+        })
+    bulk_insert(Place, rows)
+    return [row["id"] for row in rows]
+
+
+def seed_reviews(user_ids, place_ids, count):
+    """count reviews with a distinct (user, place) pair each"""
+    now = datetime.utcnow()
+    rows = []
+    for i in range(count):
+        user_id = user_ids[i // len(place_ids)]
+        place_id = place_ids[i % len(place_ids)]
+        rows.append({
+            "id": new_id(),
+            "text": "Benchmark review",
+            "rating": 1 + i % 5,
+            "user_id": user_id,
+            "place_id": place_id,
+            "created_at": now + timedelta(microseconds=i),
+            "updated_at": now,
+        })
+        if len(rows) == BATCH_SIZE:
+            bulk_insert(Review, rows)
+            rows = []
+    bulk_insert(Review, rows)
+
+
+def measure(fn, repeat):
+    """Run fn() repeat times and return the timings in milliseconds"""
+    timings = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        fn(i)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def summary(timings):
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    return f"median {statistics.median(timings):7.3f} ms   p95 {p95:7.3f} ms"
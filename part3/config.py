@@ -1,9 +1,73 @@
 import os
+from datetime import timedelta
 
 
 class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'default_secret_key')
     DEBUG = False
+    # bcrypt cost and the pool hashing passwords off the request thread
+    BCRYPT_LOG_ROUNDS = int(os.getenv('BCRYPT_LOG_ROUNDS', '12'))
+    HASH_POOL_WORKERS = int(os.getenv('HASH_POOL_WORKERS', '4'))
+    HASH_POOL_QUEUE_SIZE = int(os.getenv('HASH_POOL_QUEUE_SIZE', '32'))
+    HASH_POOL_RETRY_AFTER = 1
+    # Lifetime of the JWTs: access tokens are short-lived, clients get new
+    # ones from POST /auth/refresh with their refresh token
+    JWT_ACCESS_TOKEN_EXPIRES = timedelta(
+        seconds=int(os.getenv('JWT_ACCESS_TOKEN_SECONDS', '900')))
+    JWT_REFRESH_TOKEN_EXPIRES = timedelta(
+        seconds=int(os.getenv('JWT_REFRESH_TOKEN_SECONDS', str(30 * 24 * 3600))))
+    # Revoked tokens (app/services/revocation.py): Bloom filter sizing, exact
+    # entries kept in memory, and delay before revocations made by another
+    # process apply here
+    REVOCATION_BLOOM_CAPACITY = 100000
+    REVOCATION_BLOOM_ERROR_RATE = 0.01
+    REVOCATION_CACHE_CAPACITY = 10000
+    REVOCATION_SYNC_SECONDS = int(os.getenv('REVOCATION_SYNC_SECONDS', '5'))
+    # Keyset pagination of the list endpoints (?limit=&cursor=)
+    PAGE_SIZE_DEFAULT = 20
+    PAGE_SIZE_MAX = 100
+    # Rows fetched per round trip by the NDJSON export of the list endpoints
+    STREAM_BATCH_SIZE = 1000
+    # Read-through cache of SQLAlchemyRepository.get (app/persistence/cache.py):
+    # 'memory' (LRU per process), 'shared' (ENTITY_CACHE_CLIENT, a Redis-like
+    # client, or an in-process stand-in when None) or None to disable it
+    ENTITY_CACHE_BACKEND = os.getenv('ENTITY_CACHE_BACKEND', 'memory')
+    ENTITY_CACHE_CLIENT = None
+    # ttl in seconds, capacity in entries; per table, over the defaults
+    ENTITY_CACHE_DEFAULTS = {'ttl': 60, 'capacity': 10000}
+    ENTITY_CACHE = {
+        'users': {'ttl': 300, 'capacity': 10000},
+        'places': {'ttl': 60, 'capacity': 50000},
+        'reviews': {'ttl': 60, 'capacity': 50000},
+        'amenities': {'ttl': 600, 'capacity': 1000},
+    }
+    # PRAGMAs run on every new SQLite connection (app/persistence/sqlite.py);
+    # None (or {}) keeps the SQLite defaults (rollback journal, FULL sync)
+    SQLITE_PRAGMAS = {
+        'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024))),
+        'cache_size': int(os.getenv('SQLITE_CACHE_SIZE', '-65536')),  # KiB
+        'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', '5000')),  # ms
+    }
+    # Storage of the ids (app/models/ids.py): 'binary' (16 bytes) or 'text'
+    # (36 characters) for a database created before, until `flask hbnb
+    # migrate-ids` has copied it
+    ID_STORAGE = os.getenv('ID_STORAGE', 'binary')
+    # Read-your-writes window of the read replica (SQLALCHEMY_BINDS 'replica')
+    REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', '5'))
+    # GET /places/search (app/services/search.py): 'fts5' (SQLite), 'memory'
+    # (inverted index in each process) or 'auto' (fts5 on SQLite)
+    SEARCH_BACKEND = os.getenv('SEARCH_BACKEND', 'auto')
+    # GET /places/autocomplete (app/services/autocomplete.py): places held by
+    # the title index of each process (the most reviewed ones), prefixes
+    # whose best places are cached, and largest ?limit=
+    AUTOCOMPLETE_CAPACITY = int(os.getenv('AUTOCOMPLETE_CAPACITY', '200000'))
+    AUTOCOMPLETE_CACHE_PREFIXES = 10000
+    AUTOCOMPLETE_LIMIT_MAX = 20
+    # GET /places/nearby
+    NEARBY_DEFAULT_RADIUS_KM = 10
+    NEARBY_MAX_RADIUS_KM = 200
 
 
 class DevelopmentConfig(Config):
@@ -13,7 +77,57 @@ class DevelopmentConfig(Config):
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
 
+class TestingConfig(Config):
+    TESTING = True
+    JWT_SECRET_KEY = 'test-jwt-secret-key-with-enough-bytes'
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    BCRYPT_LOG_ROUNDS = 4
+    # one process: its own revocations apply at once, no periodic sync
+    REVOCATION_SYNC_SECONDS = 3600
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+
+def database_url(default=None):
+    """DATABASE_URL, with the postgres:// scheme of some hosts renamed"""
+    url = os.getenv('DATABASE_URL', default)
+    if url and url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+class ProductionConfig(Config):
+    JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY')
+    SQLALCHEMY_DATABASE_URI = database_url()
+    # Optional read replica: the SELECTs of GET requests go to it, except
+    # for a user who wrote in the last REPLICA_STICKY_SECONDS
+    SQLALCHEMY_BINDS = ({'replica': os.getenv('DATABASE_REPLICA_URL')}
+                        if os.getenv('DATABASE_REPLICA_URL') else {})
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Connection pool of the engine (QueuePool): pool_size connections are
+    # kept open, up to max_overflow more are opened under load and closed
+    # on checkin; a request waits at most pool_timeout seconds for one.
+    # pool_pre_ping replaces connections the server dropped, pool_recycle
+    # closes them before the server idle timeout.
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', '10')),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '20')),
+        'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', '30')),
+        'pool_pre_ping': True,
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '1800')),
+    }
+
+
 config = {
     'development': DevelopmentConfig,
+    'testing': TestingConfig,
+    'production': ProductionConfig,
     'default': DevelopmentConfig
 }
+
+
+def config_from_env():
+    """Configuration class named by HBNB_ENV (development by default)"""
+    name = os.getenv('HBNB_ENV', 'default')
+    if name not in config:
+        raise ValueError(f"Unknown HBNB_ENV: {name}")
+    return config[name]
@@ -1,6 +1,10 @@
 from app import create_app
+from app.services.autocomplete import place_autocomplete
 
 app = create_app()
+with app.app_context():
+    # load the title index now rather than on the first autocomplete
+    place_autocomplete.warm()
 
 if __name__ == '__main__':
     app.run(debug=True)
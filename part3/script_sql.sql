@@ -1,4 +1,6 @@
 -- SQL Scripts for Table Generation and Initial Data
+-- Ids are 36-character text here: run the app on these tables with
+-- ID_STORAGE=text (the models create 16-byte binary ids by default)
 
 -- Table for User
 CREATE TABLE IF NOT EXISTS users (
@@ -18,10 +20,21 @@ CREATE TABLE IF NOT EXISTS places (
     price DECIMAL(10, 2) NOT NULL,
     latitude FLOAT NOT NULL,
     longitude FLOAT NOT NULL,
+    geohash VARCHAR(12),
+    review_count INT NOT NULL DEFAULT 0,
+    rating_sum INT NOT NULL DEFAULT 0,
     owner_id CHAR(36) NOT NULL,
     FOREIGN KEY (owner_id) REFERENCES users(id)
 );
 
+-- Indexes for the price and bounding-box filters of GET /api/v1/places/
+CREATE INDEX ix_places_price ON places (price);
+CREATE INDEX ix_places_latitude ON places (latitude);
+CREATE INDEX ix_places_longitude ON places (longitude);
+CREATE INDEX ix_places_geohash ON places (geohash);
+-- Foreign keys are not indexed automatically (SQLite, PostgreSQL)
+CREATE INDEX ix_places_owner_id ON places (owner_id);
+
 -- Table for Review
 CREATE TABLE IF NOT EXISTS reviews (
     id CHAR(36) PRIMARY KEY,
@@ -33,6 +46,8 @@ CREATE TABLE IF NOT EXISTS reviews (
     FOREIGN KEY (place_id) REFERENCES places(id),
     UNIQUE (user_id, place_id)
 );
+-- reviews of a place; reviews of a user use the UNIQUE (user_id, place_id) index
+CREATE INDEX ix_reviews_place_id ON reviews (place_id);
 
 -- Table for Amenity
 CREATE TABLE IF NOT EXISTS amenities (
@@ -48,6 +63,19 @@ CREATE TABLE IF NOT EXISTS place_amenity (
     FOREIGN KEY (place_id) REFERENCES places(id),
     FOREIGN KEY (amenity_id) REFERENCES amenities(id)
 );
+-- places of an amenity; the primary key serves the amenities of a place
+CREATE INDEX ix_place_amenity_amenity_id ON place_amenity (amenity_id);
+
+-- Table for revoked JWTs (logout, refresh token rotation)
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+    jti CHAR(36) PRIMARY KEY,
+    token_type VARCHAR(10) NOT NULL,
+    user_id CHAR(36) NOT NULL,
+    expires_at DATETIME NOT NULL,
+    revoked_at DATETIME NOT NULL
+);
+CREATE INDEX ix_revoked_tokens_expires_at ON revoked_tokens (expires_at);
+CREATE INDEX ix_revoked_tokens_revoked_at ON revoked_tokens (revoked_at);
 
 -- Insert data for admin user
 INSERT INTO users (id, email, first_name, last_name, password, is_admin)
@@ -64,7 +64,7 @@ async function loginUser(email, password) {
   }
 }
 
-let allPlaces = []; // will contain all locations received from the API
+let allPlaces = []; // will contain the locations received from the API so far
 let authToken = null; // will contain the token received from the API
 
 function populatePriceFilter() {
@@ -134,37 +134,74 @@ function getCookie(name) {
   return null;
 }
 
-/* Fetch API to get the list of places and handle the response */
-async function fetchPlaces(token) {
+const PLACES_PAGE_SIZE = 20; // number of places requested per page
+
+/* Fetch API to get one page of places and handle the response */
+async function fetchPlaces(token, cursor = null) {
   const headers = {
     'Content-Type': 'application/json'
   };
   if (token) {
     headers['Authorization'] = `Bearer ${token}`;
   }
+  // Keyset pagination: the API returns { items, next_cursor }
+  const params = new URLSearchParams({ limit: PLACES_PAGE_SIZE });
+  // Filters are applied by the API, only matching places are downloaded
+  const maxPrice = document.getElementById('price-filter')?.value;
+  if (maxPrice) {
+    params.set('max_price', maxPrice);
+  }
+  if (cursor) {
+    params.set('cursor', cursor);
+  }
   // Make a GET request to fetch places data
-  const response = await fetch('http://127.0.0.1:5000/api/v1/places/', {
+  // cache: 'no-cache' revalidates the cached copy with its ETag,
+  // an unchanged page comes back as an empty 304
+  const response = await fetch(`http://127.0.0.1:5000/api/v1/places/?${params}`, {
     method: 'GET',
-    headers: headers
+    headers: headers,
+    cache: 'no-cache'
   });
   
   // Handle the response and pass the data to displayPlaces function
   if (response.ok) {
-    const places = await response.json();
-    allPlaces = places; // stores the full list for later filtering
-    displayPlaces(places);
+    const page = await response.json();
+    // the first page replaces the list, the next ones are appended
+    allPlaces = cursor ? allPlaces.concat(page.items) : page.items;
+    displayPlaces(page.items, Boolean(cursor));
+    displayLoadMore(token, page.next_cursor);
   } else {
     console.error("Error retrieving locations:", response.statusText);
   }
 }
 
+/* Show a "Load more" button while the API has more pages */
+function displayLoadMore(token, nextCursor) {
+  const container = document.getElementById('places-list');
+  let button = document.getElementById('load-more');
+
+  if (!nextCursor) {
+    if (button) button.remove();
+    return;
+  }
+  if (!button) {
+    button = document.createElement('button');
+    button.id = 'load-more';
+    button.textContent = 'Load more';
+    container.after(button);
+  }
+  button.onclick = () => fetchPlaces(token, nextCursor);
+}
+
 /* Create HTML elements for each place and append them to the #places-list */
-function displayPlaces(places) {
+function displayPlaces(places, append = false) {
   // Retrieves the section that contains the list of locations
   const container = document.getElementById('places-list');
 
-  // Clear the current content of the places list
-  container.innerHTML = '';
+  // Clear the current content of the places list (unless a next page is appended)
+  if (!append) {
+    container.innerHTML = '';
+  }
 
   // Iterate over the places data
   places.forEach(place => {
@@ -194,22 +231,9 @@ function displayPlaces(places) {
   });
 }
 
-// Implement client-side filtering
-document.getElementById('price-filter').addEventListener('change', (event) => {
-  // Get the selected price value
-  const selectedPrice = parseFloat(event.target.value);
-  const placeCards = document.querySelectorAll('.place-card');
-
-  // Iterate over the places and show/hide them based on the selected price
-  placeCards.forEach(card => {
-    const price = parseFloat(card.getAttribute('price'));
-
-    if (isNaN(selectedPrice) || price <= selectedPrice) {
-      card.style.display = 'block';
-    } else {
-      card.style.display = 'none';
-    }
-  });
+// Server-side filtering: reload the first page with the selected max price
+document.getElementById('price-filter')?.addEventListener('change', () => {
+  fetchPlaces(authToken);
 });
 
 /* Function to extract location ID from query parameters */
@@ -231,9 +255,11 @@ async function fetchPlaceDetails(token, placeId) {
     headers['Authorization'] = `Bearer ${token}`;
   }
 
+  // revalidated with the ETag of the cached copy (304 when unchanged)
   const response =await fetch(`http://127.0.0.1:5000/api/v1/places/${placeId}`, {
     method: 'GET',
-    headers: headers
+    headers: headers,
+    cache: 'no-cache'
   });
   
   // Handle the response and pass the data to displayPlaceDetails function